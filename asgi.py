@@ -0,0 +1,82 @@
+"""
+ASGI入口文件 - 异步部署模式
+一个进程用共享的异步浏览器并发处理多个渲染请求
+
+    gunicorn -c gunicorn_config.py asgi:application     （SERVER_MODE=asgi）
+    uvicorn asgi:application --port 8001
+"""
+import asyncio
+import os
+import sys
+from dotenv import load_dotenv
+
+# 加载环境变量
+load_dotenv()
+
+# 添加项目路径到Python路径
+sys.path.insert(0, os.path.dirname(__file__))
+
+from a2wsgi import WSGIMiddleware
+
+from pricelist_async_pool import AsyncBrowserPool, BrowserPoolBridge
+from pricelist_browser_pool import set_browser_pool
+from pricelist_web_app import app, warmup
+
+
+class QuoteASGIApp:
+    """
+    Flask应用的ASGI包装
+
+    请求仍由Flask处理（在线程池中运行，ASGI_THREADS个线程），
+    截图统一交给事件循环上的异步浏览器池，同时渲染数由 RENDER_CONCURRENCY 限制
+    """
+
+    def __init__(self, wsgi_app):
+        self.pool = AsyncBrowserPool(
+            max_concurrency=int(os.getenv('RENDER_CONCURRENCY', 4)),
+            max_renders=int(os.getenv('BROWSER_MAX_RENDERS', 200)),
+        )
+        self.wsgi = WSGIMiddleware(wsgi_app, workers=int(os.getenv('ASGI_THREADS', 32)))
+        self._started = False
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self._lifespan(receive, send)
+            return
+
+        if not self._started:
+            await self._startup()
+        await self.wsgi(scope, receive, send)
+
+    async def _startup(self):
+        if self._started:
+            return
+        self._started = True
+        await self.pool.start()
+        set_browser_pool(BrowserPoolBridge(
+            self.pool, asyncio.get_running_loop(),
+            timeout=float(os.getenv('RENDER_TIMEOUT', 60)),
+        ))
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                try:
+                    await self._startup()
+                except Exception as e:
+                    await send({'type': 'lifespan.startup.failed', 'message': str(e)})
+                    return
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                set_browser_pool(None)
+                await self.pool.close()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+
+# 预热模板和礼品库（preload_app 时在gunicorn主进程中执行）
+# 浏览器池在lifespan startup中启动，即fork之后，每个worker各自持有
+warmup(freeze=os.getenv('WARMUP_GC_FREEZE', '1') == '1')
+
+application = QuoteASGIApp(app)
@@ -56,6 +56,7 @@ apt-get install -y \
 echo "📁 创建项目目录..."
 mkdir -p /var/www/pricelist/{current,releases}
 mkdir -p /var/log/pricelist
+mkdir -p /var/lib/pricelist
 
 # 创建www-data用户（如果不存在）
 if ! id "www-data" &>/dev/null; then
@@ -100,6 +101,7 @@ fi
 echo "🔒 设置文件权限..."
 chown -R www-data:www-data /var/www/pricelist
 chown -R www-data:www-data /var/log/pricelist
+chown -R www-data:www-data /var/lib/pricelist
 chmod -R 755 /var/www/pricelist
 
 # 安装systemd服务
@@ -4,14 +4,32 @@ Gunicorn生产环境配置
 import os
 import multiprocessing
 
+from dotenv import load_dotenv
+
+# 与应用读取同一份 .env，SERVER_MODE 等配置才能同时作用于worker类型和应用
+load_dotenv(os.path.join(os.path.dirname(os.path.abspath(__file__)), '.env'))
+
 # 服务器socket
 bind = f"0.0.0.0:{os.getenv('PORT', '8001')}"
 backlog = 2048
 
 # Worker进程
-workers = multiprocessing.cpu_count() * 2 + 1
-worker_class = 'sync'
+# SERVER_MODE=asgi 时使用 asgi:application，每个进程用异步浏览器并发渲染，进程数按CPU核数即可
+SERVER_MODE = os.getenv('SERVER_MODE', 'wsgi')
+if SERVER_MODE == 'asgi':
+    workers = int(os.getenv('WEB_WORKERS', multiprocessing.cpu_count()))
+    worker_class = 'uvicorn_worker.UvicornWorker'
+    wsgi_app = 'asgi:application'
+else:
+    workers = int(os.getenv('WEB_WORKERS', multiprocessing.cpu_count() * 2 + 1))
+    worker_class = 'sync'
+    wsgi_app = 'wsgi:application'
 worker_connections = 1000
+
+# 在主进程中导入应用并预热模板、礼品库，worker fork后以写时复制共享这些内存
+# 浏览器、任务队列等进程级资源都按pid懒加载，不会在fork前创建
+preload_app = os.getenv('PRELOAD_APP', '1') == '1'
+
 timeout = 120
 keepalive = 5
 
@@ -38,3 +56,22 @@ tmp_upload_dir = None
 
 # 优雅重启
 graceful_timeout = 30
+
+
+def on_starting(server):
+    """启动时清空上一次运行留下的指标快照"""
+    directory = os.getenv('METRICS_DIR')
+    if directory and os.path.isdir(directory):
+        for filename in os.listdir(directory):
+            if filename.endswith(('.json', '.tmp')):
+                os.remove(os.path.join(directory, filename))
+
+
+def post_worker_init(worker):
+    """WARMUP_BROWSER=1 时在worker启动后于后台预热浏览器"""
+    if os.getenv('WARMUP_BROWSER') != '1' or SERVER_MODE == 'asgi':
+        return
+
+    import threading
+    from pricelist_web_app import warmup_browser
+    threading.Thread(target=warmup_browser, name='browser-warmup', daemon=True).start()
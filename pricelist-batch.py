@@ -0,0 +1,85 @@
+"""
+批量生成报价单
+从JSON或CSV读取多份报价，共用一个浏览器并行生成，输出ZIP压缩包或NDJSON清单
+
+用法:
+    python3 pricelist-batch.py quotes.csv -o quotes.zip
+    python3 pricelist-batch.py quotes.json --format ndjson -o output/
+"""
+import argparse
+import os
+import sys
+import time
+
+from pricelist_batch import load_payloads, iter_zip, zip_entries, manifest_record, ndjson_line
+from pricelist_templates import QUOTE_LAYOUTS
+from pricelist_web_app import generate_batch, BATCH_CONCURRENCY
+
+
+def main():
+    parser = argparse.ArgumentParser(description="批量生成报价单")
+    parser.add_argument('input', help="报价数据文件（.json 或 .csv）")
+    parser.add_argument('-o', '--output', help="输出ZIP文件或NDJSON输出目录")
+    parser.add_argument('--format', choices=['zip', 'ndjson'], default='zip',
+                        help="zip: 打包为压缩包；ndjson: 文件写入目录并输出清单")
+    parser.add_argument('--layout', choices=sorted(QUOTE_LAYOUTS), default='wechat',
+                        help="报价单布局")
+    parser.add_argument('--concurrency', type=int, default=BATCH_CONCURRENCY,
+                        help="并行页面数")
+    args = parser.parse_args()
+
+    fmt = 'csv' if args.input.lower().endswith('.csv') else 'json'
+    with open(args.input, 'r', encoding='utf-8-sig') as f:
+        payloads = load_payloads(f.read(), fmt)
+
+    print(f"📋 读取报价: {len(payloads)} 份 ({args.input})")
+
+    total = len(payloads)
+    started = time.monotonic()
+    stats = {'ok': 0, 'error': 0}
+
+    def progress(items):
+        """打印进度，错误逐项输出但不中断批次"""
+        for done, item in enumerate(items, 1):
+            stats[item['status']] += 1
+            if item['status'] == 'error':
+                print(f"  ❌ 第{item['index'] + 1}份: {item['error']}")
+            print(f"\r  ⏳ {done}/{total}", end='', flush=True)
+            yield item
+        print()
+
+    results = progress(generate_batch(payloads, args.layout, args.concurrency))
+
+    if args.format == 'zip':
+        output = args.output or f"quotes_{time.strftime('%Y%m%d_%H%M%S')}.zip"
+
+        with open(output, 'wb') as f:
+            for chunk in iter_zip(zip_entries(results)):
+                f.write(chunk)
+    else:
+        output = args.output or 'quotes_batch'
+        os.makedirs(output, exist_ok=True)
+
+        with open(os.path.join(output, 'manifest.ndjson'), 'w', encoding='utf-8') as manifest:
+            for item in results:
+                record = manifest_record(item, f"quote_{item['index']:04d}")
+                if item['status'] == 'ok':
+                    with open(os.path.join(output, record['html_file']), 'w', encoding='utf-8') as f:
+                        f.write(item['html'])
+                    with open(os.path.join(output, record['png_file']), 'wb') as f:
+                        f.write(item['png'])
+                manifest.write(ndjson_line(record))
+
+    elapsed = time.monotonic() - started
+    print(f"✅ 完成: 成功 {stats['ok']} 份，失败 {stats['error']} 份，用时 {elapsed:.1f}秒")
+    print(f"   输出: {output}")
+    return 0 if stats['error'] == 0 else 1
+
+
+if __name__ == "__main__":
+    print("="*70)
+    print("  批量报价单生成器")
+    print("="*70)
+    code = main()
+    print("="*70)
+    sys.exit(code)
@@ -0,0 +1,267 @@
+"""
+报价生成性能基准
+按固定场景重复运行报价流水线的各个阶段，输出延迟分位数、吞吐量和峰值内存（JSON），
+便于在不同提交之间对比
+
+场景:
+    model         请求数据 -> QuoteData
+    html:<布局>   每种模板布局的 generate_html
+    png:375       375px 微信长图截图
+    png:1024x768  1024×768 截图
+    raster:375    不启动浏览器直接绘制简洁版分享图（需要中文字体）
+    gift_library  礼品库冷加载（解析YAML并建索引）
+    pricing:loop  逐份计算 BATCH_QUOTES 份报价的价格汇总（QuoteData 的计算路径）
+    pricing:batch 同样的报价用 QuoteBatch 一次向量化计算
+    e2e           Flask测试客户端请求 /api/generate
+
+用法:
+    python3 pricelist-benchmark.py
+    python3 pricelist-benchmark.py --iterations 50 -o bench.json
+    python3 pricelist-benchmark.py --scenarios model html png:375
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+# 基准默认不使用渲染缓存，否则重复的报价全部命中缓存
+os.environ.setdefault('RENDER_CACHE_MAX_MB', '0')
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# 固定的基准报价（与表单示例一致，保证每次运行输入相同）
+BENCH_PAYLOAD = {
+    'property_name': 'iQ Shoreditch',
+    'room_type': 'Gold Ensuite',
+    'address': '5 Grimsby Street, London E2 6ES',
+    'lease_start': '2026-09-01',
+    'lease_end': '2027-08-31',
+    'weekly_price': 389,
+    'landlord_discounts': [
+        {'name': '早鸟优惠', 'amount': 1000},
+        {'name': '长租优惠', 'amount': 500},
+    ],
+    'uhomes_subsidies': [
+        {'name': '异乡好居补贴', 'amount': 300},
+    ],
+    'selected_gifts': ['airport_pickup', 'cleaning_service', 'welcome_pack'],
+    'advisor_name': '张顾问',
+    'advisor_phone': '+44 20 1234 5678',
+    'advisor_wechat': 'uhomes_advisor',
+}
+
+# 批量价格计算场景的报价份数
+BATCH_QUOTES = 10000
+
+PNG_VIEWPORTS = {
+    'png:375': {'width': 375, 'height': 1500},
+    'png:1024x768': {'width': 1024, 'height': 768},
+}
+
+
+def peak_rss_kb():
+    """本进程峰值常驻内存（KB）；浏览器进程单独统计在 children 中"""
+    scale = 1 if sys.platform != 'darwin' else 1 / 1024  # macOS 单位为字节
+    return {
+        'self': int(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale),
+        'children': int(resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss * scale),
+    }
+
+
+def summarize(samples, elapsed):
+    """延迟样本（秒） -> 统计结果（毫秒）"""
+    ms = sorted(s * 1000 for s in samples)
+    if len(ms) > 1:
+        cuts = statistics.quantiles(ms, n=100, method='inclusive')
+        p50, p95, p99 = cuts[49], cuts[94], cuts[98]
+    else:
+        p50 = p95 = p99 = ms[0]
+    return {
+        'iterations': len(ms),
+        'mean_ms': round(statistics.fmean(ms), 3),
+        'min_ms': round(ms[0], 3),
+        'p50_ms': round(p50, 3),
+        'p95_ms': round(p95, 3),
+        'p99_ms': round(p99, 3),
+        'max_ms': round(ms[-1], 3),
+        'throughput_per_s': round(len(ms) / elapsed, 2) if elapsed > 0 else None,
+    }
+
+
+def measure(fn, iterations, warmup):
+    """预热后逐次计时"""
+    for _ in range(warmup):
+        fn()
+
+    samples = []
+    gc.collect()
+    started = time.perf_counter()
+    for _ in range(iterations):
+        t0 = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - t0)
+    elapsed = time.perf_counter() - started
+
+    result = summarize(samples, elapsed)
+    result['peak_rss_kb'] = peak_rss_kb()
+    return result
+
+
+# ========== 场景 ==========
+
+def build_scenarios(app_module, names):
+    """按名称构建 {场景名: 无参回调}"""
+    from pricelist_gift_library import GiftLibrary
+    from pricelist_pricing import compute_summary
+    from pricelist_quote_batch import QuoteBatch
+    from pricelist_templates import QUOTE_LAYOUTS
+
+    quote = app_module.parse_quote_request(BENCH_PAYLOAD)
+    html = app_module.generate_html(quote, 'wechat')
+    client = app_module.app.test_client()
+
+    def png(viewport):
+        pool = app_module.get_browser_pool()
+        return lambda: pool.render_html(html, viewport=viewport, full_page=True)
+
+    def gift_library_cold():
+        GiftLibrary(
+            app_module.gift_library.path,
+            app_module.build_gift,
+            app_module.serialize_gift,
+        ).refresh()
+
+    # 周租金各不相同的同一组报价，两种计算方式结果逐位一致
+    quotes = [
+        app_module.parse_quote_request(dict(BENCH_PAYLOAD, weekly_price=300 + i % 200))
+        for i in range(BATCH_QUOTES)
+    ]
+    columns = QuoteBatch.from_quotes(quotes)
+
+    def pricing_loop():
+        for q in quotes:
+            compute_summary(q.original_annual_price, q.property.weeks, q.landlord_discounts,
+                            q.uhomes_subsidies, q.selected_gifts, q.competitor_prices)
+
+    def pricing_batch():
+        # 每次新建批次（计算结果按批次缓存）
+        QuoteBatch(
+            columns.original_weekly, columns.original_annual,
+            columns.lease_start, columns.lease_end,
+            columns.landlord, columns.uhomes, columns.gifts, columns.competitor_min,
+            labels=columns.labels, currency=columns.currency,
+        ).compute()
+
+    def e2e():
+        response = client.post('/api/generate', json=BENCH_PAYLOAD)
+        if response.status_code != 200:
+            raise RuntimeError(response.get_json().get('error'))
+
+    available = {'model': lambda: app_module.parse_quote_request(BENCH_PAYLOAD)}
+    for layout in sorted(QUOTE_LAYOUTS):
+        available[f'html:{layout}'] = (lambda l: lambda: app_module.generate_html(quote, l))(layout)
+    for name, viewport in PNG_VIEWPORTS.items():
+        available[name] = png(viewport)
+    available['raster:375'] = lambda: app_module.generate_raster(
+        quote, app_module.image_output.image_spec('png', 375))
+    available['gift_library'] = gift_library_cold
+    available['pricing:loop'] = pricing_loop
+    available['pricing:batch'] = pricing_batch
+    available['e2e'] = e2e
+
+    if not names:
+        return available
+
+    selected = {}
+    for name in names:
+        # "html" / "png" 选择该类全部场景
+        matched = [k for k in available if k == name or k.split(':')[0] == name]
+        if not matched:
+            raise SystemExit(f"❌ 未知场景: {name}（可选: {', '.join(available)}）")
+        for key in matched:
+            selected[key] = available[key]
+    return selected
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            cwd=BASE_DIR, stderr=subprocess.DEVNULL, text=True,
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="报价生成性能基准")
+    parser.add_argument('--scenarios', nargs='*', help="只运行指定场景（如 model html png:375）")
+    parser.add_argument('--iterations', type=int, default=30, help="每个场景的计时次数")
+    parser.add_argument('--png-iterations', type=int, default=None,
+                        help="截图和端到端场景的计时次数（默认同 --iterations）")
+    parser.add_argument('--warmup', type=int, default=3, help="每个场景的预热次数")
+    parser.add_argument('-o', '--output', help="结果JSON文件，默认输出到标准输出")
+    args = parser.parse_args()
+
+    output = os.path.abspath(args.output) if args.output else None
+
+    # 在临时目录中运行，避免在仓库目录留下任何文件
+    workdir = tempfile.mkdtemp(prefix='pricelist-bench-')
+    sys.path.insert(0, BASE_DIR)
+    os.chdir(workdir)
+
+    import_started = time.perf_counter()
+    import pricelist_web_app as app_module
+    import_ms = (time.perf_counter() - import_started) * 1000
+
+    scenarios = build_scenarios(app_module, args.scenarios)
+
+    report = {
+        'commit': git_commit(),
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'iterations': args.iterations,
+        'warmup': args.warmup,
+        'import_ms': round(import_ms, 3),
+        'scenarios': {},
+    }
+
+    for name, fn in scenarios.items():
+        slow = name.startswith('png:') or name == 'e2e'
+        iterations = args.png_iterations if slow and args.png_iterations else args.iterations
+        print(f"⏳ {name} ({iterations}次)", file=sys.stderr)
+        try:
+            result = measure(fn, max(1, iterations), max(0, args.warmup))
+        except Exception as e:
+            # 缺少浏览器等环境问题只记录错误，不中断其他场景
+            print(f"  ❌ {name}: {e}", file=sys.stderr)
+            result = {'error': str(e)}
+        else:
+            print(f"  ✅ p50 {result['p50_ms']}ms  p95 {result['p95_ms']}ms  "
+                  f"p99 {result['p99_ms']}ms  {result['throughput_per_s']}/s", file=sys.stderr)
+        report['scenarios'][name] = result
+
+    report['peak_rss_kb'] = peak_rss_kb()
+
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if output:
+        with open(output, 'w', encoding='utf-8') as f:
+            f.write(text + '\n')
+        print(f"✅ 结果已保存: {output}", file=sys.stderr)
+    else:
+        print(text)
+    return 0 if all('error' not in r for r in report['scenarios'].values()) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -113,7 +113,8 @@ GIFT_CATEGORIES = {
 # 微信分享配置
 WECHAT_SHARE = {
     "image_width": 750,
-    "image_quality": 90,        # PNG质量
+    "image_format": "png",      # 默认输出格式：png / jpeg / webp
+    "image_quality": 90,        # JPEG/WebP初始质量（超过大小上限时逐级降低）
     "max_file_size_mb": 2,      # 最大文件大小（微信限制）
 }
 
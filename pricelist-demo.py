@@ -5,198 +5,13 @@ pricelist 完整演示脚本
 
 from datetime import date, timedelta
 from decimal import Decimal
-from dataclasses import dataclass, field
-from typing import List, Optional
-from enum import Enum
-from jinja2 import Template
+from jinja2 import TemplateNotFound
 
-
-# ========== 数据模型 ==========
-
-class DiscountPayer(Enum):
-    """结算方"""
-    LANDLORD = "landlord"
-    UHOMES = "uhomes"
-
-
-class GiftCategory(Enum):
-    """礼品类别"""
-    CASH = "cash"
-    SERVICE = "service"
-    VOUCHER = "voucher"
-    GIFT = "gift"
-
-
-@dataclass
-class PropertyInfo:
-    """房源信息"""
-    property_name: str
-    room_type: str
-    address: str
-    lease_start: date
-    lease_end: date
-
-    @property
-    def weeks(self) -> int:
-        days = (self.lease_end - self.lease_start).days
-        return max(1, days // 7)
-
-    @property
-    def lease_period_text(self) -> str:
-        start = self.lease_start.strftime('%Y-%m-%d')
-        end = self.lease_end.strftime('%Y-%m-%d')
-        return f"{start} - {end} ({self.weeks}周)"
-
-
-@dataclass
-class Discount:
-    """优惠项"""
-    name: str
-    amount: Decimal
-    payer: DiscountPayer
-    description: str = ""
-
-    def __post_init__(self):
-        if isinstance(self.amount, (int, float)):
-            self.amount = Decimal(str(self.amount))
-        if isinstance(self.payer, str):
-            self.payer = DiscountPayer(self.payer)
-
-
-@dataclass
-class Gift:
-    """礼品"""
-    id: str
-    name: str
-    value: Decimal
-    category: GiftCategory
-    description: str = ""
-    icon: str = "🎁"
-    is_free: bool = False
-
-    def __post_init__(self):
-        if isinstance(self.value, (int, float)):
-            self.value = Decimal(str(self.value))
-        if isinstance(self.category, str):
-            self.category = GiftCategory(self.category)
-
-    @property
-    def category_name(self) -> str:
-        names = {
-            GiftCategory.CASH: "现金类",
-            GiftCategory.SERVICE: "服务类",
-            GiftCategory.VOUCHER: "优惠券",
-            GiftCategory.GIFT: "实物礼品",
-        }
-        return names.get(self.category, "其他")
-
-
-@dataclass
-class CompetitorPrice:
-    """竞对价格"""
-    platform: str
-    weekly_price: Decimal
-    annual_price: Decimal
-    url: Optional[str] = None
-
-    def __post_init__(self):
-        if isinstance(self.weekly_price, (int, float)):
-            self.weekly_price = Decimal(str(self.weekly_price))
-        if isinstance(self.annual_price, (int, float)):
-            self.annual_price = Decimal(str(self.annual_price))
-
-
-@dataclass
-class AdvisorInfo:
-    """顾问信息"""
-    name: str
-    wechat_id: str
-    phone: str
-    qr_code_url: Optional[str] = None
-
-    @property
-    def avatar_initial(self) -> str:
-        return self.name[0] if self.name else "?"
-
-
-@dataclass
-class QuoteData:
-    """完整报价单数据"""
-    property: PropertyInfo
-    original_weekly_price: Decimal
-    original_annual_price: Decimal
-    landlord_discounts: List[Discount] = field(default_factory=list)
-    uhomes_subsidies: List[Discount] = field(default_factory=list)
-    selected_gifts: List[Gift] = field(default_factory=list)
-    competitor_prices: List[CompetitorPrice] = field(default_factory=list)
-    valid_until: Optional[date] = None
-    advisor: Optional[AdvisorInfo] = None
-    created_at: date = field(default_factory=date.today)
-
-    def __post_init__(self):
-        if isinstance(self.original_weekly_price, (int, float)):
-            self.original_weekly_price = Decimal(str(self.original_weekly_price))
-        if isinstance(self.original_annual_price, (int, float)):
-            self.original_annual_price = Decimal(str(self.original_annual_price))
-        if self.valid_until is None:
-            self.valid_until = date.today() + timedelta(days=7)
-
-    @property
-    def total_landlord_discount(self) -> Decimal:
-        return sum(d.amount for d in self.landlord_discounts)
-
-    @property
-    def total_uhomes_subsidy(self) -> Decimal:
-        return sum(s.amount for s in self.uhomes_subsidies)
-
-    @property
-    def total_gifts_value(self) -> Decimal:
-        return sum(g.value for g in self.selected_gifts)
-
-    @property
-    def final_annual_price(self) -> Decimal:
-        return (self.original_annual_price
-                - self.total_landlord_discount
-                - self.total_uhomes_subsidy)
-
-    @property
-    def final_weekly_price(self) -> Decimal:
-        if self.property.weeks > 0:
-            return self.final_annual_price / self.property.weeks
-        return Decimal(0)
-
-    @property
-    def total_savings(self) -> Decimal:
-        return (self.total_landlord_discount
-                + self.total_uhomes_subsidy
-                + self.total_gifts_value)
-
-    @property
-    def savings_rate(self) -> float:
-        if self.original_annual_price > 0:
-            return float(self.total_savings / self.original_annual_price * 100)
-        return 0.0
-
-    @property
-    def lowest_competitor_price(self) -> Optional[Decimal]:
-        if not self.competitor_prices:
-            return None
-        return min(cp.annual_price for cp in self.competitor_prices)
-
-    @property
-    def advantage_vs_competitor(self) -> Optional[Decimal]:
-        lowest = self.lowest_competitor_price
-        if lowest is None:
-            return None
-        return lowest - self.final_annual_price
-
-    @property
-    def advantage_rate(self) -> Optional[float]:
-        lowest = self.lowest_competitor_price
-        advantage = self.advantage_vs_competitor
-        if lowest is None or advantage is None or lowest == 0:
-            return None
-        return float(advantage / lowest * 100)
+import pricelist_templates
+from pricelist_models import (
+    PropertyInfo, Discount, DiscountPayer, Gift, GiftCategory,
+    CompetitorPrice, AdvisorInfo, QuoteData,
+)
 
 
 # ========== 创建示例数据 ==========
@@ -315,48 +130,17 @@ def create_sample_quote():
 def generate_html(quote: QuoteData) -> str:
     """生成HTML报价单"""
 
-    # 读取模板（使用微信版）
-    template_file = "pricelist-quote-wechat.html"
-    try:
-        with open(template_file, 'r', encoding='utf-8') as f:
-            template_content = f.read()
-    except FileNotFoundError:
-        print(f"❌ 模板文件未找到: {template_file}")
-        # 回退到1024×768版
-        template_file = "pricelist-quote-1024x768.html"
+    # 使用共享的已编译模板（微信版 → 1024×768版 → 紧凑版 依次回退）
+    template = None
+    for layout in ('wechat', '1024x768', 'compact'):
         try:
-            with open(template_file, 'r', encoding='utf-8') as f:
-                template_content = f.read()
-        except FileNotFoundError:
-            # 再回退到紧凑版
-            template_file = "pricelist-quote-compact.html"
-            try:
-                with open(template_file, 'r', encoding='utf-8') as f:
-                    template_content = f.read()
-            except FileNotFoundError:
-                return None
-
-    # 创建Jinja2环境并添加自定义过滤器
-    from jinja2 import Environment
-    env = Environment()
-
-    # 添加格式化过滤器
-    def format_number(value, with_comma=True):
-        """格式化数字"""
-        if value is None:
-            return "0"
-        try:
-            num = float(value)
-            if with_comma:
-                return f"{num:,.0f}"
-            else:
-                return f"{num:.0f}"
-        except:
-            return str(value)
-
-    env.filters['format_num'] = format_number
+            template = pricelist_templates.get_template(layout)
+            break
+        except TemplateNotFound:
+            print(f"❌ 模板文件未找到: {pricelist_templates.QUOTE_LAYOUTS[layout]}")
 
-    template = env.from_string(template_content)
+    if template is None:
+        return None
 
     # 准备数据（将Decimal转为float，方便模板格式化）
     data = {
@@ -376,7 +160,7 @@ def generate_html(quote: QuoteData) -> str:
         "advantage_rate": quote.advantage_rate,
         "total_savings": float(quote.total_savings),
         "savings_rate": quote.savings_rate,
-        "valid_until": quote.valid_until.strftime('%Y-%m-%d'),
+        "valid_until": quote.valid_until_text,
         "advisor": quote.advisor,
     }
 
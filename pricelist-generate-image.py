@@ -2,7 +2,7 @@
 生成微信分享用的PNG长图
 适合直接在微信聊天中发送
 """
-from playwright.sync_api import sync_playwright
+from pricelist_browser_pool import get_local_browser_pool
 import os
 from datetime import datetime
 
@@ -34,22 +34,14 @@ def generate_wechat_image(html_file=None, output_file=None):
 
     print(f"📄 读取报价单: {html_file}")
 
-    with sync_playwright() as p:
-        # 启动浏览器
-        browser = p.chromium.launch()
-
-        # 创建375px宽度的手机页面（微信标准宽度）
-        page = browser.new_page(viewport={'width': 375, 'height': 1500})
-
-        # 加载HTML
-        page.goto(html_path)
-        page.wait_for_load_state('networkidle')
-
-        # 全页截图（长图）
-        print(f"📸 生成PNG长图...")
-        page.screenshot(path=output_file, full_page=True)
-
-        browser.close()
+    # 使用本进程的常驻浏览器池（按文件URL截图，不经过渲染服务），375px宽度的手机页面（微信标准宽度）
+    print(f"📸 生成PNG长图...")
+    get_local_browser_pool().screenshot(
+        html_path,
+        path=output_file,
+        viewport={'width': 375, 'height': 1500},
+        full_page=True,
+    )
 
     # 获取文件大小
     file_size = os.path.getsize(output_file) / 1024  # KB
@@ -0,0 +1,57 @@
+"""
+渲染服务
+独立进程持有固定的浏览器池，web worker 设置 RENDER_SERVICE_URL 后把截图交给本服务
+
+用法:
+    python3 pricelist-render-service.py --listen unix:/run/pricelist/render.sock
+    python3 pricelist-render-service.py --listen http://127.0.0.1:8765 --concurrency 8
+"""
+import argparse
+import os
+import signal
+import sys
+import threading
+
+from dotenv import load_dotenv
+
+from pricelist_render_service import RenderService, create_server
+
+
+def main():
+    load_dotenv()
+
+    parser = argparse.ArgumentParser(description="报价单渲染服务")
+    parser.add_argument('--listen', default=os.getenv('RENDER_SERVICE_LISTEN', 'http://127.0.0.1:8765'),
+                        help="监听地址: unix:/路径 或 http://主机:端口")
+    parser.add_argument('--concurrency', type=int, default=int(os.getenv('RENDER_CONCURRENCY', 4)),
+                        help="同时渲染的页面数")
+    parser.add_argument('--max-renders', type=int, default=int(os.getenv('BROWSER_MAX_RENDERS', 200)),
+                        help="浏览器回收前的渲染次数")
+    parser.add_argument('--max-pending', type=int,
+                        default=int(os.getenv('RENDER_SERVICE_MAX_PENDING', 0)) or None,
+                        help="同时接受的渲染请求上限，超过时返回503（默认 并发数 × 4）")
+    parser.add_argument('--timeout', type=float, default=float(os.getenv('RENDER_TIMEOUT', 60)),
+                        help="单次渲染超时秒数")
+    args = parser.parse_args()
+
+    service = RenderService(args.concurrency, args.max_renders, args.timeout, args.max_pending)
+    server = create_server(args.listen, service)
+
+    def shutdown(signum, frame):
+        threading.Thread(target=server.shutdown, daemon=True).start()
+
+    signal.signal(signal.SIGTERM, shutdown)
+    signal.signal(signal.SIGINT, shutdown)
+
+    print(f"🚀 渲染服务已启动: {args.listen}（并发 {args.concurrency}）")
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+        service.close()
+        print("✅ 渲染服务已停止")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
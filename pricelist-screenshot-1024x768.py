@@ -1,7 +1,7 @@
 """
 生成1024×768分辨率的报价单截图
 """
-from playwright.sync_api import sync_playwright
+from pricelist_browser_pool import get_local_browser_pool
 import os
 
 def capture_screenshot():
@@ -16,25 +16,15 @@ def capture_screenshot():
     # 获取绝对路径
     html_path = f"file://{os.path.abspath(html_file)}"
 
-    with sync_playwright() as p:
-        # 启动浏览器
-        browser = p.chromium.launch()
-
-        # 创建1024×768的页面
-        page = browser.new_page(viewport={'width': 1024, 'height': 768})
-
-        # 加载HTML
-        print(f"📄 加载HTML: {html_file}")
-        page.goto(html_path)
-
-        # 等待加载完成
-        page.wait_for_load_state('networkidle')
-
-        # 截图
-        print(f"📸 捕获1024×768截图...")
-        page.screenshot(path=output_file, full_page=False)
-
-        browser.close()
+    # 使用本进程的常驻浏览器池（按文件URL截图，不经过渲染服务），1024×768视口
+    print(f"📄 加载HTML: {html_file}")
+    print(f"📸 捕获1024×768截图...")
+    get_local_browser_pool().screenshot(
+        html_path,
+        path=output_file,
+        viewport={'width': 1024, 'height': 768},
+        full_page=False,
+    )
 
     print(f"✅ 截图已保存: {output_file}")
     print(f"   分辨率: 1024×768px")
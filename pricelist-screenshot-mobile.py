@@ -1,7 +1,7 @@
 """
 生成手机端截图（多种尺寸）
 """
-from playwright.sync_api import sync_playwright
+from pricelist_browser_pool import get_local_browser_pool
 import os
 
 def capture_mobile_screenshots():
@@ -21,21 +21,19 @@ def capture_mobile_screenshots():
         {"name": "微信推荐", "width": 375, "height": 1500},  # 长图
     ]
 
-    with sync_playwright() as p:
-        browser = p.chromium.launch()
-
-        for device in devices:
-            page = browser.new_page(viewport={'width': device['width'], 'height': device['height']})
-            page.goto(html_path)
-            page.wait_for_load_state('networkidle')
-
-            # 全页截图
-            output = f"pricelist_mobile_{device['name'].replace(' ', '_')}.png"
-            page.screenshot(path=output, full_page=True)
-            print(f"✅ {device['name']}: {output}")
-            page.close()
-
-        browser.close()
+    # 所有尺寸共用本进程的同一个浏览器（按文件URL截图，不经过渲染服务）
+    pool = get_local_browser_pool()
+
+    for device in devices:
+        # 全页截图
+        output = f"pricelist_mobile_{device['name'].replace(' ', '_')}.png"
+        pool.screenshot(
+            html_path,
+            path=output,
+            viewport={'width': device['width'], 'height': device['height']},
+            full_page=True,
+        )
+        print(f"✅ {device['name']}: {output}")
 
 if __name__ == "__main__":
     print("="*70)
@@ -5,10 +5,12 @@ pricelist 使用示例
 
 from datetime import date, timedelta
 from decimal import Decimal
-from jinja2 import Template
 
-# 导入数据模型（实际使用时从 core.models 导入）
-# from core.models import PropertyInfo, Discount, Gift, CompetitorPrice, AdvisorInfo, QuoteData, DiscountPayer, GiftCategory
+import pricelist_templates
+from pricelist_models import (
+    PropertyInfo, Discount, DiscountPayer, Gift, GiftCategory,
+    CompetitorPrice, AdvisorInfo, QuoteData, build_gift, decode_quote_request,
+)
 
 
 # ========== 示例1: 创建基础报价单 ==========
@@ -144,15 +146,11 @@ def example_basic_quote():
 
 # ========== 示例2: 生成HTML报价单 ==========
 
-def generate_html_quote(quote: QuoteData, template_path: str) -> str:
-    """生成HTML报价单"""
+def generate_html_quote(quote: QuoteData, layout: str = 'standard') -> str:
+    """生成HTML报价单（layout 见 pricelist_templates.QUOTE_LAYOUTS）"""
 
-    # 读取模板
-    with open(template_path, 'r', encoding='utf-8') as f:
-        template_content = f.read()
-
-    # 创建Jinja2模板
-    template = Template(template_content)
+    # 获取已编译的模板（进程内只编译一次）
+    template = pricelist_templates.get_template(layout)
 
     # 准备模板数据
     template_data = {
@@ -185,7 +183,7 @@ def generate_html_quote(quote: QuoteData, template_path: str) -> str:
         "savings_rate": quote.savings_rate,
 
         # 元信息
-        "valid_until": quote.valid_until.strftime('%Y-%m-%d'),
+        "valid_until": quote.valid_until_text,
         "advisor": quote.advisor,
     }
 
@@ -233,20 +231,7 @@ def load_gift_library(yaml_path: str) -> list:
     with open(yaml_path, 'r', encoding='utf-8') as f:
         config = yaml.safe_load(f)
 
-    gifts = []
-    for gift_data in config.get('gift_library', []):
-        gift = Gift(
-            id=gift_data['id'],
-            name=gift_data['name'],
-            value=Decimal(str(gift_data['value'])),
-            category=GiftCategory(gift_data['category']),
-            description=gift_data.get('description', ''),
-            icon=gift_data.get('icon', '🎁'),
-            unit=gift_data.get('unit', 'GBP'),
-            sort_order=gift_data.get('sort_order', 999),
-            is_free=gift_data.get('is_free', False),
-        )
-        gifts.append(gift)
+    gifts = [build_gift(item) for item in config.get('gift_library', [])]
 
     # 按排序字段排序
     gifts.sort(key=lambda g: g.sort_order)
@@ -259,35 +244,21 @@ def load_gift_library(yaml_path: str) -> list:
 def api_create_quote(request_data: dict) -> dict:
     """处理API请求，创建报价单"""
 
-    # 1. 解析请求数据
-    property_info = PropertyInfo(
-        property_name=request_data['property']['property_name'],
-        room_type=request_data['property']['room_type'],
-        address=request_data['property']['address'],
-        lease_start=date.fromisoformat(request_data['property']['lease_start']),
-        lease_end=date.fromisoformat(request_data['property']['lease_end']),
-    )
+    # 1. 从礼品库中按ID查找已选礼品
+    gift_library = {g.id: g for g in load_gift_library('pricelist-gift_library.yaml')}
 
-    # 2. 从礼品库中筛选已选礼品
-    gift_library = load_gift_library('config/gift_library.yaml')
-    selected_gift_ids = request_data.get('selected_gift_ids', [])
-    selected_gifts = [g for g in gift_library if g.id in selected_gift_ids]
+    def select_gifts(gift_ids):
+        return [gift_library[gift_id] for gift_id in gift_ids if gift_id in gift_library]
 
-    # 3. 创建报价单
-    quote = QuoteData(
-        property=property_info,
-        original_weekly_price=Decimal(str(request_data['original_weekly_price'])),
-        original_annual_price=Decimal(str(request_data['original_annual_price'])),
-        # ... 其他字段
-        selected_gifts=selected_gifts,
-    )
+    # 2. 解码并校验请求数据（与 /api/generate 相同的字段，出错时抛出 DecodeError）
+    quote = decode_quote_request(request_data, select_gifts)
 
-    # 4. 生成HTML和PNG
-    html_content = generate_html_quote(quote, 'templates/quote_card.html')
+    # 3. 生成HTML和PNG
+    html_content = generate_html_quote(quote, 'simple')
     png_path = f"output/{quote.property.property_name}_{date.today()}.png"
     # await generate_png_quote(html_content, png_path)  # 异步调用
 
-    # 5. 返回结果
+    # 4. 返回结果
     return {
         "success": True,
         "quote_id": f"Q{date.today().strftime('%Y%m%d')}001",
@@ -316,7 +287,7 @@ if __name__ == "__main__":
         # 示例2: 生成HTML
         print("【示例2】生成HTML报价单")
         print("-" * 60)
-        html = generate_html_quote(quote, 'pricelist-quote_template.html')
+        html = generate_html_quote(quote, 'standard')
 
         # 保存HTML文件
         output_html_path = 'output_quote_example.html'
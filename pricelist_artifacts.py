@@ -0,0 +1,294 @@
+"""
+产物存储 - 生成的HTML/PNG按唯一ID保存，供 /download 下载
+不再写入进程工作目录；支持内存LRU、本地分片目录或自定义后端，过期产物由后台线程清理
+"""
+import importlib
+import io
+import json
+import os
+import secrets
+import tempfile
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional
+
+META_SUFFIX = '.json'
+
+
+@dataclass(frozen=True)
+class Artifact:
+    """一个已保存的产物（内容不可变，ID即ETag）"""
+    id: str
+    filename: str        # 下载文件名
+    content_type: str
+    size: int
+    created: float
+    path: Optional[str] = None      # 本地文件（可直接交给send_file）
+    data: Optional[bytes] = None    # 内存内容
+
+    @property
+    def etag(self) -> str:
+        return self.id
+
+    def open(self):
+        """以二进制文件对象读取内容"""
+        if self.path is not None:
+            return open(self.path, 'rb')
+        return io.BytesIO(self.data)
+
+
+class ArtifactStore(ABC):
+    """
+    产物存储接口
+
+    自定义后端继承此类，必须实现 put / get / delete（缺少任何一个时构造即报错），可选实现 reap；
+    通过 ARTIFACT_STORE=模块:类名 启用（无参构造）
+    """
+
+    ttl = 3600
+
+    @abstractmethod
+    def put(self, data: bytes, filename: str, content_type: str) -> Artifact:
+        """保存内容，返回产物"""
+
+    @abstractmethod
+    def get(self, artifact_id: str) -> Optional[Artifact]:
+        """按ID读取产物，不存在或已过期返回 None"""
+
+    @abstractmethod
+    def delete(self, artifact_id: str):
+        """删除产物（不存在时忽略）"""
+
+    def reap(self) -> int:
+        """删除过期产物，返回删除数量"""
+        return 0
+
+    def stats(self) -> dict:
+        return {'backend': type(self).__name__}
+
+    @staticmethod
+    def new_id() -> str:
+        return secrets.token_hex(16)
+
+
+class MemoryArtifactStore(ArtifactStore):
+    """
+    进程内LRU存储
+
+    只适合单进程部署：多个gunicorn worker之间不共享，下载请求可能落到别的进程
+    """
+
+    def __init__(self, max_bytes=100 * 1024 * 1024, ttl=3600):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._items = OrderedDict()  # id -> Artifact
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def put(self, data, filename, content_type):
+        artifact = Artifact(
+            id=self.new_id(), filename=filename, content_type=content_type,
+            size=len(data), created=time.time(), data=bytes(data),
+        )
+        with self._lock:
+            self._items[artifact.id] = artifact
+            self._bytes += artifact.size
+            # 超出容量时淘汰最久未访问的产物（至少保留刚写入的一个）
+            while self._bytes > self.max_bytes and len(self._items) > 1:
+                _, oldest = self._items.popitem(last=False)
+                self._bytes -= oldest.size
+        return artifact
+
+    def get(self, artifact_id):
+        with self._lock:
+            artifact = self._items.get(artifact_id)
+            if artifact is None:
+                return None
+            if time.time() - artifact.created > self.ttl:
+                self._remove(artifact_id)
+                return None
+            self._items.move_to_end(artifact_id)
+            return artifact
+
+    def delete(self, artifact_id):
+        with self._lock:
+            self._remove(artifact_id)
+
+    def reap(self):
+        cutoff = time.time() - self.ttl
+        with self._lock:
+            expired = [k for k, a in self._items.items() if a.created < cutoff]
+            for artifact_id in expired:
+                self._remove(artifact_id)
+        return len(expired)
+
+    def stats(self):
+        with self._lock:
+            return {'backend': 'memory', 'entries': len(self._items),
+                    'bytes': self._bytes, 'max_bytes': self.max_bytes}
+
+    def _remove(self, artifact_id):
+        artifact = self._items.pop(artifact_id, None)
+        if artifact is not None:
+            self._bytes -= artifact.size
+
+
+class LocalArtifactStore(ArtifactStore):
+    """
+    本地目录存储
+
+    文件按ID前两位分目录存放（内容文件 + .json元信息），
+    多个worker进程共享同一目录，下载请求落到任意进程都能读取
+    """
+
+    def __init__(self, directory, ttl=3600):
+        self.directory = directory
+        self.ttl = ttl
+        os.makedirs(directory, exist_ok=True)
+
+    def put(self, data, filename, content_type):
+        artifact_id = self.new_id()
+        path = self._path(artifact_id)
+        shard = os.path.dirname(path)
+        os.makedirs(shard, exist_ok=True)
+
+        meta = {'filename': filename, 'content_type': content_type,
+                'size': len(data), 'created': time.time()}
+
+        # 先写内容再写元信息，元信息存在即表示产物完整
+        self._write(shard, path, data)
+        self._write(shard, path + META_SUFFIX,
+                    json.dumps(meta, ensure_ascii=False).encode('utf-8'))
+
+        return Artifact(id=artifact_id, path=path, **meta)
+
+    def get(self, artifact_id):
+        if not _valid_id(artifact_id):
+            return None
+        path = self._path(artifact_id)
+        try:
+            with open(path + META_SUFFIX, encoding='utf-8') as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        if time.time() - meta['created'] > self.ttl:
+            self.delete(artifact_id)
+            return None
+        if not os.path.exists(path):
+            return None
+        return Artifact(id=artifact_id, path=path, **meta)
+
+    def delete(self, artifact_id):
+        if not _valid_id(artifact_id):
+            return
+        path = self._path(artifact_id)
+        for p in (path + META_SUFFIX, path):
+            try:
+                os.unlink(p)
+            except OSError:
+                pass
+
+    def reap(self):
+        """按文件mtime删除过期产物（含写入中断留下的临时文件）"""
+        cutoff = time.time() - self.ttl
+        removed = 0
+        try:
+            shards = [e for e in os.scandir(self.directory) if e.is_dir()]
+        except OSError:
+            return 0
+        for shard in shards:
+            try:
+                entries = list(os.scandir(shard.path))
+            except OSError:
+                continue
+            for entry in entries:
+                try:
+                    if entry.stat().st_mtime >= cutoff:
+                        continue
+                    os.unlink(entry.path)
+                except OSError:
+                    continue
+                if entry.name.endswith(META_SUFFIX):
+                    removed += 1
+        return removed
+
+    def stats(self):
+        return {'backend': 'local', 'directory': self.directory, 'ttl': self.ttl}
+
+    def _path(self, artifact_id):
+        return os.path.join(self.directory, artifact_id[:2], artifact_id)
+
+    @staticmethod
+    def _write(directory, path, data):
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+
+def _valid_id(artifact_id: str) -> bool:
+    return len(artifact_id) == 32 and all(c in '0123456789abcdef' for c in artifact_id)
+
+
+# ========== 后台清理 ==========
+
+def start_reaper(store: ArtifactStore, interval: float) -> threading.Thread:
+    """每 interval 秒清理一次过期产物"""
+    def run():
+        while True:
+            time.sleep(interval)
+            try:
+                store.reap()
+            except Exception as e:
+                print(f"⚠️ 清理过期产物失败: {e}")
+
+    thread = threading.Thread(target=run, name='artifact-reaper', daemon=True)
+    thread.start()
+    return thread
+
+
+# ========== 进程级单例 ==========
+
+_store = None
+_store_pid = None
+_store_lock = threading.Lock()
+
+
+def create_store(backend: str) -> ArtifactStore:
+    """按名称创建存储后端: local、memory 或 模块:类名"""
+    ttl = int(os.getenv('ARTIFACT_TTL', 3600))
+
+    if backend == 'local':
+        return LocalArtifactStore(
+            directory=os.getenv(
+                'ARTIFACT_DIR',
+                os.path.join(tempfile.gettempdir(), 'pricelist-artifacts'),
+            ),
+            ttl=ttl,
+        )
+    if backend == 'memory':
+        return MemoryArtifactStore(
+            max_bytes=int(os.getenv('ARTIFACT_MAX_MB', 100)) * 1024 * 1024,
+            ttl=ttl,
+        )
+    if ':' in backend:
+        module_name, _, class_name = backend.partition(':')
+        store_class = getattr(importlib.import_module(module_name), class_name)
+        return store_class()
+    raise ValueError(f"未知的产物存储后端: {backend}")
+
+
+def get_artifact_store() -> ArtifactStore:
+    """获取当前进程的产物存储（fork后的子进程会重新创建并启动清理线程）"""
+    global _store, _store_pid
+
+    with _store_lock:
+        if _store is None or _store_pid != os.getpid():
+            _store = create_store(os.getenv('ARTIFACT_STORE', 'local'))
+            _store_pid = os.getpid()
+            start_reaper(_store, float(os.getenv('ARTIFACT_REAP_INTERVAL', 300)))
+        return _store
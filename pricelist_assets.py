@@ -0,0 +1,135 @@
+"""
+品牌样式资源 - 报价单样式表的预处理
+各布局共用的样式放在 pricelist-quote-base.css，加上由品牌配置生成的 :root 品牌变量
+和嵌入字体的 @font-face（见 pricelist_fonts）后压缩成一个共用样式包，按内容哈希标记版本；
+每种布局的同名 .css 只写与共用样式不同的部分，压缩后接在样式包后面。
+模板通过 {{ stylesheet('xxx.css') }} 内联，同一进程内只生成一次，品牌配置、字体子集或样式文件变化后自动重新生成
+"""
+import hashlib
+import os
+import re
+import threading
+from dataclasses import dataclass
+
+import pricelist_fonts
+from pricelist_brand import BRAND_CONFIG_FILE, load_brand_module
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+BUNDLE_FILE = 'pricelist-quote-base.css'     # 各布局共用的样式
+
+
+@dataclass(frozen=True)
+class Stylesheet:
+    """压缩后的样式表"""
+    name: str
+    css: str       # 内联用的完整样式（共用样式包 + 布局样式）
+    hash: str      # 内容哈希前12位，用于渲染缓存键和外链文件名
+
+    @property
+    def size(self) -> int:
+        return len(self.css.encode('utf-8'))
+
+
+_bundle = None  # (版本, Stylesheet)
+_cache = {}     # 样式文件名 -> (文件版本, 样式包哈希, Stylesheet)
+_lock = threading.Lock()
+
+
+def brand_tokens() -> dict:
+    """由品牌配置生成的CSS变量"""
+    brand = load_brand_module()
+    colors = brand.BRAND_SECONDARY_COLORS
+    tokens = {
+        '--brand-primary': brand.BRAND_PRIMARY_COLOR,
+        '--brand-dark': colors['dark_red'],
+        '--brand-light': colors['light_red'],
+    }
+    for name, value in colors.items():
+        tokens[f"--brand-{name.replace('_', '-')}"] = value
+    tokens['--font-brand'] = brand.FONTS['primary_cn']
+    return tokens
+
+
+def minify(css: str) -> str:
+    """去掉注释和多余空白"""
+    css = re.sub(r'/\*.*?\*/', '', css, flags=re.S)
+    css = re.sub(r'\s+', ' ', css)
+    # 冒号前的空格可能是后代选择器（如 "div :first-child"），只去掉冒号后的
+    css = re.sub(r'\s*([{};,>])\s*', r'\1', css)
+    css = re.sub(r':\s+', ':', css)
+    return css.replace(';}', '}').strip()
+
+
+def _stat(path):
+    st = os.stat(path)
+    return st.st_mtime_ns, st.st_size
+
+
+def _bundle_version():
+    # 字体版本只在字体子集重新生成时变化，这里不扫描字体源文件
+    return (_stat(os.path.join(BASE_DIR, BUNDLE_FILE)), _stat(BRAND_CONFIG_FILE),
+            pricelist_fonts.version())
+
+
+def _digest(css):
+    return hashlib.sha256(css.encode('utf-8')).hexdigest()[:12]
+
+
+def _build_bundle() -> Stylesheet:
+    with open(os.path.join(BASE_DIR, BUNDLE_FILE), encoding='utf-8') as f:
+        source = f.read()
+    root = ';'.join(f"{key}:{value}" for key, value in brand_tokens().items())
+    css = pricelist_fonts.font_face_css() + minify(f":root{{{root}}}{source}")
+    return Stylesheet(name=BUNDLE_FILE, css=css, hash=_digest(css))
+
+
+def get_bundle() -> Stylesheet:
+    """共用样式包（品牌变量 + 嵌入字体 + 共用样式），进程内只生成一次"""
+    global _bundle
+
+    version = _bundle_version()
+    cached = _bundle
+    if cached and cached[0] == version:
+        return cached[1]
+
+    with _lock:
+        if _bundle is None or _bundle[0] != version:
+            bundle = _build_bundle()
+            if _bundle is not None and _bundle[1].hash != bundle.hash:
+                print(f"🎨 共用样式包已重新生成: {bundle.hash}")
+            _bundle = (version, bundle)
+        return _bundle[1]
+
+
+def _build(name, path, bundle: Stylesheet) -> Stylesheet:
+    with open(path, encoding='utf-8') as f:
+        source = f.read()
+    css = bundle.css + minify(source)
+    return Stylesheet(name=name, css=css, hash=_digest(css))
+
+
+def get_stylesheet(name: str) -> Stylesheet:
+    """按布局样式文件名（相对项目目录）获取接在共用样式包后的压缩样式表"""
+    path = os.path.join(BASE_DIR, name)
+    version = _stat(path)
+    bundle = get_bundle()
+
+    cached = _cache.get(name)
+    if cached and cached[0] == version and cached[1] == bundle.hash:
+        return cached[2]
+
+    with _lock:
+        cached = _cache.get(name)
+        if cached is None or cached[0] != version or cached[1] != bundle.hash:
+            stylesheet = _build(name, path, bundle)
+            if cached is not None and cached[2].hash != stylesheet.hash:
+                print(f"🎨 样式表已重新生成: {name} ({stylesheet.hash})")
+            cached = (version, bundle.hash, stylesheet)
+            _cache[name] = cached
+    return cached[2]
+
+
+def inline_css(name: str) -> str:
+    """模板全局函数：返回内联用的样式表内容"""
+    return get_stylesheet(name).css
@@ -0,0 +1,200 @@
+"""
+异步浏览器池 - ASGI模式下由事件循环持有的共享Chromium
+一个进程内的多个请求并发渲染，同时打开的页面数由信号量限制
+"""
+import asyncio
+import threading
+
+from playwright.async_api import async_playwright, Error as PlaywrightError
+
+import pricelist_fonts
+import pricelist_metrics as metrics
+from pricelist_browser_pool import DEFAULT_VIEWPORT, READY_SCRIPT
+
+
+class _BrowserGeneration:
+    """一次启动的浏览器及其按视口复用的上下文"""
+
+    def __init__(self, browser):
+        self.browser = browser
+        self.contexts = {}   # spec -> BrowserContext
+        self.active = 0      # 正在渲染的页面数
+        self.renders = 0
+        self.retired = False
+
+    async def close(self):
+        try:
+            await self.browser.close()
+        except PlaywrightError:
+            pass
+
+
+class AsyncBrowserPool:
+    """
+    异步浏览器池
+
+    - 所有渲染共用一个浏览器，每次渲染新开页面、结束后关闭
+    - 同时渲染的页面数不超过 max_concurrency
+    - 渲染 max_renders 次后换用新浏览器，旧浏览器在其页面全部完成后关闭
+    - 浏览器断开时重新启动并重试一次
+    """
+
+    def __init__(self, max_concurrency=4, max_renders=200, launch_options=None):
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_renders = max_renders
+        self.launch_options = launch_options or {}
+
+        self.total_renders = 0
+        self.restart_count = 0
+
+        self._playwright = None
+        self._current = None
+        self._semaphore = None
+        self._launch_lock = None
+
+    async def start(self):
+        """在当前事件循环中启动Playwright（浏览器在首次渲染时启动）"""
+        if self._playwright is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._launch_lock = asyncio.Lock()
+            self._playwright = await async_playwright().start()
+
+    async def close(self):
+        if self._current is not None:
+            await self._current.close()
+            self._current = None
+        if self._playwright is not None:
+            await self._playwright.stop()
+            self._playwright = None
+
+    async def render_html(self, html, viewport=None, full_page=True,
+                          device_scale_factor=1, **options):
+        """把HTML字符串载入新页面并截图，返回图片字节"""
+        await self.start()
+        viewport = viewport or DEFAULT_VIEWPORT
+        spec = (viewport['width'], viewport['height'], device_scale_factor)
+
+        async with self._semaphore:
+            for attempt in range(2):
+                generation = await self._acquire()
+                generation.active += 1
+                try:
+                    return await self._capture(generation, spec, html, full_page, options)
+                except PlaywrightError:
+                    if attempt == 0 and not generation.browser.is_connected():
+                        print("⚠️ 浏览器异常，正在重启...")
+                        generation.retired = True
+                        continue
+                    raise
+                finally:
+                    generation.active -= 1
+                    await self._release(generation)
+
+    def stats(self) -> dict:
+        current = self._current
+        return {
+            'max_concurrency': self.max_concurrency,
+            'active': current.active if current else 0,
+            'render_count': current.renders if current else 0,
+            'total_renders': self.total_renders,
+            'restart_count': self.restart_count,
+        }
+
+    # ========== 内部方法 ==========
+
+    async def _acquire(self) -> _BrowserGeneration:
+        current = self._current
+        if current is not None and not current.retired and current.browser.is_connected():
+            return current
+
+        async with self._launch_lock:
+            current = self._current
+            if current is None or current.retired or not current.browser.is_connected():
+                if current is not None:
+                    current.retired = True
+                    self.restart_count += 1
+                    await self._release(current)
+                with metrics.stage('browser_launch'):
+                    browser = await self._playwright.chromium.launch(**self.launch_options)
+                metrics.BROWSER_LAUNCHES.inc()
+                self._current = _BrowserGeneration(browser)
+            return self._current
+
+    async def _release(self, generation):
+        """已退役且没有进行中页面的浏览器立即关闭"""
+        if generation.retired and generation.active == 0:
+            await generation.close()
+
+    async def _capture(self, generation, spec, html, full_page, options):
+        context = generation.contexts.get(spec)
+        if context is None:
+            width, height, scale = spec
+            context = await generation.browser.new_context(
+                viewport={'width': width, 'height': height},
+                device_scale_factor=scale,
+            )
+            await pricelist_fonts.install_async(context)
+            generation.contexts[spec] = context
+
+        page = await context.new_page()
+        try:
+            with metrics.stage('page_load'):
+                await page.set_content(html, wait_until='domcontentloaded')
+                await page.evaluate(READY_SCRIPT)
+            with metrics.stage('screenshot'):
+                image = await page.screenshot(full_page=full_page, **options)
+        finally:
+            await page.close()
+
+        generation.renders += 1
+        self.total_renders += 1
+        if self.max_renders and generation.renders >= self.max_renders:
+            generation.retired = True
+        return image
+
+
+class BrowserPoolBridge:
+    """
+    让同步代码（WSGI线程池中的请求）使用事件循环上的异步浏览器池
+
+    提供与 BrowserPool 相同的 render_html / render_many 接口
+    """
+
+    def __init__(self, pool: AsyncBrowserPool, loop: asyncio.AbstractEventLoop, timeout=None):
+        """在事件循环线程中创建"""
+        self.pool = pool
+        self.loop = loop
+        self.timeout = timeout
+        self._loop_thread = threading.get_ident()
+
+    def render_html(self, html, viewport=None, full_page=True,
+                    device_scale_factor=1, **options):
+        future = self._submit(html, viewport, full_page, device_scale_factor, options)
+        return self._wait([future], self.timeout)[0]
+
+    def render_many(self, items, timeout=None):
+        """同时提交所有渲染（由信号量限制并发），按 items 顺序返回"""
+        futures = [
+            self._submit(item['html'], item.get('viewport'), item.get('full_page', True),
+                         item.get('device_scale_factor', 1), item.get('options', {}))
+            for item in items
+        ]
+        return self._wait(futures, timeout or self.timeout)
+
+    @staticmethod
+    def _wait(futures, timeout):
+        try:
+            return [future.result(timeout) for future in futures]
+        except BaseException:
+            # 超时或失败时取消其余渲染，释放页面
+            for future in futures:
+                future.cancel()
+            raise
+
+    def _submit(self, html, viewport, full_page, device_scale_factor, options):
+        if threading.get_ident() == self._loop_thread:
+            raise RuntimeError("不能在事件循环线程中同步等待渲染结果")
+        return asyncio.run_coroutine_threadsafe(
+            self.pool.render_html(html, viewport, full_page, device_scale_factor, **options),
+            self.loop,
+        )
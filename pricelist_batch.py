@@ -0,0 +1,267 @@
+"""
+批量报价单生成
+一次读取多份报价数据（JSON/CSV），共用一个浏览器、多个页面并行截图
+"""
+import asyncio
+import csv
+import io
+import json
+import queue
+import threading
+import zipfile
+
+import pricelist_fonts
+import pricelist_metrics as metrics
+from pricelist_browser_pool import DEFAULT_VIEWPORT, READY_SCRIPT
+
+# CSV中多项字段的分隔符：  名称:金额;名称:金额   /   礼品ID;礼品ID
+ITEM_SEPARATOR = ';'
+AMOUNT_SEPARATOR = ':'
+
+_DONE = object()
+
+
+# ========== 读取报价数据 ==========
+
+def parse_json_payloads(data):
+    """JSON列表，或 {"quotes": [...]}"""
+    if isinstance(data, dict):
+        data = data.get('quotes')
+    if not isinstance(data, list):
+        raise ValueError("批量数据必须是报价列表或包含 quotes 字段的对象")
+    return data
+
+
+def _split_discounts(text):
+    discounts = []
+    for part in (text or '').split(ITEM_SEPARATOR):
+        part = part.strip()
+        if not part:
+            continue
+        name, _, amount = part.rpartition(AMOUNT_SEPARATOR)
+        if not name:
+            raise ValueError(f"优惠格式应为 名称{AMOUNT_SEPARATOR}金额: {part}")
+        discounts.append({'name': name.strip(), 'amount': amount.strip()})
+    return discounts
+
+
+def parse_csv_payloads(text):
+    """
+    CSV每行一份报价，列名与 /api/generate 的字段一致
+
+    landlord_discounts / uhomes_subsidies 写作 "名称:金额;名称:金额"，
+    selected_gifts 写作 "礼品ID;礼品ID"
+    """
+    payloads = []
+    for row in csv.DictReader(io.StringIO(text)):
+        payload = {k.strip(): (v or '').strip() for k, v in row.items() if k}
+        payload['landlord_discounts'] = _split_discounts(payload.get('landlord_discounts'))
+        payload['uhomes_subsidies'] = _split_discounts(payload.get('uhomes_subsidies'))
+        payload['selected_gifts'] = [
+            g.strip() for g in payload.get('selected_gifts', '').split(ITEM_SEPARATOR)
+            if g.strip()
+        ]
+        payloads.append(payload)
+    return payloads
+
+
+def load_payloads(text, fmt='json'):
+    """按格式解析批量报价数据"""
+    if fmt == 'csv':
+        return parse_csv_payloads(text)
+    return parse_json_payloads(json.loads(text))
+
+
+# ========== 并行渲染 ==========
+
+def render_batch(items, viewport=None, concurrency=4, device_scale_factor=1, renderer=None):
+    """
+    用一个浏览器、concurrency 个页面并行截图
+
+    Args:
+        items: [(key, html)]
+        renderer: 共享渲染器（渲染服务客户端或ASGI模式的异步浏览器池，见 get_shared_renderer）；
+            指定时每 concurrency 项一组交给它渲染，本进程不启动浏览器
+    Yields:
+        (key, PNG字节) 或 (key, 异常)，按完成顺序；单项失败不会中断批次。
+        浏览器级故障（启动失败、浏览器崩溃等）也不抛出：尚未完成的每一项都以该异常返回，
+        调用方照常得到每一项的结果和最后的汇总
+    """
+    items = list(items)
+    if renderer is not None:
+        yield from _render_shared(renderer, items, viewport or DEFAULT_VIEWPORT,
+                                  max(1, concurrency), device_scale_factor)
+        return
+
+    results = queue.Queue(maxsize=concurrency * 2)
+    stop = threading.Event()
+    failure = []
+
+    def runner():
+        try:
+            asyncio.run(_render_all(
+                items, results, stop, viewport or DEFAULT_VIEWPORT,
+                max(1, concurrency), device_scale_factor,
+            ))
+        except Exception as e:
+            failure.append(e)
+        finally:
+            results.put(_DONE)
+
+    thread = threading.Thread(target=runner, name='batch-render', daemon=True)
+    thread.start()
+
+    finished = set()
+    try:
+        while True:
+            item = results.get()
+            if item is _DONE:
+                break
+            finished.add(item[0])
+            yield item
+    finally:
+        # 消费方提前退出（如客户端断开）时，停止领取新任务并等待浏览器关闭
+        stop.set()
+        while thread.is_alive():
+            try:
+                results.get(timeout=0.1)
+            except queue.Empty:
+                pass
+
+    if failure:
+        print(f"❌ 批量截图中断: {failure[0]}")
+        for key, _ in items:
+            if key not in finished:
+                yield key, failure[0]
+
+
+def _render_shared(renderer, items, viewport, chunk_size, scale):
+    """按组调用共享渲染器的 render_many；一组中有失败时逐项重新提交，每一项得到自己的结果或异常"""
+    for start in range(0, len(items), chunk_size):
+        chunk = items[start:start + chunk_size]
+        requests = [{'html': html, 'viewport': viewport, 'device_scale_factor': scale}
+                    for _, html in chunk]
+        try:
+            outcomes = renderer.render_many(requests)
+        except Exception:
+            outcomes = []
+            for request in requests:
+                try:
+                    outcomes.append(renderer.render_html(**request))
+                except Exception as e:
+                    outcomes.append(e)
+        for (key, _), outcome in zip(chunk, outcomes):
+            yield key, outcome
+
+
+async def _render_all(items, results, stop, viewport, concurrency, scale):
+    from playwright.async_api import async_playwright
+
+    loop = asyncio.get_running_loop()
+    pending = asyncio.Queue()
+    for item in items:
+        pending.put_nowait(item)
+
+    async with async_playwright() as p:
+        with metrics.stage('browser_launch'):
+            browser = await p.chromium.launch()
+        metrics.BROWSER_LAUNCHES.inc()
+        try:
+            context = await browser.new_context(
+                viewport=viewport, device_scale_factor=scale,
+            )
+            # 与浏览器池相同：样式表 @font-face 指向的字体子集由路由直接返回
+            await pricelist_fonts.install_async(context)
+
+            async def worker():
+                page = await context.new_page()
+                while not pending.empty() and not stop.is_set():
+                    key, html = pending.get_nowait()
+                    try:
+                        with metrics.stage('page_load'):
+                            await page.set_content(html, wait_until='domcontentloaded')
+                            await page.evaluate(READY_SCRIPT)
+                        with metrics.stage('screenshot'):
+                            outcome = await page.screenshot(full_page=True)
+                    except Exception as e:
+                        outcome = e
+                        if page.is_closed():
+                            page = await context.new_page()
+                    # 结果队列有界，消费方处理不过来时在线程池中等待
+                    await loop.run_in_executor(None, results.put, (key, outcome))
+
+            await asyncio.gather(*(worker() for _ in range(concurrency)))
+        finally:
+            await browser.close()
+
+
+# ========== 输出 ==========
+
+class _ChunkBuffer:
+    """只追加的写缓冲，供zipfile流式写出（不可seek）"""
+
+    def __init__(self):
+        self._chunks = []
+        self._offset = 0
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._offset += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._offset
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def iter_zip(entries):
+    """
+    把 (文件名, 字节) 流式打包成ZIP
+
+    每写完一个文件就输出已生成的字节，不需要在内存中保留整个压缩包
+    """
+    buffer = _ChunkBuffer()
+    with zipfile.ZipFile(buffer, 'w', compression=zipfile.ZIP_DEFLATED) as zf:
+        for name, data in entries:
+            # PNG本身已压缩，直接存储
+            compress = zipfile.ZIP_STORED if name.endswith('.png') else zipfile.ZIP_DEFLATED
+            zf.writestr(name, data, compress_type=compress)
+            chunk = buffer.drain()
+            if chunk:
+                yield chunk
+    chunk = buffer.drain()
+    if chunk:
+        yield chunk
+
+
+def ndjson_line(record) -> str:
+    """NDJSON单行"""
+    return json.dumps(record, ensure_ascii=False) + '\n'
+
+
+def manifest_record(item, basename=None) -> dict:
+    """批量结果项的清单记录（不含HTML/PNG内容）"""
+    record = {k: item[k] for k in ('index', 'status', 'summary', 'cached', 'error') if k in item}
+    if item['status'] == 'ok' and basename:
+        record['html_file'] = f"{basename}.html"
+        record['png_file'] = f"{basename}.png"
+    return record
+
+
+def zip_entries(results):
+    """批量结果 -> ZIP条目：每份报价的HTML/PNG，最后是 manifest.ndjson"""
+    manifest = []
+    for item in results:
+        record = manifest_record(item, f"quote_{item['index']:04d}")
+        if item['status'] == 'ok':
+            yield record['html_file'], item['html'].encode('utf-8')
+            yield record['png_file'], item['png']
+        manifest.append(ndjson_line(record))
+    yield 'manifest.ndjson', ''.join(manifest).encode('utf-8')
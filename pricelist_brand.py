@@ -0,0 +1,37 @@
+"""
+品牌配置加载
+pricelist-brand_config.py 文件名含连字符，不能直接import，这里按路径加载并在文件变化时重新加载
+"""
+import importlib.util
+import os
+import threading
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+BRAND_CONFIG_FILE = os.path.join(BASE_DIR, 'pricelist-brand_config.py')
+
+_module = None
+_stamp = None
+_lock = threading.Lock()
+
+
+def load_brand_module():
+    """加载品牌配置模块（文件未变化时直接返回已加载的模块）"""
+    global _module, _stamp
+
+    st = os.stat(BRAND_CONFIG_FILE)
+    stamp = (st.st_mtime_ns, st.st_size)
+    if stamp == _stamp:
+        return _module
+
+    with _lock:
+        if stamp != _stamp:
+            spec = importlib.util.spec_from_file_location('pricelist_brand_config', BRAND_CONFIG_FILE)
+            module = importlib.util.module_from_spec(spec)
+            spec.loader.exec_module(module)
+            _module, _stamp = module, stamp
+    return _module
+
+
+def get_wechat_share() -> dict:
+    """微信分享图配置（WECHAT_SHARE）"""
+    return dict(load_brand_module().WECHAT_SHARE)
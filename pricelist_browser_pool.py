@@ -0,0 +1,427 @@
+"""
+浏览器池 - 进程内常驻Chromium
+每个进程只启动一次浏览器，按视口复用页面，避免每次渲染都冷启动
+"""
+import atexit
+import os
+import queue
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+from typing import Optional, Protocol
+
+from playwright.sync_api import sync_playwright, Error as PlaywrightError
+
+import pricelist_fonts
+import pricelist_metrics as metrics
+
+# 等待一次渲染结果的默认超时（秒），浏览器线程卡住时请求不会永远挂起
+RENDER_TIMEOUT = 60
+
+# 默认视口（微信标准宽度）
+DEFAULT_VIEWPORT = {'width': 375, 'height': 1500}
+
+# 渲染就绪信号：字体加载完成且所有图片已加载（成功或失败）
+READY_SCRIPT = """() => Promise.all([
+    document.fonts.ready,
+    ...Array.from(document.images)
+        .filter(img => !img.complete)
+        .map(img => new Promise(resolve => { img.onload = img.onerror = resolve; })),
+]).then(() => true)"""
+
+
+class BrowserPool:
+    """
+    进程级浏览器池
+
+    Playwright同步API只能在创建它的线程中使用，所以浏览器由一个专属线程持有，
+    其他线程通过任务队列提交渲染任务并等待结果。
+
+    - 按 (宽, 高, 缩放) 复用上下文和页面，最多保留 max_pages 个
+    - 渲染 max_renders 次后回收浏览器，防止内存持续增长
+    - 浏览器断开或页面崩溃时自动重启并重试一次
+    - Playwright 启动失败或线程异常退出时，排队中的任务立即以该异常失败，下次提交时重新启动线程
+    - 等待结果默认最多 timeout 秒
+    """
+
+    def __init__(self, max_pages=4, max_renders=200, launch_options=None, timeout=RENDER_TIMEOUT):
+        self.max_pages = max(1, max_pages)
+        self.max_renders = max_renders
+        self.launch_options = launch_options or {}
+        self.timeout = timeout
+
+        self.render_count = 0    # 当前浏览器已渲染次数
+        self.total_renders = 0   # 累计渲染次数
+        self.restart_count = 0   # 浏览器重启次数
+
+        self._tasks = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+        self._closed = False
+
+        # 以下属性只在专属线程中访问
+        self._playwright = None
+        self._browser = None
+        self._pages = OrderedDict()  # spec -> (context, page)
+        self._crashed = set()
+
+    # ========== 对外接口 ==========
+
+    def run(self, fn, viewport=None, device_scale_factor=1, timeout=None):
+        """
+        在池中的页面上执行 fn(page)，返回其结果
+
+        Args:
+            fn: 接收Playwright Page的回调，在浏览器线程中执行
+            viewport: 视口 {'width', 'height'}，默认375×1500
+            device_scale_factor: 设备像素比
+            timeout: 等待结果的超时秒数（默认为池的 timeout）
+        """
+        return self._result(self.submit(fn, viewport, device_scale_factor), timeout)
+
+    def submit(self, fn, viewport=None, device_scale_factor=1) -> Future:
+        """提交 fn(page) 到浏览器线程，立即返回Future"""
+        viewport = viewport or DEFAULT_VIEWPORT
+        spec = (viewport['width'], viewport['height'], device_scale_factor)
+        future = Future()
+
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("浏览器池已关闭")
+            self._ensure_thread()
+            self._tasks.put((fn, spec, future))
+
+        return future
+
+    def screenshot(self, url, path=None, viewport=None, full_page=True,
+                   wait_until='networkidle', **options):
+        """加载URL并截图，返回PNG字节（指定path时同时写入文件）"""
+        def capture(page):
+            page.goto(url, wait_until=wait_until)
+            return page.screenshot(path=path, full_page=full_page, **options)
+
+        return self.run(capture, viewport=viewport)
+
+    def render_html(self, html, viewport=None, full_page=True,
+                    device_scale_factor=1, **options):
+        """
+        直接把HTML字符串载入页面并截图，返回图片字节
+
+        不经过磁盘文件，也不等待networkidle，而是等待字体和图片就绪
+        """
+        return self.run(_capture_html(html, full_page, options), viewport=viewport,
+                        device_scale_factor=device_scale_factor)
+
+    def render_many(self, items, timeout=None):
+        """
+        一次提交多个渲染，返回与 items 顺序一致的图片字节列表
+
+        Args:
+            items: [{'html', 'viewport', 'full_page', 'device_scale_factor', 'options'}]
+
+        所有任务连续进入浏览器线程，共用同一个浏览器和按视口复用的页面；
+        任一渲染失败时抛出该异常（timeout 为每项的等待时间，默认为池的 timeout）
+        """
+        futures = [
+            self.submit(
+                _capture_html(item['html'], item.get('full_page', True), item.get('options', {})),
+                viewport=item.get('viewport'),
+                device_scale_factor=item.get('device_scale_factor', 1),
+            )
+            for item in items
+        ]
+        try:
+            return [self._result(future, timeout) for future in futures]
+        finally:
+            for future in futures:
+                future.cancel()     # 已失败时不再渲染剩下的
+
+    def _result(self, future, timeout):
+        try:
+            return future.result(self.timeout if timeout is None else timeout)
+        except FutureTimeout:
+            future.cancel()     # 还没开始的任务不再执行
+            raise TimeoutError(f"浏览器渲染超时（{self.timeout if timeout is None else timeout}秒）") from None
+
+    def health(self, timeout=10):
+        """健康检查：在浏览器中执行一段脚本，返回池状态"""
+        ok = True
+        error = None
+        try:
+            self.run(lambda page: page.evaluate("1 + 1"), timeout=timeout)
+        except Exception as e:
+            ok = False
+            error = str(e)
+
+        return {
+            'ok': ok,
+            'error': error,
+            'pages': len(self._pages),
+            'render_count': self.render_count,
+            'total_renders': self.total_renders,
+            'restart_count': self.restart_count,
+        }
+
+    def close(self):
+        """关闭浏览器和专属线程"""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            thread = self._thread
+
+        if thread is not None and thread.is_alive():
+            self._tasks.put(None)
+            thread.join(timeout=10)
+
+    # ========== 专属线程 ==========
+
+    def _ensure_thread(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(
+                target=self._serve, name='browser-pool', daemon=True
+            )
+            self._thread.start()
+
+    def _serve(self):
+        """浏览器线程主循环（线程退出前让所有排队中的任务失败，不留下永远等待的Future）"""
+        error = None
+        try:
+            self._playwright = sync_playwright().start()
+            self._loop()
+        except BaseException as e:
+            error = e
+            print(f"❌ 浏览器线程异常退出: {e}")
+        finally:
+            try:
+                self._close_browser()
+                if self._playwright is not None:
+                    self._playwright.stop()
+            except Exception as e:
+                print(f"⚠️ 关闭浏览器失败: {e}")
+            self._playwright = None
+            self._fail_pending(error or RuntimeError("浏览器池已关闭"))
+
+    def _loop(self):
+        while True:
+            item = self._tasks.get()
+            if item is None:
+                return
+
+            fn, spec, future = item
+            if not future.set_running_or_notify_cancel():
+                continue
+
+            try:
+                result = self._execute(fn, spec)
+            except BaseException as e:
+                future.set_exception(e)
+            else:
+                future.set_result(result)
+
+    def _fail_pending(self, error):
+        """
+        清空任务队列并让其中的任务以 error 失败
+
+        持锁进行并清除线程引用：之后提交的任务会启动新线程（重新启动Playwright），
+        不会落在已退出线程的队列里
+        """
+        with self._lock:
+            while True:
+                try:
+                    item = self._tasks.get_nowait()
+                except queue.Empty:
+                    break
+                if item is not None and item[2].set_running_or_notify_cancel():
+                    item[2].set_exception(error)
+            if self._thread is threading.current_thread():
+                self._thread = None
+
+    def _execute(self, fn, spec):
+        """执行一次渲染，浏览器崩溃时重启并重试一次"""
+        for attempt in range(2):
+            page = self._get_page(spec)
+            try:
+                result = fn(page)
+            except PlaywrightError:
+                if attempt == 0 and not self._is_healthy(spec):
+                    print("⚠️ 浏览器异常，正在重启...")
+                    self._restart_browser()
+                    continue
+                # 普通错误（超时、脚本错误等）：丢弃该页面，避免残留状态
+                self._drop_page(spec)
+                raise
+            else:
+                self._after_render()
+                return result
+
+    def _after_render(self):
+        self.render_count += 1
+        self.total_renders += 1
+        if self.max_renders and self.render_count >= self.max_renders:
+            # 达到回收阈值，下次渲染时重新启动
+            self._close_browser()
+
+    def _is_healthy(self, spec):
+        if self._browser is None or not self._browser.is_connected():
+            return False
+        entry = self._pages.get(spec)
+        if entry is None:
+            return True
+        _, page = entry
+        return not page.is_closed() and id(page) not in self._crashed
+
+    def _launch_browser(self):
+        with metrics.stage('browser_launch'):
+            self._browser = self._playwright.chromium.launch(**self.launch_options)
+        metrics.BROWSER_LAUNCHES.inc()
+        self.render_count = 0
+
+    def _restart_browser(self):
+        self._close_browser()
+        self._launch_browser()
+        self.restart_count += 1
+
+    def _close_browser(self):
+        self._pages.clear()
+        self._crashed.clear()
+        if self._browser is not None:
+            try:
+                self._browser.close()
+            except PlaywrightError:
+                pass
+            self._browser = None
+
+    def _get_page(self, spec):
+        """获取指定视口的页面，必要时启动浏览器或新建页面"""
+        if self._browser is None or not self._browser.is_connected():
+            if self._browser is not None:
+                self.restart_count += 1
+            self._close_browser()
+            self._launch_browser()
+
+        entry = self._pages.get(spec)
+        if entry is not None:
+            _, page = entry
+            if not page.is_closed() and id(page) not in self._crashed:
+                self._pages.move_to_end(spec)
+                return page
+            self._drop_page(spec)
+
+        width, height, scale = spec
+        context = self._browser.new_context(
+            viewport={'width': width, 'height': height},
+            device_scale_factor=scale,
+        )
+        pricelist_fonts.install(context)
+        page = context.new_page()
+        page.on('crash', lambda p: self._crashed.add(id(p)))
+        self._pages[spec] = (context, page)
+
+        # 超出上限时关闭最久未使用的页面
+        while len(self._pages) > self.max_pages:
+            oldest = next(iter(self._pages))
+            self._drop_page(oldest)
+
+        return page
+
+    def _drop_page(self, spec):
+        entry = self._pages.pop(spec, None)
+        if entry is None:
+            return
+        context, page = entry
+        self._crashed.discard(id(page))
+        try:
+            context.close()
+        except PlaywrightError:
+            pass
+
+
+def _capture_html(html, full_page, options):
+    def capture(page):
+        with metrics.stage('page_load'):
+            page.set_content(html, wait_until='domcontentloaded')
+            page.evaluate(READY_SCRIPT)
+        with metrics.stage('screenshot'):
+            return page.screenshot(full_page=full_page, **options)
+    return capture
+
+
+class Renderer(Protocol):
+    """
+    HTML截图接口：BrowserPool、BrowserPoolBridge（ASGI模式）、RenderClient（渲染服务）都提供
+
+    只有本进程的 BrowserPool 能按URL截图（screenshot）
+    """
+
+    def render_html(self, html, viewport=None, full_page=True,
+                    device_scale_factor=1, **options) -> bytes: ...
+
+    def render_many(self, items, timeout=None) -> list: ...
+
+
+# ========== 进程级单例 ==========
+
+_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+_override = None
+
+
+def set_browser_pool(pool):
+    """
+    替换当前进程使用的浏览器池（ASGI模式换成异步浏览器池的同步接口）
+
+    pool 需提供 render_html / render_many；传入None恢复默认
+    """
+    global _override
+    _override = pool
+
+
+def get_shared_renderer() -> Optional[Renderer]:
+    """
+    当前进程共享的外部渲染器：ASGI模式的异步浏览器池，或配置了 RENDER_SERVICE_URL 时的渲染服务客户端
+
+    都没有时返回None，由本进程的 BrowserPool 渲染
+    """
+    if _override is not None:
+        return _override
+
+    from pricelist_render_service import get_render_client
+    return get_render_client()
+
+
+def get_local_browser_pool() -> BrowserPool:
+    """本进程的浏览器池（fork后的子进程会重新创建），不经过渲染服务"""
+    global _pool, _pool_pid
+
+    with _pool_lock:
+        if _pool is None or _pool_pid != os.getpid():
+            _pool = BrowserPool(
+                max_pages=int(os.getenv('BROWSER_POOL_MAX_PAGES', 4)),
+                max_renders=int(os.getenv('BROWSER_MAX_RENDERS', 200)),
+                timeout=float(os.getenv('RENDER_TIMEOUT', RENDER_TIMEOUT)),
+            )
+            _pool_pid = os.getpid()
+        return _pool
+
+
+def get_browser_pool() -> Renderer:
+    """
+    获取当前进程用于HTML截图的渲染器
+
+    配置了 RENDER_SERVICE_URL 时返回渲染服务客户端，本进程不启动浏览器；
+    需要按URL截图（screenshot）时使用 get_local_browser_pool()
+    """
+    renderer = get_shared_renderer()
+    if renderer is not None:
+        return renderer
+    return get_local_browser_pool()
+
+
+def _close_pool():
+    if _pool is not None and _pool_pid == os.getpid():
+        _pool.close()
+
+
+atexit.register(_close_pool)
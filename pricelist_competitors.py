@@ -0,0 +1,199 @@
+"""
+竞对价格库 - 按房源和户型索引的竞对价格记录（SQLite，只追加）
+顾问不再在每份报价中手填竞对价格：价格记录一次写入价格库，生成报价时按房源和户型自动带出
+
+    - 每个平台只取时间窗口内最新的一条，作为报价单的竞对价格（最低价、价格优势由报价单汇总计算）
+    - 时间窗口内的最低价、中位数由 (房源, 户型, 币种, 年租金) 索引直接查出，不扫描全表
+    - 房源名和户型忽略大小写和多余空格，"iQ  Shoreditch" 与 "iq shoreditch" 是同一套房源
+"""
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import List, Optional
+
+from pricelist_models import CompetitorPrice
+from pricelist_money import DEFAULT_CURRENCY, Money, div_round
+
+WINDOW_DAYS = 30    # 默认只使用最近30天的价格
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS competitor_prices (
+    id INTEGER PRIMARY KEY,
+    property_key TEXT NOT NULL,
+    room_key TEXT NOT NULL,
+    platform TEXT NOT NULL,
+    currency TEXT NOT NULL,
+    weekly_pence INTEGER NOT NULL,
+    annual_pence INTEGER NOT NULL,
+    url TEXT,
+    observed_at INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS competitor_prices_latest
+    ON competitor_prices (property_key, room_key, currency, platform, observed_at);
+CREATE INDEX IF NOT EXISTS competitor_prices_annual
+    ON competitor_prices (property_key, room_key, currency, annual_pence, observed_at);
+"""
+
+
+def normalize_key(text: str) -> str:
+    """房源名/户型 -> 索引键（忽略大小写和多余空格）"""
+    return ' '.join(text.split()).casefold()
+
+
+@dataclass(frozen=True)
+class CompetitorStats:
+    """时间窗口内的竞对价格统计（年租金）"""
+    count: int
+    platforms: int
+    lowest: Optional[Money]
+    median: Optional[Money]
+    since: datetime
+
+    def to_dict(self) -> dict:
+        return {
+            'count': self.count,
+            'platforms': self.platforms,
+            'lowest_annual_price': None if self.lowest is None else float(self.lowest),
+            'median_annual_price': None if self.median is None else float(self.median),
+            'since': self.since.isoformat(timespec='seconds'),
+        }
+
+
+class CompetitorStore:
+    """
+    竞对价格库
+
+    每个线程一个SQLite连接（fork后的子进程重新连接）；WAL模式下多个gunicorn worker
+    可以同时读，写入只是追加一行
+    """
+
+    def __init__(self, path, window_days: int = WINDOW_DAYS):
+        self.path = path
+        self.window_days = window_days
+        self._local = threading.local()
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(_SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def _since(self, days: Optional[int]) -> int:
+        return int(time.time()) - (self.window_days if days is None else days) * 86400
+
+    # ========== 写入 ==========
+
+    def record(self, property_name: str, room_type: str, price: CompetitorPrice,
+               observed_at: Optional[datetime] = None):
+        """记录一条竞对价格（observed_at 默认为当前时间）"""
+        self.record_many([(property_name, room_type, price, observed_at)])
+
+    def record_many(self, rows) -> int:
+        """批量记录 (房源名, 户型, CompetitorPrice, 采集时间或None)，在一个事务中写入，返回条数"""
+        now = int(time.time())
+        values = []
+        for property_name, room_type, price, observed_at in rows:
+            if price.weekly_price.currency != price.annual_price.currency:
+                raise ValueError(f"竞对价格币种不一致: {price.platform}")
+            values.append((
+                normalize_key(property_name),
+                normalize_key(room_type),
+                price.platform,
+                price.annual_price.currency,
+                price.weekly_price.pence,
+                price.annual_price.pence,
+                price.url,
+                now if observed_at is None else int(observed_at.timestamp()),
+            ))
+        with self._connect() as conn:
+            conn.executemany(
+                'INSERT INTO competitor_prices (property_key, room_key, platform, currency,'
+                ' weekly_pence, annual_pence, url, observed_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                values,
+            )
+        return len(values)
+
+    # ========== 查询 ==========
+
+    def latest(self, property_name: str, room_type: str, currency: str = DEFAULT_CURRENCY,
+               days: Optional[int] = None) -> List[CompetitorPrice]:
+        """时间窗口内每个平台最新的一条价格，按年租金从低到高排列"""
+        # SQLite 中与 MAX() 一起查询的其他列取自最大值所在的那一行
+        rows = self._connect().execute(
+            'SELECT platform, weekly_pence, annual_pence, url, MAX(observed_at)'
+            ' FROM competitor_prices'
+            ' WHERE property_key = ? AND room_key = ? AND currency = ? AND observed_at >= ?'
+            ' GROUP BY platform',
+            (normalize_key(property_name), normalize_key(room_type), currency, self._since(days)),
+        ).fetchall()
+        prices = [
+            CompetitorPrice(platform, Money(weekly, currency), Money(annual, currency), url)
+            for platform, weekly, annual, url, _ in rows
+        ]
+        prices.sort(key=lambda p: (p.annual_price.pence, p.platform))
+        return prices
+
+    def stats(self, property_name: str, room_type: str, currency: str = DEFAULT_CURRENCY,
+              days: Optional[int] = None) -> CompetitorStats:
+        """时间窗口内全部记录的年租金最低价和中位数（偶数条时取中间两条的平均，四舍五入到便士）"""
+        since = self._since(days)
+        key = (normalize_key(property_name), normalize_key(room_type), currency, since)
+        where = ' WHERE property_key = ? AND room_key = ? AND currency = ? AND observed_at >= ?'
+        conn = self._connect()
+
+        count, platforms, lowest = conn.execute(
+            'SELECT COUNT(*), COUNT(DISTINCT platform), MIN(annual_pence) FROM competitor_prices' + where,
+            key,
+        ).fetchone()
+
+        median = None
+        if count:
+            middle = [row[0] for row in conn.execute(
+                'SELECT annual_pence FROM competitor_prices' + where +
+                ' ORDER BY annual_pence LIMIT ? OFFSET ?',
+                key + (2 - count % 2, (count - 1) // 2),
+            )]
+            median = Money(div_round(sum(middle), len(middle)), currency)
+
+        return CompetitorStats(
+            count=count,
+            platforms=platforms,
+            lowest=None if lowest is None else Money(lowest, currency),
+            median=median,
+            since=datetime.fromtimestamp(since),
+        )
+
+
+# ========== 进程级单例 ==========
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_competitor_store() -> CompetitorStore:
+    """获取竞对价格库（路径和时间窗口由环境变量配置）"""
+    global _store
+
+    with _store_lock:
+        if _store is None:
+            _store = CompetitorStore(
+                os.getenv(
+                    'COMPETITOR_DB',
+                    os.path.join(tempfile.gettempdir(), 'pricelist-competitors.db'),
+                ),
+                window_days=int(os.getenv('COMPETITOR_WINDOW_DAYS', WINDOW_DAYS)),
+            )
+    return _store
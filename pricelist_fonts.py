@@ -0,0 +1,275 @@
+"""
+报价单字体 - 按实际用到的字符裁剪中文字体，嵌入截图用的浏览器上下文
+服务器没有模板里写的 SF Pro / 苹方，Chromium 每次渲染都要逐个回退查找字体，不同机器的效果也不一样；
+这里把模板、样式、礼品库和品牌配置中出现的字符从中文字体（与光栅渲染相同，见 pricelist_raster）
+裁剪成 WOFF2，以 "Pricelist Sans" 字体族写进样式表，浏览器上下文通过路由直接返回字体数据
+
+    - 子集按源文件内容哈希命名，缓存在 FONT_CACHE_DIR（多进程共享，重启后不用重新裁剪）
+    - 用户输入中子集没有的字，按样式表中后面的字体族回退
+    - 没有中文字体或未安装 fontTools 时不嵌入字体，渲染效果与之前相同
+"""
+import asyncio
+import glob
+import hashlib
+import io
+import os
+import tempfile
+import threading
+import time
+from dataclasses import dataclass
+
+import pricelist_raster
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+FONT_FAMILY = 'Pricelist Sans'
+
+# 只在浏览器上下文内由路由响应的地址（.invalid 域名不会真正发出请求）
+FONT_URL = 'https://fonts.pricelist.invalid/'
+
+CACHE_DIR = os.getenv(
+    'FONT_CACHE_DIR',
+    os.path.join(tempfile.gettempdir(), 'pricelist-fonts'),
+)
+
+# 收集字符的源文件
+TEXT_SOURCES = (
+    'pricelist-quote*.html',
+    'pricelist-quote*.css',
+    'pricelist-gift_library.yaml',
+    'pricelist-brand_config.py',
+)
+
+# 金额、日期和常用标点（用户输入的英文地址、数字等都能命中子集）
+EXTRA_CHARS = ''.join(chr(code) for code in range(0x20, 0x7F)) + '£¥€…—–·•×（）：，。！？、“”‘’《》【】'
+
+# 两次检查字符源文件是否变化的最短间隔（秒），渲染时不用每次都扫描源文件
+CHECK_INTERVAL = float(os.getenv('FONT_CHECK_INTERVAL', 5))
+
+# 字重 -> CSS font-weight 范围
+WEIGHTS = {
+    'regular': '100 500',
+    'bold': '600 900',
+}
+
+
+@dataclass(frozen=True)
+class FontSubset:
+    """一个字重的字体子集"""
+    weight: str
+    source: str       # 原字体文件
+    key: str          # 源字体和字符集的哈希
+    flavor: str       # woff2 / woff
+
+    @property
+    def filename(self) -> str:
+        return f"pricelist-sans-{self.weight}.{self.key}.{self.flavor}"
+
+    @property
+    def url(self) -> str:
+        return FONT_URL + self.filename
+
+    @property
+    def content_type(self) -> str:
+        return f"font/{self.flavor}"
+
+
+_state = None       # (源文件版本, {字重: FontSubset}, 子集版本)
+_checked = 0.0      # 上次检查源文件的时间（time.monotonic）
+_data = {}          # 文件名 -> 字体字节
+_lock = threading.Lock()
+_data_lock = threading.Lock()
+
+
+# ========== 字符集 ==========
+
+def _source_files():
+    files = []
+    for pattern in TEXT_SOURCES:
+        files.extend(sorted(glob.glob(os.path.join(BASE_DIR, pattern))))
+    return files
+
+
+def _version():
+    stamps = []
+    for path in _source_files():
+        st = os.stat(path)
+        stamps.append((path, st.st_mtime_ns, st.st_size))
+    return tuple(stamps)
+
+
+def glyph_text() -> str:
+    """子集包含的全部字符（不含emoji，emoji由系统彩色字体绘制）"""
+    chars = set(EXTRA_CHARS)
+    for path in _source_files():
+        with open(path, encoding='utf-8') as f:
+            chars.update(f.read())
+    return ''.join(sorted(c for c in chars if c.isprintable() and not pricelist_raster.is_emoji(c)))
+
+
+# ========== 子集 ==========
+
+def _flavor():
+    try:
+        import brotli  # noqa: F401  WOFF2 压缩需要
+        return 'woff2'
+    except ImportError:
+        return 'woff'
+
+
+def _available():
+    try:
+        import fontTools.subset  # noqa: F401
+    except ImportError:
+        return False
+    return pricelist_raster.available()
+
+
+def get_subsets() -> dict:
+    """当前的字体子集 {字重: FontSubset}；没有可用字体时为空（最多每 CHECK_INTERVAL 秒检查一次源文件）"""
+    global _state, _checked
+
+    state = _state
+    now = time.monotonic()
+    if state is not None and now - _checked < CHECK_INTERVAL:
+        return state[1]
+
+    version = _version()
+    _checked = now
+    if state is not None and state[0] == version:
+        return state[1]
+
+    with _lock:
+        if _state is None or _state[0] != version:
+            subsets = {}
+            if _available():
+                text = glyph_text()
+                flavor = _flavor()
+                paths = pricelist_raster.font_paths()
+                for weight in WEIGHTS:
+                    source = paths[weight]
+                    if weight != 'regular' and source == paths['regular']:
+                        continue   # 没有单独的粗体时由浏览器加粗
+                    st = os.stat(source)
+                    digest = hashlib.sha256(
+                        f"{source}|{st.st_mtime_ns}|{st.st_size}|{flavor}|{text}".encode('utf-8')
+                    ).hexdigest()[:16]
+                    subsets[weight] = FontSubset(weight, source, digest, flavor)
+            _state = (version, subsets, ','.join(subset.key for subset in subsets.values()))
+        return _state[1]
+
+
+def _build(subset: FontSubset) -> bytes:
+    from fontTools import subset as ft_subset
+
+    options = ft_subset.Options()
+    options.flavor = subset.flavor
+    options.font_number = pricelist_raster.face_index(subset.source)
+    options.layout_features = ['*']
+    options.notdef_outline = True
+
+    font = ft_subset.load_font(subset.source, options)
+    subsetter = ft_subset.Subsetter(options)
+    subsetter.populate(text=glyph_text())
+    subsetter.subset(font)
+
+    buffer = io.BytesIO()
+    ft_subset.save_font(font, buffer, options)
+    return buffer.getvalue()
+
+
+def font_data(subset: FontSubset) -> bytes:
+    """子集字体字节（进程内缓存 -> 磁盘缓存 -> 裁剪）"""
+    data = _data.get(subset.filename)
+    if data is not None:
+        return data
+
+    current = {s.filename for s in get_subsets().values()}
+    with _data_lock:
+        data = _data.get(subset.filename)
+        if data is not None:
+            return data
+
+        path = os.path.join(CACHE_DIR, subset.filename)
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+        except OSError:
+            print(f"🔤 正在裁剪字体: {os.path.basename(subset.source)} ({subset.weight})")
+            data = _build(subset)
+            os.makedirs(CACHE_DIR, exist_ok=True)
+            tmp = f"{path}.{os.getpid()}.tmp"
+            with open(tmp, 'wb') as f:
+                f.write(data)
+            os.replace(tmp, path)
+
+        # 字符集变化后旧子集不再使用
+        for filename in [name for name in _data if name not in current]:
+            del _data[filename]
+        _data[subset.filename] = data
+        return data
+
+
+def _by_filename(filename):
+    for subset in get_subsets().values():
+        if subset.filename == filename:
+            return subset
+    return None
+
+
+def preload() -> dict:
+    """生成全部子集（启动预热用），返回 {字重: 字节数}"""
+    subsets = get_subsets()
+    return {weight: len(font_data(subset)) for weight, subset in subsets.items()}
+
+
+# ========== 样式表 ==========
+
+def font_face_css() -> str:
+    """Pricelist Sans 的 @font-face 声明；没有可用字体时为空字符串"""
+    rules = []
+    for weight, subset in get_subsets().items():
+        rules.append(
+            f"@font-face{{font-family:'{FONT_FAMILY}';"
+            f"src:url('{subset.url}') format('{subset.flavor}');"
+            f"font-weight:{WEIGHTS[weight]};font-display:block}}"
+        )
+    return ''.join(rules)
+
+
+def version() -> str:
+    """影响 @font-face 声明的版本（样式表缓存用），字体子集重新生成时才变化"""
+    get_subsets()
+    return _state[2]
+
+
+# ========== 浏览器上下文 ==========
+
+def _response(route):
+    filename = route.request.url[len(FONT_URL):]
+    subset = _by_filename(filename)
+    if subset is None:
+        return {'status': 404, 'body': b''}
+    return {
+        'status': 200,
+        'body': font_data(subset),
+        'headers': {
+            'Content-Type': subset.content_type,
+            'Access-Control-Allow-Origin': '*',
+            'Cache-Control': 'public, max-age=31536000, immutable',
+        },
+    }
+
+
+def install(context):
+    """在同步 Playwright 上下文中注册字体路由（每个上下文一次）"""
+    context.route(FONT_URL + '**', lambda route: route.fulfill(**_response(route)))
+
+
+async def install_async(context):
+    """在异步 Playwright 上下文中注册字体路由（每个上下文一次）"""
+    async def handle(route):
+        # 首次请求可能需要裁剪字体，不阻塞事件循环
+        response = await asyncio.get_running_loop().run_in_executor(None, _response, route)
+        await route.fulfill(**response)
+    await context.route(FONT_URL + '**', handle)
@@ -0,0 +1,310 @@
+"""
+礼品组合推荐 - 在异乡好居预算内挑选总价值最高的礼品组合
+例如"£500预算内，至少一项现金类和一项服务类"：
+
+    - 带类别下限的0-1背包（价值即成本，目标是在预算内价值最大），分支定界精确求解；
+      礼品按价值从高到低搜索，上界为 min(预算, 已选价值 + 剩余礼品价值)，
+      剩余礼品凑不齐类别下限或最便宜的凑法超出预算时剪枝
+    - 当前礼品库（十几项）几毫秒内穷尽；礼品很多时在时间预算内返回已找到的最优组合（exact 为 False）
+    - 免费礼品（价值为0）默认加入每个组合，也计入类别下限
+    - 常用预算档位按礼品库版本预先算好，礼品库YAML变化后重新计算
+"""
+import heapq
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+
+from pricelist_models import Gift, QuoteData
+from pricelist_money import DEFAULT_CURRENCY, Money
+from pricelist_pricing import summarize
+
+BUDGET_TIERS = (300, 400, 500, 800)            # 预先计算的预算档位（英镑）
+DEFAULT_REQUIREMENTS = {'cash': 1, 'service': 1}
+DEFAULT_TOP = 5
+TIME_BUDGET = 0.2                              # 单次求解的时间预算（秒）
+MAX_CACHED = 256                               # 按需求解结果的缓存条数
+
+
+class _Timeout(Exception):
+    pass
+
+
+@dataclass(frozen=True)
+class GiftBundle:
+    """一个礼品组合"""
+    gifts: Tuple[Gift, ...]     # 按礼品库排序
+    value: Money
+
+    @property
+    def gift_ids(self) -> list:
+        return [g.id for g in self.gifts]
+
+    @property
+    def categories(self) -> Dict[str, int]:
+        counts = {}
+        for gift in self.gifts:
+            counts[gift.category.value] = counts.get(gift.category.value, 0) + 1
+        return counts
+
+    def to_dict(self, budget: Money) -> dict:
+        return {
+            'gift_ids': self.gift_ids,
+            'gifts': [{'id': g.id, 'name': g.name, 'value': float(g.value),
+                       'category': g.category.value, 'icon': g.icon} for g in self.gifts],
+            'total_value': float(self.value),
+            'remaining_budget': float(budget - self.value),
+            'categories': self.categories,
+        }
+
+
+@dataclass(frozen=True)
+class BundleResult:
+    """一次求解的结果（bundles 按价值从高到低排列）"""
+    budget: Money
+    requirements: Tuple[Tuple[str, int], ...]
+    bundles: Tuple[GiftBundle, ...]
+    exact: bool                 # False 表示超出时间预算，返回的是已找到的最优组合
+    nodes: int
+    seconds: float
+
+    def to_dict(self) -> dict:
+        return {
+            'budget': float(self.budget),
+            'currency': self.budget.currency,
+            'requirements': dict(self.requirements),
+            'exact': self.exact,
+            'bundles': [b.to_dict(self.budget) for b in self.bundles],
+        }
+
+
+def solve(gifts, budget: Money, requirements=None, top: int = DEFAULT_TOP,
+          max_items: Optional[int] = None, include_free: bool = True,
+          time_budget: float = TIME_BUDGET) -> BundleResult:
+    """
+    在预算内搜索总价值最高的 top 个礼品组合
+
+    Args:
+        gifts: 候选礼品（币种与预算不同的忽略）
+        budget: 礼品总价值上限
+        requirements: 类别 -> 至少几项，如 {'cash': 1, 'service': 1}
+        top: 返回的组合数
+        max_items: 每个组合最多几项礼品（None 不限，免费礼品不计）
+        include_free: 免费礼品是否加入每个组合
+        time_budget: 搜索时间上限（秒）
+
+    同价值的组合收费礼品少的排在前面，件数也相同时按礼品库顺序（逐项比较，靠前的在前）
+    """
+    started = time.perf_counter()
+    requirements = DEFAULT_REQUIREMENTS if requirements is None else requirements
+    currency = budget.currency
+    candidates = [g for g in gifts if g.value.currency == currency]
+    free = [g for g in candidates if g.value.pence == 0] if include_free else []
+    paid = [(position, g) for position, g in enumerate(candidates) if g.value.pence > 0]
+    paid.sort(key=lambda item: (-item[1].value.pence, item[0]))
+    positions = [position for position, _ in paid]     # 在礼品库中的顺序，用于同价值同件数时排序
+    paid = [g for _, g in paid]
+
+    categories = list(requirements)
+    index = {name: i for i, name in enumerate(categories)}
+    need = [requirements[name] for name in categories]
+    for gift in free:
+        i = index.get(gift.category.value)
+        if i is not None and need[i] > 0:
+            need[i] -= 1
+
+    n = len(paid)
+    values = [g.value.pence for g in paid]
+    kinds = [index.get(g.category.value, -1) for g in paid]
+
+    # 后缀统计：剩余礼品的总价值、各类别的件数和最低价值
+    suffix_value = [0] * (n + 1)
+    suffix_count = [[0] * len(categories) for _ in range(n + 1)]
+    suffix_min = [[None] * len(categories) for _ in range(n + 1)]
+    for i in range(n - 1, -1, -1):
+        suffix_value[i] = suffix_value[i + 1] + values[i]
+        suffix_count[i] = suffix_count[i + 1][:]
+        suffix_min[i] = suffix_min[i + 1][:]
+        k = kinds[i]
+        if k >= 0:
+            suffix_count[i][k] += 1
+            if suffix_min[i][k] is None or values[i] < suffix_min[i][k]:
+                suffix_min[i][k] = values[i]
+
+    limit = budget.pence
+    max_items = n if max_items is None else max_items
+    deadline = started + time_budget
+    best = []           # 最小堆: (价值, -件数, 取反的礼品库顺序, 礼品下标)，堆顶是最差的组合
+    chosen = []
+    nodes = 0
+
+    def record(value):
+        # 同价值同件数时礼品库顺序靠前的组合更好；件数相同时逐项取反后比较，大小关系正好颠倒
+        order = tuple(sorted((-positions[i] for i in chosen), reverse=True))
+        key = (value, -len(chosen), order)
+        if len(best) < top:
+            heapq.heappush(best, key + (tuple(chosen),))
+        elif key > best[0][:3]:
+            heapq.heapreplace(best, key + (tuple(chosen),))
+
+    def feasible(i, room, need):
+        """剩余礼品能否在剩余预算内补齐类别下限"""
+        cost = 0
+        for k, count in enumerate(need):
+            if count > 0:
+                if suffix_count[i][k] < count:
+                    return False
+                cost += count * suffix_min[i][k]
+        return cost <= room and sum(c for c in need if c > 0) <= max_items - len(chosen)
+
+    def search(i, value, need):
+        nonlocal nodes
+        nodes += 1
+        if nodes % 1024 == 0 and time.perf_counter() > deadline:
+            raise _Timeout
+        if i == n or len(chosen) >= max_items:
+            return
+        bound = min(limit, value + suffix_value[i])
+        if len(best) == top:
+            # 这里之后记录的组合至少多选一项：价值不可能更高时，件数也多于堆中最差的就不可能入选
+            worst_value, worst_count = best[0][0], -best[0][1]
+            if bound < worst_value or (bound == worst_value and len(chosen) + 1 > worst_count):
+                return
+        if not feasible(i, limit - value, need):
+            return
+
+        # 先选后不选：礼品按价值从高到低，能尽早找到好的组合，之后剪枝更多
+        if value + values[i] <= limit:
+            taken = need
+            k = kinds[i]
+            if k >= 0 and need[k] > 0:
+                taken = need[:]
+                taken[k] -= 1
+            chosen.append(i)
+            if not any(c > 0 for c in taken):
+                record(value + values[i])
+            search(i + 1, value + values[i], taken)
+            chosen.pop()
+        search(i + 1, value, need)
+
+    exact = True
+    if all(c <= 0 for c in need):
+        record(0)       # 不选收费礼品也满足条件
+    try:
+        search(0, 0, need)
+    except _Timeout:
+        exact = False
+
+    free_part = tuple(free)
+    bundles = []
+    for value, _, _, picked in sorted(best, reverse=True):
+        items = sorted(free_part + tuple(paid[i] for i in picked), key=lambda g: g.sort_order)
+        bundles.append(GiftBundle(gifts=tuple(items), value=Money(value, currency)))
+
+    return BundleResult(
+        budget=budget,
+        requirements=tuple(sorted(requirements.items())),
+        bundles=tuple(bundles),
+        exact=exact,
+        nodes=nodes,
+        seconds=round(time.perf_counter() - started, 4),
+    )
+
+
+def bundle_effect(quote: QuoteData, bundle: GiftBundle) -> dict:
+    """用这个组合替换报价单所选礼品后的总节省和节省比例（公式与报价单相同）"""
+    base = quote.summary
+    lowest = base.lowest_competitor_price
+    summary = summarize(
+        base.original_annual_price,
+        base.weeks,
+        base.total_landlord_discount.pence,
+        base.total_uhomes_subsidy.pence,
+        bundle.value.pence,
+        None if lowest is None else lowest.pence,
+    )
+    return {
+        'total_savings': float(summary.total_savings),
+        'savings_rate': round(summary.savings_rate, 2),
+        'savings_rate_change': round(summary.savings_rate - base.savings_rate, 2),
+    }
+
+
+class GiftBundleSolver:
+    """
+    礼品库的组合推荐（线程安全）
+
+    预算档位的结果在礼品库版本变化后第一次访问时整体重新计算；
+    其他预算/条件按需求解，结果同样缓存到礼品库变化为止
+    """
+
+    def __init__(self, library, tiers=BUDGET_TIERS, currency: str = DEFAULT_CURRENCY):
+        """
+        Args:
+            library: GiftLibrary
+            tiers: 预先计算的预算档位（英镑）
+            currency: 档位的币种
+        """
+        self.library = library
+        self.tier_budgets = tuple(Money.of(t, currency) for t in tiers)
+        self.hits = 0
+        self.misses = 0
+
+        self._version = None
+        self._tiers = None
+        self._results = {}      # 求解参数 -> BundleResult
+        self._lock = threading.Lock()
+
+    def _sync(self):
+        """礼品库变化后清空缓存，返回当前礼品库"""
+        library = self.library.refresh()
+        if library.version != self._version:
+            self._version = library.version
+            self._tiers = None
+            self._results = {}
+        return library
+
+    def solve(self, budget: Money, requirements=None, top: int = DEFAULT_TOP,
+              max_items: Optional[int] = None, include_free: bool = True) -> BundleResult:
+        """按需求解（参数见 solve()），相同参数直接返回缓存"""
+        requirements = DEFAULT_REQUIREMENTS if requirements is None else requirements
+        key = (budget.pence, budget.currency, tuple(sorted(requirements.items())),
+               top, max_items, include_free)
+        with self._lock:
+            library = self._sync()
+            result = self._results.get(key)
+            if result is not None:
+                self.hits += 1
+                return result
+
+            result = solve(library.gifts, budget, requirements, top, max_items, include_free)
+            self.misses += 1
+            if not result.exact:
+                print(f"⚠️ 礼品组合搜索超出时间预算: 预算 {budget.format()}，已搜索 {result.nodes} 个节点")
+            if len(self._results) >= MAX_CACHED:
+                self._results.pop(next(iter(self._results)))
+            self._results[key] = result
+            return result
+
+    def tiers(self) -> dict:
+        """各预算档位的推荐组合（默认条件：至少一项现金类和一项服务类）"""
+        with self._lock:
+            self._sync()
+            tiers = self._tiers
+        if tiers is not None:
+            return tiers
+
+        results = [self.solve(budget) for budget in self.tier_budgets]
+        tiers = {
+            'version': self._version,
+            'requirements': dict(DEFAULT_REQUIREMENTS),
+            'tiers': [r.to_dict() for r in results],
+        }
+        with self._lock:
+            if self._version == tiers['version']:
+                self._tiers = tiers
+        return tiers
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {'cached': len(self._results), 'hits': self.hits, 'misses': self.misses}
@@ -0,0 +1,109 @@
+"""
+礼品库 - 进程内常驻的礼品索引
+YAML只在文件变化时重新解析，按ID、类别和排序字段预先建好索引
+"""
+import hashlib
+import json
+import os
+import threading
+
+import yaml
+
+
+class GiftLibrary:
+    """
+    礼品库
+
+    每次访问只检查文件的mtime和大小；变化后再比较内容哈希，
+    内容确实改变才重新解析YAML并重建索引。
+    """
+
+    def __init__(self, path, build_gift, serialize_gift):
+        """
+        Args:
+            path: 礼品库YAML路径
+            build_gift: YAML条目 -> Gift
+            serialize_gift: Gift -> 接口JSON字典
+        """
+        self.path = path
+        self.build_gift = build_gift
+        self.serialize_gift = serialize_gift
+
+        self.gifts = []         # 按 sort_order 排序
+        self.by_id = {}
+        self.by_category = {}
+        self.json_body = b'[]'  # /api/gift-library 响应体
+        self.etag = None
+        self.version = None     # 内容哈希
+
+        self._stamp = None
+        self._lock = threading.Lock()
+
+    def refresh(self):
+        """文件变化时重新加载，返回自身"""
+        try:
+            st = os.stat(self.path)
+        except OSError as e:
+            if self._stamp is not None:
+                print(f"❌ 礼品库文件不可用，继续使用已加载版本: {e}")
+            else:
+                print(f"❌ 加载礼品库失败: {e}")
+            return self
+
+        stamp = (st.st_mtime_ns, st.st_size)
+        if stamp == self._stamp:
+            return self
+
+        with self._lock:
+            if stamp != self._stamp:
+                self._reload(stamp)
+        return self
+
+    def get(self, gift_id):
+        """按ID查找礼品"""
+        return self.refresh().by_id.get(gift_id)
+
+    def select(self, gift_ids):
+        """按ID列表选择礼品，忽略不存在的ID，重复的ID只取一次"""
+        by_id = self.refresh().by_id
+        return [by_id[gift_id] for gift_id in dict.fromkeys(gift_ids) if gift_id in by_id]
+
+    def _reload(self, stamp):
+        try:
+            with open(self.path, 'rb') as f:
+                raw = f.read()
+        except OSError as e:
+            print(f"❌ 加载礼品库失败: {e}")
+            return
+
+        version = hashlib.sha256(raw).hexdigest()
+        if version == self.version:
+            # 只是mtime变化（如touch），内容未变
+            self._stamp = stamp
+            return
+
+        try:
+            data = yaml.safe_load(raw) or {}
+            items = sorted(data.get('gift_library', []),
+                           key=lambda item: item.get('sort_order', 999))
+            gifts = [self.build_gift(item) for item in items]
+        except Exception as e:
+            # 解析失败时保留上一版本
+            print(f"❌ 加载礼品库失败: {e}")
+            return
+
+        by_category = {}
+        for gift in gifts:
+            by_category.setdefault(gift.category, []).append(gift)
+
+        body = json.dumps([self.serialize_gift(g) for g in gifts],
+                          ensure_ascii=False).encode('utf-8')
+
+        # 新索引全部建好后再替换
+        self.gifts = gifts
+        self.by_id = {g.id: g for g in gifts}
+        self.by_category = by_category
+        self.json_body = body
+        self.etag = hashlib.sha256(body).hexdigest()[:16]
+        self.version = version
+        self._stamp = stamp
@@ -0,0 +1,130 @@
+"""
+图片输出 - 按品牌配置 WECHAT_SHARE 生成微信分享图
+以 image_width / 视口宽度 作为设备像素比截图，再按目标格式编码：
+JPEG/WebP 逐级降低质量、PNG 逐级减少调色板颜色，直到不超过 max_file_size_mb
+"""
+import io
+
+from pricelist_brand import get_wechat_share
+
+# 输出格式 -> (Pillow格式名, 文件扩展名, Content-Type)
+IMAGE_FORMATS = {
+    'png': ('PNG', 'png', 'image/png'),
+    'jpeg': ('JPEG', 'jpg', 'image/jpeg'),
+    'webp': ('WEBP', 'webp', 'image/webp'),
+}
+
+QUALITY_STEP = 10
+MIN_QUALITY = 40
+PALETTE_COLORS = (256, 128, 64)
+
+
+def image_spec(image_format=None, viewport_width=375) -> dict:
+    """
+    按 WECHAT_SHARE 计算输出参数（image_format 默认取 WECHAT_SHARE 的 image_format）
+
+    Returns:
+        {'format', 'device_scale_factor', 'quality', 'max_bytes'}
+    """
+    share = get_wechat_share()
+    image_format = image_format or share.get('image_format', 'png')
+    if image_format not in IMAGE_FORMATS:
+        raise ValueError(f"不支持的图片格式: {image_format}")
+
+    image_width = share.get('image_width') or viewport_width
+    return {
+        'format': image_format,
+        # 750px 成图 / 375px 视口 = 2倍；大视口不缩小
+        'device_scale_factor': max(1, round(image_width / viewport_width, 2)),
+        'quality': int(share.get('image_quality', 90)),
+        'max_bytes': int(float(share.get('max_file_size_mb', 2)) * 1024 * 1024),
+    }
+
+
+def extension(image_format: str) -> str:
+    return IMAGE_FORMATS[image_format][1]
+
+
+def content_type(image_format: str) -> str:
+    return IMAGE_FORMATS[image_format][2]
+
+
+def fit_image(png: bytes, spec: dict):
+    """
+    把截图编码为目标格式并压到大小上限以内
+
+    Returns:
+        (图片字节, 实际使用的参数) —— 参数含 format、width、height、quality、
+        palette、device_scale_factor、bytes、max_bytes、attempts、within_limit
+    """
+    fmt = spec['format']
+    max_bytes = spec['max_bytes']
+    width, height = _png_size(png)
+    info = {
+        'format': fmt,
+        'width': width,
+        'height': height,
+        'quality': None,
+        'palette': None,
+        'device_scale_factor': spec['device_scale_factor'],
+        'max_bytes': max_bytes,
+        'attempts': 1,
+    }
+
+    # 原始PNG已经满足要求时不重新编码
+    if fmt == 'png' and len(png) <= max_bytes:
+        return png, _done(info, png)
+
+    from PIL import Image
+
+    image = Image.open(io.BytesIO(png))
+    info['attempts'] = 0
+
+    data = png
+    if fmt == 'png':
+        for colors in PALETTE_COLORS:
+            info['attempts'] += 1
+            info['palette'] = colors
+            data = _encode(image.convert('RGB').quantize(colors=colors), 'PNG', optimize=True)
+            if len(data) <= max_bytes:
+                break
+    else:
+        rgb = image.convert('RGB')
+        for quality in _qualities(spec['quality']):
+            info['attempts'] += 1
+            info['quality'] = quality
+            data = _encode(rgb, IMAGE_FORMATS[fmt][0], quality=quality, optimize=True)
+            if len(data) <= max_bytes:
+                break
+
+    info = _done(info, data)
+    if not info['within_limit']:
+        print(f"⚠️ 图片压缩后仍超过大小上限: {len(data)} > {max_bytes} 字节")
+    return data, info
+
+
+def _png_size(png):
+    """从PNG文件头读取宽高"""
+    if png[:8] != b'\x89PNG\r\n\x1a\n' or len(png) < 24:
+        return None, None
+    return int.from_bytes(png[16:20], 'big'), int.from_bytes(png[20:24], 'big')
+
+
+def _qualities(start):
+    quality = max(MIN_QUALITY, min(100, start))
+    while quality > MIN_QUALITY:
+        yield quality
+        quality -= QUALITY_STEP
+    yield MIN_QUALITY
+
+
+def _encode(image, fmt, **options):
+    buffer = io.BytesIO()
+    image.save(buffer, format=fmt, **options)
+    return buffer.getvalue()
+
+
+def _done(info, data):
+    info['bytes'] = len(data)
+    info['within_limit'] = len(data) <= info['max_bytes']
+    return info
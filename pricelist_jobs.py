@@ -0,0 +1,230 @@
+"""
+渲染任务队列 - 异步生成报价单
+提交后立即返回任务ID，由后台渲染线程处理，客户端轮询任务状态
+"""
+import json
+import os
+import queue
+import socket
+import tempfile
+import threading
+import time
+import uuid
+from typing import Optional
+
+# 任务状态
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+
+
+class QueueFull(Exception):
+    """任务队列已满"""
+
+
+class JobQueue:
+    """
+    有界渲染任务队列
+
+    任务在提交它的worker进程中执行；任务状态写入共享目录，
+    所以轮询请求落到任意gunicorn worker都能查到结果。
+    提交任务的进程退出（worker被回收或崩溃）后，查询时把未完成的任务标记为失败；
+    超过 stale_after 秒仍未完成的任务同样视为失败
+    """
+
+    def __init__(self, directory, workers=2, max_queued=20, ttl=3600, stale_after=600):
+        self.directory = directory
+        self.workers = max(1, workers)
+        self.ttl = ttl
+        self.stale_after = stale_after
+        self.owner = f"{socket.gethostname()}:{os.getpid()}"
+
+        self._queue = queue.Queue(maxsize=max_queued)
+        self._threads = []
+        self._events = {}  # 本进程任务的完成事件，用于长轮询
+        self._lock = threading.Lock()
+
+        os.makedirs(directory, exist_ok=True)
+
+    # ========== 对外接口 ==========
+
+    def submit(self, fn, *args, **kwargs) -> str:
+        """
+        提交任务，返回任务ID
+
+        fn 的返回值（需可JSON序列化）作为任务结果；
+        队列已满时抛出 QueueFull
+        """
+        job_id = uuid.uuid4().hex
+
+        with self._lock:
+            if self._queue.full():
+                raise QueueFull("渲染队列已满，请稍后重试")
+
+            self._ensure_workers()
+            self._write(job_id, {
+                'job_id': job_id,
+                'status': QUEUED,
+                'created_at': time.time(),
+                'owner': self.owner,
+            })
+            self._events[job_id] = threading.Event()
+            self._queue.put_nowait((job_id, fn, args, kwargs))
+
+        return job_id
+
+    def get(self, job_id: str) -> Optional[dict]:
+        """查询任务状态，任务不存在返回None"""
+        if not _valid_id(job_id):
+            return None
+        try:
+            with open(self._path(job_id), 'r', encoding='utf-8') as f:
+                job = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        if job['status'] in (QUEUED, RUNNING):
+            error = self._orphaned(job)
+            if error:
+                job['status'] = FAILED
+                job['error'] = error
+                job['finished_at'] = time.time()
+                self._write(job_id, job)
+        return job
+
+    def wait(self, job_id: str, timeout: float) -> Optional[dict]:
+        """长轮询：等待任务结束或超时，返回最新状态"""
+        deadline = time.monotonic() + timeout
+        event = self._events.get(job_id)
+
+        if event is not None:
+            event.wait(timeout)
+            return self.get(job_id)
+
+        # 其他进程的任务：轮询状态文件
+        while True:
+            job = self.get(job_id)
+            if job is None or job['status'] in (DONE, FAILED):
+                return job
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return job
+            time.sleep(min(0.2, remaining))
+
+    def stats(self) -> dict:
+        """队列状态"""
+        return {
+            'workers': self.workers,
+            'queued': self._queue.qsize(),
+            'max_queued': self._queue.maxsize,
+        }
+
+    def _orphaned(self, job: dict) -> Optional[str]:
+        """未完成的任务已无人处理时返回失败原因"""
+        if time.time() - job.get('created_at', 0) > self.stale_after:
+            return f"任务超过{self.stale_after}秒未完成"
+        host, _, pid = job.get('owner', '').rpartition(':')
+        if host == socket.gethostname() and pid.isdigit() and not _alive(int(pid)):
+            return "处理任务的进程已退出，请重新提交"
+        return None
+
+    # ========== 渲染线程 ==========
+
+    def _ensure_workers(self):
+        self._threads = [t for t in self._threads if t.is_alive()]
+        while len(self._threads) < self.workers:
+            t = threading.Thread(target=self._work, name='render-worker',
+                                 daemon=True)
+            t.start()
+            self._threads.append(t)
+
+    def _work(self):
+        while True:
+            job_id, fn, args, kwargs = self._queue.get()
+            job = self.get(job_id) or {'job_id': job_id}
+            job['status'] = RUNNING
+            job['started_at'] = time.time()
+            self._write(job_id, job)
+
+            try:
+                job['result'] = fn(*args, **kwargs)
+                job['status'] = DONE
+            except Exception as e:
+                job['status'] = FAILED
+                job['error'] = str(e)
+            job['finished_at'] = time.time()
+            self._write(job_id, job)
+
+            event = self._events.pop(job_id, None)
+            if event is not None:
+                event.set()
+
+            self._queue.task_done()
+            self._reap()
+
+    def _reap(self):
+        """删除超过保留时间的任务记录"""
+        cutoff = time.time() - self.ttl
+        try:
+            entries = list(os.scandir(self.directory))
+        except OSError:
+            return
+        for entry in entries:
+            try:
+                if entry.stat().st_mtime < cutoff:
+                    os.unlink(entry.path)
+            except OSError:
+                pass
+
+    # ========== 状态文件 ==========
+
+    def _path(self, job_id: str) -> str:
+        return os.path.join(self.directory, job_id + '.json')
+
+    def _write(self, job_id: str, job: dict):
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(job, f, ensure_ascii=False)
+        os.replace(tmp_path, self._path(job_id))
+
+
+def _alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass    # 进程存在但属于其他用户
+    return True
+
+
+def _valid_id(job_id: str) -> bool:
+    return len(job_id) == 32 and all(c in '0123456789abcdef' for c in job_id)
+
+
+# ========== 进程级单例 ==========
+
+_jobs = None
+_jobs_pid = None
+_jobs_lock = threading.Lock()
+
+
+def get_job_queue() -> JobQueue:
+    """获取当前进程的任务队列（fork后的子进程会重新创建）"""
+    global _jobs, _jobs_pid
+
+    with _jobs_lock:
+        if _jobs is None or _jobs_pid != os.getpid():
+            _jobs = JobQueue(
+                directory=os.getenv(
+                    'JOBS_DIR',
+                    os.path.join(tempfile.gettempdir(), 'pricelist-jobs'),
+                ),
+                workers=int(os.getenv('RENDER_WORKERS', 2)),
+                max_queued=int(os.getenv('RENDER_QUEUE_SIZE', 20)),
+                ttl=int(os.getenv('JOB_TTL', 3600)),
+                stale_after=int(os.getenv('JOB_STALE_AFTER', 600)),
+            )
+            _jobs_pid = os.getpid()
+        return _jobs
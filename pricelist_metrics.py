@@ -0,0 +1,284 @@
+"""
+运行指标 - 报价生成各阶段耗时与计数
+以Prometheus文本格式输出，供 /metrics 抓取
+
+gunicorn多worker部署时设置 METRICS_DIR，各进程把自己的指标快照写入该目录，
+/metrics 汇总所有进程（已退出进程的计数保留，仪表值忽略）
+"""
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+# 直方图桶（秒）：覆盖模板渲染的毫秒级到浏览器冷启动的秒级
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+class _Metric:
+    type = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+        REGISTRY.register(self)
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} 需要标签 {self.labelnames}，收到 {tuple(labels)}")
+        return tuple(str(labels[n]) for n in self.labelnames)
+
+    def snapshot(self):
+        with self._lock:
+            return [[list(k), v] for k, v in self._values.items()]
+
+
+class Counter(_Metric):
+    """只增计数器"""
+    type = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    """可增可减的当前值"""
+    type = 'gauge'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    @contextmanager
+    def track(self, **labels):
+        """代码块执行期间值加1"""
+        self.inc(**labels)
+        try:
+            yield
+        finally:
+            self.dec(**labels)
+
+
+class Histogram(_Metric):
+    """耗时分布（快照中保存各桶的非累计计数）"""
+    type = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = {
+                    'buckets': [0] * (len(self.buckets) + 1), 'sum': 0.0, 'count': 0,
+                }
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    break
+            else:
+                i = len(self.buckets)
+            entry['buckets'][i] += 1
+            entry['sum'] += value
+            entry['count'] += 1
+
+    def snapshot(self):
+        with self._lock:
+            return [[list(k), {'buckets': list(v['buckets']), 'sum': v['sum'], 'count': v['count']}]
+                    for k, v in self._values.items()]
+
+
+class Registry:
+    """指标注册表，负责多进程快照和文本输出"""
+
+    def __init__(self):
+        self._metrics = []
+        self._last_flush = 0.0
+
+    def register(self, metric):
+        self._metrics.append(metric)
+
+    def snapshot(self):
+        return {
+            m.name: {'type': m.type, 'samples': m.snapshot()}
+            for m in self._metrics
+        }
+
+    # ========== 多进程 ==========
+
+    def flush(self, directory, min_interval=0.0):
+        """把本进程的快照写入 directory/<pid>.json（min_interval 秒内不重复写）"""
+        now = time.monotonic()
+        if min_interval and now - self._last_flush < min_interval:
+            return
+        self._last_flush = now
+
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"{os.getpid()}.json")
+        tmp = f"{path}.tmp"
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(self.snapshot(), f)
+        os.replace(tmp, path)
+
+    def collect(self, directory=None):
+        """汇总各进程快照；未配置目录时只返回本进程"""
+        if not directory:
+            return self.snapshot()
+
+        self.flush(directory)
+        merged = {}
+        for filename in os.listdir(directory):
+            if not filename.endswith('.json'):
+                continue
+            try:
+                pid = int(filename[:-5])
+                with open(os.path.join(directory, filename), encoding='utf-8') as f:
+                    data = json.load(f)
+            except (ValueError, OSError):
+                continue
+            alive = _pid_alive(pid)
+
+            for name, metric in data.items():
+                if metric['type'] == 'gauge' and not alive:
+                    continue
+                target = merged.setdefault(name, {'type': metric['type'], 'samples': {}})
+                for labels, value in metric['samples']:
+                    key = tuple(labels)
+                    target['samples'][key] = _merge(target['samples'].get(key), value)
+
+        for metric in merged.values():
+            metric['samples'] = [[list(k), v] for k, v in metric['samples'].items()]
+        return merged
+
+    # ========== 文本输出 ==========
+
+    def expose(self, directory=None) -> str:
+        """Prometheus文本格式"""
+        data = self.collect(directory)
+        lines = []
+        for m in self._metrics:
+            samples = data.get(m.name, {}).get('samples', [])
+            lines.append(f"# HELP {m.name} {m.documentation}")
+            lines.append(f"# TYPE {m.name} {m.type}")
+            for labelvalues, value in samples:
+                labels = list(zip(m.labelnames, labelvalues))
+                if m.type != 'histogram':
+                    lines.append(f"{m.name}{_labels(labels)} {str(value)}")
+                    continue
+                cumulative = 0
+                bounds = [str(b) for b in m.buckets] + ['+Inf']
+                for bound, count in zip(bounds, value['buckets']):
+                    cumulative += count
+                    lines.append(f"{m.name}_bucket{_labels(labels + [('le', bound)])} {cumulative}")
+                lines.append(f"{m.name}_sum{_labels(labels)} {str(value['sum'])}")
+                lines.append(f"{m.name}_count{_labels(labels)} {value['count']}")
+        return '\n'.join(lines) + '\n'
+
+
+def _merge(current, value):
+    if current is None:
+        return value
+    if isinstance(value, dict):
+        return {
+            'buckets': [a + b for a, b in zip(current['buckets'], value['buckets'])],
+            'sum': current['sum'] + value['sum'],
+            'count': current['count'] + value['count'],
+        }
+    return current + value
+
+
+def _pid_alive(pid):
+    if pid == os.getpid():
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _labels(pairs):
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{k}="{_escape(v)}"' for k, v in pairs) + '}'
+
+
+REGISTRY = Registry()
+
+# ========== 报价生成指标 ==========
+
+STAGE_SECONDS = Histogram(
+    'pricelist_stage_duration_seconds',
+    '报价生成各阶段耗时（build 包含 gifts）',
+    ['stage'],
+)
+STAGE_ERRORS = Counter(
+    'pricelist_stage_errors_total',
+    '报价生成各阶段失败次数',
+    ['stage'],
+)
+RENDER_CACHE = Counter(
+    'pricelist_render_cache_total',
+    '渲染缓存查询次数',
+    ['result'],
+)
+RENDERS_IN_FLIGHT = Gauge(
+    'pricelist_renders_in_flight',
+    '正在截图的报价数',
+)
+REQUEST_SECONDS = Histogram(
+    'pricelist_request_duration_seconds',
+    '接口请求耗时',
+    ['endpoint'],
+)
+REQUESTS = Counter(
+    'pricelist_requests_total',
+    '接口请求数',
+    ['endpoint', 'status'],
+)
+BROWSER_LAUNCHES = Counter(
+    'pricelist_browser_launches_total',
+    '浏览器启动次数（含重启和回收）',
+)
+
+
+@contextmanager
+def stage(name):
+    """记录一个阶段的耗时，抛出异常时同时计入该阶段的失败次数"""
+    started = time.perf_counter()
+    try:
+        yield
+    except BaseException:
+        STAGE_ERRORS.inc(stage=name)
+        raise
+    finally:
+        STAGE_SECONDS.observe(time.perf_counter() - started, stage=name)
+
+
+def metrics_dir():
+    """多进程快照目录（未设置时只统计当前进程）"""
+    return os.getenv('METRICS_DIR') or None
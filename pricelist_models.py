@@ -0,0 +1,746 @@
+"""
+核心数据模型
+定义报价单系统中所有的数据结构，Web应用、演示脚本和批量计算共用这一份
+
+    - 模型是带 __slots__ 的 dataclass（不创建实例 __dict__，属性访问更快、占用更少）
+    - 金额为 Money（整数便士 + 币种，见 pricelist_money），构造时传入的数字、字符串会转换一次
+    - decode_quote_request() 按字段表一次遍历把 /api/generate 的请求JSON解码为已校验的 QuoteData，
+      出错时抛出 DecodeError（ValueError 子类），消息带出错字段路径
+"""
+
+from dataclasses import dataclass, field, fields
+from typing import Callable, List, Optional
+from datetime import date, datetime, timedelta
+from enum import Enum
+
+from pricelist_money import DEFAULT_CURRENCY, Money, to_pence
+from pricelist_pricing import PricingMixin
+
+# 报价单默认有效天数
+VALID_DAYS = 7
+
+
+class DiscountPayer(Enum):
+    """结算方"""
+    LANDLORD = "landlord"  # 房东结算
+    UHOMES = "uhomes"      # 异乡好居结算
+
+
+class GiftCategory(Enum):
+    """礼品类别"""
+    CASH = "cash"          # 现金
+    SERVICE = "service"    # 服务
+    VOUCHER = "voucher"    # 优惠券
+    GIFT = "gift"          # 实物礼品
+
+
+def slotted(*extra):
+    """
+    给 dataclass 加上 __slots__（Python 3.9 的 dataclass 还没有 slots 参数）
+
+    extra 为字段以外、需要保存在实例上的缓存属性；放在 @dataclass 之上使用
+    """
+    def wrap(cls):
+        names = tuple(f.name for f in fields(cls))
+        namespace = dict(cls.__dict__)
+        # 字段默认值已写进 __init__，类属性会和同名 slot 冲突
+        for name in names + extra:
+            namespace.pop(name, None)
+        namespace.pop('__dict__', None)
+        namespace.pop('__weakref__', None)
+        namespace['__slots__'] = names + extra
+        new_cls = type(cls)(cls.__name__, cls.__bases__, namespace)
+        new_cls.__qualname__ = cls.__qualname__
+        return new_cls
+    return wrap
+
+
+@slotted('_weeks')
+@dataclass
+class PropertyInfo:
+    """房源信息"""
+    property_name: str
+    room_type: str
+    address: str
+    lease_start: date
+    lease_end: date
+
+    def __setattr__(self, name, value):
+        object.__setattr__(self, name, value)
+        if name in ('lease_start', 'lease_end'):
+            object.__setattr__(self, '_weeks', None)
+
+    @property
+    def weeks(self) -> int:
+        """租期周数（租期不变时只计算一次）"""
+        weeks = getattr(self, '_weeks', None)
+        if weeks is None:
+            days = (self.lease_end - self.lease_start).days
+            weeks = max(1, days // 7)  # 至少1周
+            object.__setattr__(self, '_weeks', weeks)
+        return weeks
+
+    @property
+    def lease_period_text(self) -> str:
+        """租期文本"""
+        start = self.lease_start.strftime('%Y-%m-%d')
+        end = self.lease_end.strftime('%Y-%m-%d')
+        return f"{start} - {end} ({self.weeks}周)"
+
+
+@slotted()
+@dataclass
+class Discount:
+    """优惠项"""
+    name: str
+    amount: Money
+    payer: DiscountPayer
+    description: str = ""
+
+    def __post_init__(self):
+        """类型转换"""
+        if not isinstance(self.amount, Money):
+            self.amount = Money.of(self.amount)
+        if isinstance(self.payer, str):
+            self.payer = DiscountPayer(self.payer)
+
+    @property
+    def payer_text(self) -> str:
+        """结算方文本"""
+        return "由房东结算" if self.payer == DiscountPayer.LANDLORD else "由异乡好居结算"
+
+    @property
+    def payer_badge_type(self) -> str:
+        """结算方标签类型（用于CSS）"""
+        return self.payer.value
+
+
+@slotted()
+@dataclass
+class Gift:
+    """礼品库礼品"""
+    id: str
+    name: str
+    value: Money
+    category: GiftCategory
+    description: str = ""
+    icon: str = "🎁"
+    unit: str = DEFAULT_CURRENCY   # 价值的币种
+    sort_order: int = 999
+    is_free: bool = False  # 是否免费礼品（价值为0）
+
+    def __post_init__(self):
+        """类型转换"""
+        if not isinstance(self.value, Money):
+            self.value = Money.of(self.value, self.unit)
+        if isinstance(self.category, str):
+            self.category = GiftCategory(self.category)
+
+    @property
+    def display_value(self) -> str:
+        """显示价值"""
+        if self.is_free:
+            return "免费"
+        return self.value.format()
+
+    @property
+    def category_name(self) -> str:
+        """类别名称"""
+        category_names = {
+            GiftCategory.CASH: "现金类",
+            GiftCategory.SERVICE: "服务类",
+            GiftCategory.VOUCHER: "优惠券",
+            GiftCategory.GIFT: "实物礼品",
+        }
+        return category_names.get(self.category, "其他")
+
+
+@slotted()
+@dataclass
+class CompetitorPrice:
+    """竞对价格"""
+    platform: str
+    weekly_price: Money
+    annual_price: Money
+    url: Optional[str] = None
+
+    def __post_init__(self):
+        """类型转换"""
+        if not isinstance(self.weekly_price, Money):
+            self.weekly_price = Money.of(self.weekly_price)
+        if not isinstance(self.annual_price, Money):
+            self.annual_price = Money.of(self.annual_price, self.weekly_price.currency)
+
+
+@slotted()
+@dataclass
+class AdvisorInfo:
+    """顾问信息"""
+    name: str
+    wechat_id: str = ""
+    phone: str = ""
+    qr_code_url: Optional[str] = None
+
+    @property
+    def avatar_initial(self) -> str:
+        """头像首字母"""
+        return self.name[0] if self.name else "?"
+
+
+@slotted('_summary')
+@dataclass
+class QuoteData(PricingMixin):
+    """
+    完整报价单数据（派生金额见 PricingMixin，按需计算一次并缓存）
+
+    original_annual_price 未提供时按 周租金 × 租期周数 计算；
+    valid_until 未提供时为当天起 VALID_DAYS 天
+    """
+    # 房源信息
+    property: PropertyInfo
+
+    # 价格信息
+    original_weekly_price: Money
+    original_annual_price: Optional[Money] = None
+
+    # 优惠信息
+    landlord_discounts: List[Discount] = field(default_factory=list)
+    uhomes_subsidies: List[Discount] = field(default_factory=list)
+
+    # 礼品库（新增）
+    selected_gifts: List[Gift] = field(default_factory=list)
+
+    # 竞对信息
+    competitor_prices: List[CompetitorPrice] = field(default_factory=list)
+
+    # 元信息
+    valid_until: Optional[date] = None
+    advisor: Optional[AdvisorInfo] = None
+    created_at: date = field(default_factory=date.today)
+
+    def __post_init__(self):
+        """初始化后处理"""
+        # 类型转换
+        if not isinstance(self.original_weekly_price, Money):
+            self.original_weekly_price = Money.of(self.original_weekly_price)
+
+        if self.original_annual_price is None:
+            self.original_annual_price = self.original_weekly_price * self.property.weeks
+        elif not isinstance(self.original_annual_price, Money):
+            self.original_annual_price = Money.of(self.original_annual_price, self.currency)
+
+        # 如果没有设置有效期，默认7天
+        if self.valid_until is None:
+            self.valid_until = self.created_at + timedelta(days=VALID_DAYS)
+
+    @property
+    def currency(self) -> str:
+        """报价币种（优惠、礼品、竞对价格须相同）"""
+        return self.original_weekly_price.currency
+
+    @property
+    def valid_until_text(self) -> str:
+        """有效期文本"""
+        return self.valid_until.strftime('%Y-%m-%d')
+
+    # ========== 分组方法 ==========
+
+    def get_gifts_by_category(self, category: GiftCategory) -> List[Gift]:
+        """按类别获取礼品"""
+        return [g for g in self.selected_gifts if g.category == category]
+
+    @property
+    def cash_gifts(self) -> List[Gift]:
+        """现金类礼品"""
+        return self.get_gifts_by_category(GiftCategory.CASH)
+
+    @property
+    def service_gifts(self) -> List[Gift]:
+        """服务类礼品"""
+        return self.get_gifts_by_category(GiftCategory.SERVICE)
+
+    @property
+    def voucher_gifts(self) -> List[Gift]:
+        """优惠券类礼品"""
+        return self.get_gifts_by_category(GiftCategory.VOUCHER)
+
+    @property
+    def physical_gifts(self) -> List[Gift]:
+        """实物礼品"""
+        return self.get_gifts_by_category(GiftCategory.GIFT)
+
+    # ========== 格式化方法 ==========
+
+    def format_price(self, price: Money, with_symbol: bool = True) -> str:
+        """格式化价格"""
+        return Money.of(price, self.currency).format(with_symbol)
+
+    def format_percentage(self, value: float, decimals: int = 1) -> str:
+        """格式化百分比"""
+        return f"{value:.{decimals}f}%"
+
+    # ========== 验证方法 ==========
+
+    def validate(self) -> List[str]:
+        """验证数据完整性，返回错误列表"""
+        errors = []
+
+        if self.original_annual_price <= 0:
+            errors.append("原价必须大于0")
+
+        if self.final_annual_price < 0:
+            errors.append("最终价格不能为负数（优惠过大）")
+
+        if self.property.lease_start >= self.property.lease_end:
+            errors.append("租期开始日期必须早于结束日期")
+
+        if self.valid_until and self.valid_until < date.today():
+            errors.append("报价单有效期不能早于今天")
+
+        return errors
+
+    def is_valid(self) -> bool:
+        """是否有效"""
+        return len(self.validate()) == 0
+
+    # ========== 导出方法 ==========
+
+    def to_dict(self) -> dict:
+        """转换为字典（用于JSON序列化）"""
+        summary = self.summary
+        return {
+            "property": {
+                "property_name": self.property.property_name,
+                "room_type": self.property.room_type,
+                "address": self.property.address,
+                "lease_start": self.property.lease_start.isoformat(),
+                "lease_end": self.property.lease_end.isoformat(),
+                "weeks": summary.weeks,
+            },
+            "prices": {
+                "original_weekly": float(self.original_weekly_price),
+                "original_annual": float(self.original_annual_price),
+                "final_weekly": float(summary.final_weekly_price),
+                "final_annual": float(summary.final_annual_price),
+            },
+            "discounts": {
+                "landlord": [
+                    {
+                        "name": d.name,
+                        "amount": float(d.amount),
+                        "description": d.description,
+                    }
+                    for d in self.landlord_discounts
+                ],
+                "uhomes": [
+                    {
+                        "name": s.name,
+                        "amount": float(s.amount),
+                        "description": s.description,
+                    }
+                    for s in self.uhomes_subsidies
+                ],
+                "total": float(summary.total_savings),
+            },
+            "gifts": [
+                {
+                    "id": g.id,
+                    "name": g.name,
+                    "value": float(g.value),
+                    "category": g.category.value,
+                    "icon": g.icon,
+                }
+                for g in self.selected_gifts
+            ],
+            "competitors": [
+                {
+                    "platform": cp.platform,
+                    "weekly_price": float(cp.weekly_price),
+                    "annual_price": float(cp.annual_price),
+                }
+                for cp in self.competitor_prices
+            ],
+            "summary": {
+                "total_savings": float(summary.total_savings),
+                "savings_rate": round(summary.savings_rate, 2),
+                "advantage_vs_competitor": float(summary.advantage_vs_competitor) if summary.advantage_vs_competitor else None,
+                "advantage_rate": round(summary.advantage_rate, 2) if summary.advantage_rate else None,
+            },
+            "meta": {
+                "created_at": self.created_at.isoformat(),
+                "valid_until": self.valid_until.isoformat() if self.valid_until else None,
+                "advisor": {
+                    "name": self.advisor.name,
+                    "wechat_id": self.advisor.wechat_id,
+                    "phone": self.advisor.phone,
+                } if self.advisor else None,
+            },
+        }
+
+
+# ========== 礼品库条目 ==========
+
+def build_gift(item: dict) -> Gift:
+    """礼品库YAML条目 -> Gift"""
+    return Gift(
+        id=item['id'],
+        name=item['name'],
+        value=Money.of(item['value'], item.get('unit', DEFAULT_CURRENCY)),
+        category=GiftCategory(item['category']),
+        description=item.get('description', ''),
+        icon=item.get('icon', '🎁'),
+        unit=item.get('unit', DEFAULT_CURRENCY),
+        sort_order=item.get('sort_order', 999),
+        is_free=item.get('is_free', False),
+    )
+
+
+def serialize_gift(gift: Gift) -> dict:
+    """Gift -> 接口JSON"""
+    return {
+        'id': gift.id,
+        'name': gift.name,
+        'value': float(gift.value),
+        'category': gift.category.value,
+        'icon': gift.icon,
+        'description': gift.description
+    }
+
+
+# ========== 请求解码 ==========
+
+MAX_TEXT_LENGTH = 200   # 名称、地址等文本字段的长度上限
+MAX_ITEMS = 50          # 优惠、礼品、竞对列表的条数上限
+MAX_VALID_DAYS = 90
+MAX_BUNDLES = 20        # 礼品组合推荐一次最多返回的组合数
+
+_REQUIRED = object()
+
+
+class DecodeError(ValueError):
+    """请求数据无效（path 为出错字段，如 landlord_discounts[1].amount）"""
+
+    def __init__(self, path: str, message: str):
+        super().__init__(f"{path}: {message}")
+        self.path = path
+        self.message = message
+
+
+def _text(value, path):
+    if not isinstance(value, str):
+        raise DecodeError(path, "应为字符串")
+    if len(value) > MAX_TEXT_LENGTH:
+        raise DecodeError(path, f"长度不能超过{MAX_TEXT_LENGTH}个字符")
+    return value
+
+
+def _date(value, path):
+    if not isinstance(value, str):
+        raise DecodeError(path, "应为 YYYY-MM-DD 格式的日期")
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise DecodeError(path, f"日期格式无效: {value}") from None
+
+
+def _pence(value, path):
+    """金额 -> 整数便士（币种在构建模型时统一加上）"""
+    # bool 是 int 的子类，true/false 不能当金额
+    if isinstance(value, bool) or not isinstance(value, (int, float, str)):
+        raise DecodeError(path, "应为金额数字")
+    try:
+        pence = to_pence(value)
+    except ValueError:
+        raise DecodeError(path, f"金额无效: {value}") from None
+    if pence < 0:
+        raise DecodeError(path, "金额不能为负数")
+    return pence
+
+
+def _timestamp(value, path):
+    """日期或日期时间（ISO格式，无时区按本地时间）"""
+    if not isinstance(value, str):
+        raise DecodeError(path, "应为 YYYY-MM-DD 或 YYYY-MM-DDTHH:MM:SS 格式的时间")
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        raise DecodeError(path, f"时间格式无效: {value}") from None
+
+
+def _currency(value, path):
+    if not (isinstance(value, str) and len(value) == 3 and value.isascii() and value.isupper()):
+        raise DecodeError(path, "应为三位大写币种代码，如 GBP")
+    return value
+
+
+def _valid_days(value, path):
+    # CSV 批量导入的单元格都是字符串
+    if isinstance(value, str) and value.strip().isdigit():
+        value = int(value)
+    if isinstance(value, bool) or not isinstance(value, int) or not 1 <= value <= MAX_VALID_DAYS:
+        raise DecodeError(path, f"应为1-{MAX_VALID_DAYS}的整数")
+    return value
+
+
+def _list(value, path):
+    if not isinstance(value, list):
+        raise DecodeError(path, "应为数组")
+    if len(value) > MAX_ITEMS:
+        raise DecodeError(path, f"不能超过{MAX_ITEMS}项")
+    return value
+
+
+def _gift_ids(value, path):
+    for i, gift_id in enumerate(_list(value, path)):
+        if not isinstance(gift_id, str):
+            raise DecodeError(f"{path}[{i}]", "礼品ID应为字符串")
+    return value
+
+
+def _count(maximum):
+    """取值范围为 1..maximum 的整数"""
+    def decode(value, path):
+        if isinstance(value, bool) or not isinstance(value, int) or not 1 <= value <= maximum:
+            raise DecodeError(path, f"应为1-{maximum}的整数")
+        return value
+    return decode
+
+
+def _flag(value, path):
+    if not isinstance(value, bool):
+        raise DecodeError(path, "应为 true 或 false")
+    return value
+
+
+def _requirements(value, path):
+    """礼品类别下限 {"cash": 1, "service": 1}"""
+    if not isinstance(value, dict):
+        raise DecodeError(path, "应为JSON对象")
+    categories = {c.value for c in GiftCategory}
+    for key, count in value.items():
+        if key not in categories:
+            raise DecodeError(f"{path}.{key}", f"未知礼品类别，可选: {', '.join(sorted(categories))}")
+        if isinstance(count, bool) or not isinstance(count, int) or not 0 <= count <= MAX_ITEMS:
+            raise DecodeError(f"{path}.{key}", f"应为0-{MAX_ITEMS}的整数")
+    return dict(value)
+
+
+def _records(schema):
+    """对象数组：每项按 schema 解码为字段字典"""
+    def decode(value, path):
+        return [_decode(item, schema, f"{path}[{i}]") for i, item in enumerate(_list(value, path))]
+    return decode
+
+
+def _decode(data, schema, path=''):
+    """按字段表解码一个JSON对象，返回 {字段名: 值}（null 和空白字符串视为未填）"""
+    if not isinstance(data, dict):
+        raise DecodeError(path or '请求', "应为JSON对象")
+    values = {}
+    for key, decode, default in schema:
+        value = data.get(key)
+        if value is None or (isinstance(value, str) and not value.strip()):
+            if default is _REQUIRED:
+                raise DecodeError(f"{path}.{key}" if path else key, "缺少必填字段")
+            values[key] = default
+        else:
+            values[key] = decode(value, f"{path}.{key}" if path else key)
+    return values
+
+
+# 字段表: (键名, 解码函数, 默认值或 _REQUIRED)
+DISCOUNT_SCHEMA = (
+    ('name', _text, _REQUIRED),
+    ('amount', _pence, _REQUIRED),
+    ('description', _text, ''),
+)
+
+COMPETITOR_SCHEMA = (
+    ('platform', _text, _REQUIRED),
+    ('weekly_price', _pence, _REQUIRED),
+    ('annual_price', _pence, _REQUIRED),
+    ('url', _text, None),
+)
+
+# 写入竞对价格库的一条记录（见 pricelist_competitors）
+COMPETITOR_RECORD_SCHEMA = (
+    ('property_name', _text, _REQUIRED),
+    ('room_type', _text, _REQUIRED),
+    ('currency', _currency, DEFAULT_CURRENCY),
+    ('observed_at', _timestamp, None),
+) + COMPETITOR_SCHEMA
+
+QUOTE_REQUEST_SCHEMA = (
+    ('property_name', _text, _REQUIRED),
+    ('room_type', _text, _REQUIRED),
+    ('address', _text, _REQUIRED),
+    ('lease_start', _date, _REQUIRED),
+    ('lease_end', _date, _REQUIRED),
+    ('weekly_price', _pence, _REQUIRED),
+    ('annual_price', _pence, None),
+    ('currency', _currency, DEFAULT_CURRENCY),
+    ('landlord_discounts', _records(DISCOUNT_SCHEMA), ()),
+    ('uhomes_subsidies', _records(DISCOUNT_SCHEMA), ()),
+    ('selected_gifts', _gift_ids, ()),
+    ('competitor_prices', _records(COMPETITOR_SCHEMA), ()),
+    ('advisor_name', _text, ''),
+    ('advisor_phone', _text, ''),
+    ('advisor_wechat', _text, ''),
+    ('valid_days', _valid_days, VALID_DAYS),
+)
+
+# 方案预览的变化方案（见 pricelist_preview）：替换类字段为 None 时沿用基础报价
+VARIATION_SCHEMA = (
+    ('label', _text, ''),
+    ('weekly_price', _pence, None),
+    ('landlord_discounts', _records(DISCOUNT_SCHEMA), None),
+    ('uhomes_subsidies', _records(DISCOUNT_SCHEMA), None),
+    ('selected_gifts', _gift_ids, None),
+    ('add_gifts', _gift_ids, ()),
+    ('remove_gifts', _gift_ids, ()),
+)
+
+
+# 礼品组合推荐（见 pricelist_gift_bundles）：金额为整数便士，quote 原样保留由 decode_bundle_request 解码
+BUNDLE_REQUEST_SCHEMA = (
+    ('budget', _pence, _REQUIRED),
+    ('currency', _currency, None),
+    ('require', _requirements, None),
+    ('top', _count(MAX_BUNDLES), 5),
+    ('max_items', _count(MAX_ITEMS), None),
+    ('include_free', _flag, True),
+    ('quote', lambda value, path: value, None),
+)
+
+
+def decode_quote_request(data: dict,
+                         select_gifts: Optional[Callable[[List[str]], List[Gift]]] = None,
+                         path: str = '',
+                         competitors: Optional[Callable[[str, str, str], List[CompetitorPrice]]] = None,
+                         ) -> QuoteData:
+    """
+    把 /api/generate 的请求JSON解码为已校验的报价单
+
+    Args:
+        data: 请求JSON（未知字段如 targets、image_format 忽略）
+        select_gifts: 礼品ID列表 -> Gift 列表（如 GiftLibrary.select，忽略不存在的ID）
+        path: 报价在请求中的位置（嵌在其他请求中时用于错误信息，如 base）
+        competitors: (房源名, 户型, 币种) -> 竞对价格列表（如 CompetitorStore.latest），
+            请求中没有 competitor_prices 时用它自动带出
+
+    Raises:
+        DecodeError: 缺少字段、类型或取值无效，或所选礼品的币种与报价不同
+    """
+    values = _decode(data, QUOTE_REQUEST_SCHEMA, path)
+    prefix = f"{path}." if path else ''
+    currency = values['currency']
+
+    if values['lease_end'] <= values['lease_start']:
+        raise DecodeError(prefix + 'lease_end', "租期结束日期必须晚于开始日期")
+    if values['weekly_price'] == 0:
+        raise DecodeError(prefix + 'weekly_price', "周租金必须大于0")
+
+    gift_ids = values['selected_gifts']
+    if gift_ids and select_gifts is None:
+        raise DecodeError(prefix + 'selected_gifts', "未提供礼品库")
+    gifts = select_gifts(gift_ids) if gift_ids else []
+    for gift in gifts:
+        if gift.value.currency != currency:
+            raise DecodeError(prefix + 'selected_gifts', f"礼品 {gift.id} 的币种 {gift.value.currency} 与报价 {currency} 不同")
+
+    competitor_prices = [
+        CompetitorPrice(c['platform'], Money(c['weekly_price'], currency),
+                        Money(c['annual_price'], currency), c['url'])
+        for c in values['competitor_prices']
+    ]
+    if not competitor_prices and competitors is not None:
+        competitor_prices = competitors(values['property_name'], values['room_type'], currency)
+
+    advisor = None
+    if values['advisor_name']:
+        advisor = AdvisorInfo(
+            name=values['advisor_name'],
+            phone=values['advisor_phone'],
+            wechat_id=values['advisor_wechat'],
+        )
+
+    today = date.today()
+    return QuoteData(
+        property=PropertyInfo(
+            property_name=values['property_name'],
+            room_type=values['room_type'],
+            address=values['address'],
+            lease_start=values['lease_start'],
+            lease_end=values['lease_end'],
+        ),
+        original_weekly_price=Money(values['weekly_price'], currency),
+        original_annual_price=None if values['annual_price'] is None else Money(values['annual_price'], currency),
+        landlord_discounts=[
+            Discount(d['name'], Money(d['amount'], currency), DiscountPayer.LANDLORD, d['description'])
+            for d in values['landlord_discounts']
+        ],
+        uhomes_subsidies=[
+            Discount(d['name'], Money(d['amount'], currency), DiscountPayer.UHOMES, d['description'])
+            for d in values['uhomes_subsidies']
+        ],
+        selected_gifts=gifts,
+        competitor_prices=competitor_prices,
+        valid_until=today + timedelta(days=values['valid_days']),
+        advisor=advisor,
+        created_at=today,
+    )
+
+
+def decode_variation(data: dict, path: str = 'variation') -> dict:
+    """
+    解码方案预览的一个变化方案，返回 {字段名: 值}（金额为整数便士）
+
+    Raises:
+        DecodeError: 类型或取值无效（path 为出错字段，如 variations[2].weekly_price）
+    """
+    values = _decode(data, VARIATION_SCHEMA, path)
+    if values['weekly_price'] == 0:
+        raise DecodeError(f"{path}.weekly_price", "周租金必须大于0")
+    return values
+
+
+def decode_bundle_request(data: dict,
+                          select_gifts: Optional[Callable[[List[str]], List[Gift]]] = None) -> dict:
+    """
+    解码礼品组合推荐请求，返回 {字段名: 值}
+
+    budget 转为 Money；带 quote 时解码为报价单（QuoteData），预算币种默认与报价相同
+
+    Raises:
+        DecodeError: 类型或取值无效，或预算与报价的币种不同
+    """
+    values = _decode(data, BUNDLE_REQUEST_SCHEMA)
+    currency = values['currency']
+    if values['quote'] is not None:
+        quote = decode_quote_request(values['quote'], select_gifts, path='quote')
+        if currency is not None and currency != quote.currency:
+            raise DecodeError('currency', f"预算币种 {currency} 与报价 {quote.currency} 不同")
+        currency = quote.currency
+        values['quote'] = quote
+    values['budget'] = Money(values['budget'], currency or DEFAULT_CURRENCY)
+    values['currency'] = values['budget'].currency
+    return values
+
+
+def decode_competitor_records(data) -> list:
+    """
+    解码写入竞对价格库的记录列表
+
+    Returns:
+        [(房源名, 户型, CompetitorPrice, 采集时间或None)]
+
+    Raises:
+        DecodeError: 缺少字段、类型或取值无效（path 如 prices[3].annual_price）
+    """
+    records = []
+    for values in _records(COMPETITOR_RECORD_SCHEMA)(data, 'prices'):
+        currency = values['currency']
+        price = CompetitorPrice(values['platform'], Money(values['weekly_price'], currency),
+                                Money(values['annual_price'], currency), values['url'])
+        records.append((values['property_name'], values['room_type'], price, values['observed_at']))
+    return records
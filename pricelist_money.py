@@ -0,0 +1,205 @@
+"""
+金额类型 - 整数便士 + 币种的定点金额
+报价中的加减、求和都是整数运算，不会有浮点误差，也不需要 Decimal；
+唯一的除法（到手周租金 = 年租金 / 周数）按四舍五入（0.5 远离零）到便士。
+输出时统一格式化一次：float(money) 为精确的两位小数，money.format() 带币种符号
+"""
+import numbers
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+
+DEFAULT_CURRENCY = 'GBP'   # 与礼品库的 unit 一致
+
+CURRENCY_SYMBOLS = {
+    'GBP': '£',
+    'EUR': '€',
+    'USD': '$',
+    'CNY': '¥',
+}
+
+
+class CurrencyError(ValueError):
+    """不同币种的金额不能一起运算"""
+
+
+def div_round(numerator: int, divisor: int) -> int:
+    """整数除法，四舍五入（0.5 远离零）"""
+    quotient, remainder = divmod(abs(numerator), divisor)
+    if remainder * 2 >= divisor:
+        quotient += 1
+    return quotient if numerator >= 0 else -quotient
+
+
+def to_pence(value) -> int:
+    """金额（int/str/float/Decimal，单位为元/英镑）-> 整数便士，超出两位小数的部分四舍五入"""
+    kind = type(value)
+    if kind is str:
+        # 最多两位小数的非负金额（表单输入的绝大多数情况）不经过 Decimal
+        whole, dot, fraction = value.strip().partition('.')
+        if whole.isdigit() and whole.isascii() and (
+                not dot or (len(fraction) <= 2 and fraction.isdigit() and fraction.isascii())):
+            return int(whole) * 100 + (int(fraction.ljust(2, '0')) if fraction else 0)
+    elif kind is int:
+        return value * 100
+    elif isinstance(value, bool):
+        raise TypeError(f"金额无效: {value!r}")
+    elif isinstance(value, numbers.Integral):
+        return int(value) * 100
+    elif isinstance(value, float):
+        value = repr(float(value))    # 最短表示，0.1 -> '0.1'
+    elif not isinstance(value, (str, Decimal)):
+        raise TypeError(f"金额无效: {value!r}")
+
+    try:
+        amount = Decimal(value)
+    except InvalidOperation:
+        raise ValueError(f"金额无效: {value}") from None
+    if not amount.is_finite():
+        raise ValueError(f"金额无效: {value}")
+    return int(amount.scaleb(2).to_integral_value(ROUND_HALF_UP))
+
+
+class Money:
+    """
+    定点金额（不可变：运算总是返回新对象）
+
+    - 同币种之间加减、比较；与整数0相加、比较（sum() 的起始值、判断正负）
+    - 乘以整数（如周租金 × 周数）；除以整数四舍五入到便士；两个金额相除得到 float 比值
+    """
+
+    __slots__ = ('pence', 'currency')
+
+    def __init__(self, pence: int = 0, currency: str = DEFAULT_CURRENCY):
+        self.pence = pence
+        self.currency = currency
+
+    @classmethod
+    def of(cls, value, currency: str = DEFAULT_CURRENCY) -> 'Money':
+        """金额（int/str/float/Decimal 或 Money）-> Money"""
+        if isinstance(value, Money):
+            if value.currency != currency:
+                raise CurrencyError(f"币种不一致: {value.currency} / {currency}")
+            return value
+        return cls(to_pence(value), currency)
+
+    # ========== 运算 ==========
+
+    def _same(self, other: 'Money'):
+        if other.currency != self.currency:
+            raise CurrencyError(f"币种不一致: {self.currency} / {other.currency}")
+
+    def _pence_of(self, other):
+        """比较用：同币种金额或整数0"""
+        if isinstance(other, Money):
+            self._same(other)
+            return other.pence
+        if other == 0 and not isinstance(other, bool):
+            return 0
+        return None
+
+    def __add__(self, other):
+        if isinstance(other, Money):
+            self._same(other)
+            return Money(self.pence + other.pence, self.currency)
+        if isinstance(other, int) and other == 0:
+            return self
+        return NotImplemented
+
+    __radd__ = __add__
+
+    def __sub__(self, other):
+        if isinstance(other, Money):
+            self._same(other)
+            return Money(self.pence - other.pence, self.currency)
+        if isinstance(other, int) and other == 0:
+            return self
+        return NotImplemented
+
+    def __neg__(self):
+        return Money(-self.pence, self.currency)
+
+    def __abs__(self):
+        return Money(abs(self.pence), self.currency)
+
+    def __mul__(self, factor):
+        if isinstance(factor, int) and not isinstance(factor, bool):
+            return Money(self.pence * factor, self.currency)
+        return NotImplemented
+
+    __rmul__ = __mul__
+
+    def __truediv__(self, other):
+        if isinstance(other, Money):
+            self._same(other)
+            return self.pence / other.pence
+        if isinstance(other, int) and not isinstance(other, bool):
+            return Money(div_round(self.pence, other), self.currency)
+        return NotImplemented
+
+    def __eq__(self, other):
+        if isinstance(other, Money):
+            return self.pence == other.pence and self.currency == other.currency
+        if isinstance(other, int) and other == 0:
+            return self.pence == 0
+        return NotImplemented
+
+    def __hash__(self):
+        return hash((self.pence, self.currency))
+
+    def __lt__(self, other):
+        pence = self._pence_of(other)
+        return NotImplemented if pence is None else self.pence < pence
+
+    def __le__(self, other):
+        pence = self._pence_of(other)
+        return NotImplemented if pence is None else self.pence <= pence
+
+    def __gt__(self, other):
+        pence = self._pence_of(other)
+        return NotImplemented if pence is None else self.pence > pence
+
+    def __ge__(self, other):
+        pence = self._pence_of(other)
+        return NotImplemented if pence is None else self.pence >= pence
+
+    def __bool__(self):
+        return self.pence != 0
+
+    # ========== 输出 ==========
+
+    def __float__(self):
+        # 整数便士 / 100 的最短表示就是两位小数，JSON中不会出现 0.30000000000000004
+        return self.pence / 100
+
+    def __int__(self):
+        pounds = abs(self.pence) // 100   # 与 int(Decimal) 相同，向零截断
+        return pounds if self.pence >= 0 else -pounds
+
+    def __round__(self, ndigits=None):
+        return round(float(self), ndigits)
+
+    def to_decimal(self) -> Decimal:
+        return Decimal(self.pence).scaleb(-2)
+
+    @property
+    def symbol(self) -> str:
+        return CURRENCY_SYMBOLS.get(self.currency, self.currency + ' ')
+
+    def format(self, with_symbol: bool = True) -> str:
+        """显示文本：整数金额不带小数，如 £22,338、£830.50、-£1.50"""
+        pence = abs(self.pence)
+        if pence % 100 == 0:
+            text = f"{pence // 100:,}"
+        else:
+            text = f"{pence // 100:,}.{pence % 100:02d}"
+        if with_symbol:
+            text = self.symbol + text
+        return '-' + text if self.pence < 0 else text
+
+    def __format__(self, spec):
+        return format(self.to_decimal(), spec) if spec else str(self)
+
+    def __str__(self):
+        return self.format(with_symbol=False).replace(',', '')
+
+    def __repr__(self):
+        return f"Money({self.pence}, {self.currency!r})"
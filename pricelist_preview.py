@@ -0,0 +1,156 @@
+"""
+方案预览 - 同一份基础报价的多种优惠/礼品组合一次算出价格，不渲染
+顾问在表单上每改一次优惠或勾选一次礼品，只需要到手价和节省比例，不需要出图
+
+    - 基础报价解码后按请求内容缓存（礼品库变化后失效），价格汇总只算一次
+    - 每个方案只在基础报价的各项合计（便士）上加减变化的部分，
+      再用与报价单相同的公式（pricelist_pricing.summarize）得出结果，与完整生成的报价逐位一致
+"""
+import json
+import threading
+from collections import OrderedDict
+
+from pricelist_models import DecodeError, QuoteData, decode_quote_request, decode_variation
+from pricelist_money import Money
+from pricelist_pricing import PricingSummary, summarize
+
+MAX_VARIATIONS = 100
+
+
+def preview_result(summary: PricingSummary) -> dict:
+    """价格汇总 -> 接口JSON"""
+    return {
+        'original_annual_price': float(summary.original_annual_price),
+        'final_annual_price': float(summary.final_annual_price),
+        'final_weekly_price': float(summary.final_weekly_price),
+        'total_savings': float(summary.total_savings),
+        'savings_rate': round(summary.savings_rate, 2),
+    }
+
+
+class PreviewEngine:
+    """方案预览计算（基础报价LRU缓存，线程安全）"""
+
+    def __init__(self, select_gifts, gift_version=lambda: None, max_bases=256):
+        """
+        Args:
+            select_gifts: 礼品ID列表 -> Gift 列表（如 GiftLibrary.select）
+            gift_version: 返回礼品库当前版本，变化后缓存的基础报价失效
+            max_bases: 最多缓存的基础报价数
+        """
+        self.select_gifts = select_gifts
+        self.gift_version = gift_version
+        self.max_bases = max_bases
+        self.hits = 0
+        self.misses = 0
+
+        self._bases = OrderedDict()   # (请求内容, 礼品库版本) -> QuoteData
+        self._lock = threading.Lock()
+
+    def base(self, data: dict) -> QuoteData:
+        """解码基础报价（相同内容直接返回缓存，价格汇总已算好）"""
+        key = (json.dumps(data, sort_keys=True, ensure_ascii=False, separators=(',', ':')),
+               self.gift_version())
+        with self._lock:
+            quote = self._bases.get(key)
+            if quote is not None:
+                self._bases.move_to_end(key)
+                self.hits += 1
+                return quote
+
+        quote = decode_quote_request(data, self.select_gifts, path='base')
+        quote.summary   # 缓存的报价只读，汇总在这里算好
+
+        with self._lock:
+            self.misses += 1
+            self._bases[key] = quote
+            while len(self._bases) > self.max_bases:
+                self._bases.popitem(last=False)
+        return quote
+
+    def preview(self, data: dict, variations: list) -> dict:
+        """
+        计算基础报价和每个变化方案的价格
+
+        变化方案字段（都可省略）:
+            label                  方案名称，原样返回
+            weekly_price           周租金（原价年租金按 周租金 × 租期周数 重新计算）
+            landlord_discounts     替换房东优惠 [{"name", "amount"}]
+            uhomes_subsidies       替换异乡补贴
+            selected_gifts         替换礼品ID列表
+            add_gifts / remove_gifts  在（替换后的）礼品上增加 / 去掉的礼品ID（已选中的不重复计入）
+
+        Returns:
+            {"currency", "base": {...}, "variations": [{"index", "label", ...}]}
+
+        Raises:
+            DecodeError: 基础报价或某个方案无效
+        """
+        if not isinstance(variations, list):
+            raise DecodeError('variations', "应为数组")
+        if len(variations) > MAX_VARIATIONS:
+            raise DecodeError('variations', f"不能超过{MAX_VARIATIONS}项")
+
+        quote = self.base(data)
+        base = quote.summary
+        currency = quote.currency
+        lowest = base.lowest_competitor_price
+        lowest = None if lowest is None else lowest.pence
+
+        results = []
+        for index, item in enumerate(variations):
+            path = f"variations[{index}]"
+            change = decode_variation(item, path)
+
+            original = base.original_annual_price
+            if change['weekly_price'] is not None:
+                original = Money(change['weekly_price'] * base.weeks, currency)
+
+            landlord = base.total_landlord_discount.pence
+            if change['landlord_discounts'] is not None:
+                landlord = sum(d['amount'] for d in change['landlord_discounts'])
+
+            uhomes = base.total_uhomes_subsidy.pence
+            if change['uhomes_subsidies'] is not None:
+                uhomes = sum(d['amount'] for d in change['uhomes_subsidies'])
+
+            gifts = self._gifts_total(quote, base, change, currency, path)
+
+            summary = summarize(original, base.weeks, landlord, uhomes, gifts, lowest)
+            results.append({'index': index, 'label': change['label'], **preview_result(summary)})
+
+        return {
+            'currency': currency,
+            'base': preview_result(base),
+            'variations': results,
+        }
+
+    def _gifts_total(self, quote, base, change, currency, path) -> int:
+        """方案的礼品总价值（便士）：未替换礼品时在基础合计上加减，已选中的礼品不重复计入"""
+        removed = set(change['remove_gifts'])
+        if change['selected_gifts'] is None:
+            total = base.total_gifts_value.pence
+            if removed:
+                total -= sum(g.value.pence for g in quote.selected_gifts if g.id in removed)
+            current = {g.id for g in quote.selected_gifts if g.id not in removed}
+        else:
+            kept = [gift_id for gift_id in change['selected_gifts'] if gift_id not in removed]
+            total = self._select_total(kept, currency, f"{path}.selected_gifts")
+            current = set(kept)
+
+        added = [gift_id for gift_id in dict.fromkeys(change['add_gifts']) if gift_id not in current]
+        if added:
+            total += self._select_total(added, currency, f"{path}.add_gifts")
+        return total
+
+    def _select_total(self, gift_ids, currency, path) -> int:
+        total = 0
+        for gift in self.select_gifts(gift_ids) if gift_ids else ():
+            if gift.value.currency != currency:
+                raise DecodeError(path, f"礼品 {gift.id} 的币种 {gift.value.currency} 与报价 {currency} 不同")
+            total += gift.value.pence
+        return total
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {'bases': len(self._bases), 'hits': self.hits, 'misses': self.misses}
@@ -0,0 +1,226 @@
+"""
+价格汇总 - 报价单派生金额的一次性计算与缓存
+所有合计、到手价、优惠比例在一次遍历中算出，优惠/礼品/竞对列表变化时自动失效；
+金额为 Money（整数便士），合计只做整数加减，到手周租金四舍五入到便士
+"""
+from typing import NamedTuple, Optional
+
+from pricelist_money import CurrencyError, Money, div_round
+
+
+class PricingSummary(NamedTuple):
+    """报价单价格汇总（不可变；每次重新计算都要创建，用元组比冻结的dataclass快几倍）"""
+    weeks: int
+    original_annual_price: Money
+    total_landlord_discount: Money
+    total_uhomes_subsidy: Money
+    total_gifts_value: Money
+    final_annual_price: Money
+    final_weekly_price: Money
+    total_savings: Money
+    savings_rate: float
+    lowest_competitor_price: Optional[Money] = None
+    advantage_vs_competitor: Optional[Money] = None
+    advantage_rate: Optional[float] = None
+
+
+def _pence(items, attr, currency):
+    """各项金额（便士）列表，币种必须与报价一致"""
+    values = []
+    for item in items:
+        money = getattr(item, attr)
+        if money.currency != currency:
+            raise CurrencyError(f"币种不一致: {currency} / {money.currency}")
+        values.append(money.pence)
+    return values
+
+
+def compute_summary(original_annual_price: Money, weeks, landlord_discounts=(),
+                    uhomes_subsidies=(), selected_gifts=(),
+                    competitor_prices=()) -> PricingSummary:
+    """计算报价单的全部派生金额"""
+    currency = original_annual_price.currency
+    lowest = None
+    if competitor_prices:
+        lowest = min(_pence(competitor_prices, 'annual_price', currency))
+    return summarize(
+        original_annual_price,
+        weeks,
+        sum(_pence(landlord_discounts, 'amount', currency)),
+        sum(_pence(uhomes_subsidies, 'amount', currency)),
+        sum(_pence(selected_gifts, 'value', currency)),
+        lowest,
+    )
+
+
+def summarize(original_annual_price: Money, weeks: int, total_landlord: int,
+              total_uhomes: int, total_gifts: int, lowest: Optional[int] = None) -> PricingSummary:
+    """
+    由各项合计（便士）得出价格汇总
+
+    compute_summary 和方案预览（pricelist_preview，在已缓存的合计上加减变化量）共用这一个公式，
+    两者结果逐位一致
+    """
+    currency = original_annual_price.currency
+    original = original_annual_price.pence
+
+    final_annual = original - total_landlord - total_uhomes
+    final_weekly = div_round(final_annual, weeks) if weeks > 0 else 0
+    total_savings = total_landlord + total_uhomes + total_gifts
+
+    # 比例由精确的整数分子分母做一次浮点除法
+    savings_rate = total_savings * 100 / original if original > 0 else 0.0
+
+    advantage = None
+    advantage_rate = None
+    if lowest is not None:
+        advantage = lowest - final_annual
+        if lowest != 0:
+            advantage_rate = advantage * 100 / lowest
+
+    return PricingSummary(
+        weeks=weeks,
+        original_annual_price=original_annual_price,
+        total_landlord_discount=Money(total_landlord, currency),
+        total_uhomes_subsidy=Money(total_uhomes, currency),
+        total_gifts_value=Money(total_gifts, currency),
+        final_annual_price=Money(final_annual, currency),
+        final_weekly_price=Money(final_weekly, currency),
+        total_savings=Money(total_savings, currency),
+        savings_rate=savings_rate,
+        lowest_competitor_price=None if lowest is None else Money(lowest, currency),
+        advantage_vs_competitor=None if advantage is None else Money(advantage, currency),
+        advantage_rate=advantage_rate,
+    )
+
+
+class TrackedList(list):
+    """列表被修改（append、删除、排序等）时通知所属报价单"""
+
+    def __init__(self, iterable=(), on_change=None):
+        super().__init__(iterable)
+        self._on_change = on_change
+
+    def _changed(self):
+        on_change = getattr(self, '_on_change', None)
+        if on_change is not None:
+            on_change()
+
+
+def _tracked(name):
+    method = getattr(list, name)
+
+    def wrapper(self, *args, **kwargs):
+        result = method(self, *args, **kwargs)
+        self._changed()
+        return result
+
+    wrapper.__name__ = name
+    return wrapper
+
+
+for _name in ('__setitem__', '__delitem__', '__iadd__', '__imul__', 'append',
+              'extend', 'insert', 'pop', 'remove', 'clear', 'sort', 'reverse'):
+    setattr(TrackedList, _name, _tracked(_name))
+
+
+class PricingMixin:
+    """
+    报价单计算属性
+
+    派生金额在首次访问时一次算出并缓存；以下情况自动失效:
+    - 重新赋值价格、房源或任一列表字段
+    - 列表原地修改（append、remove 等）
+    - 房源租期周数变化
+    原地修改某个优惠或礼品的金额后，需要调用 invalidate()
+    """
+
+    __slots__ = ()   # 缓存的汇总保存在子类的 _summary 属性中
+
+    _PRICING_FIELDS = frozenset({
+        'property', 'original_weekly_price', 'original_annual_price',
+        'landlord_discounts', 'uhomes_subsidies', 'selected_gifts',
+        'competitor_prices',
+    })
+    _LIST_FIELDS = frozenset({
+        'landlord_discounts', 'uhomes_subsidies', 'selected_gifts',
+        'competitor_prices',
+    })
+
+    def __setattr__(self, name, value):
+        if name in self._LIST_FIELDS and not isinstance(value, TrackedList):
+            value = TrackedList(value, self.invalidate)
+        object.__setattr__(self, name, value)
+        if name in self._PRICING_FIELDS:
+            self.invalidate()
+
+    def invalidate(self):
+        """清除已缓存的价格汇总"""
+        object.__setattr__(self, '_summary', None)
+
+    @property
+    def summary(self) -> PricingSummary:
+        """价格汇总（缓存）"""
+        summary = getattr(self, '_summary', None)
+        weeks = self.property.weeks
+        if summary is None or summary.weeks != weeks:
+            summary = compute_summary(
+                self.original_annual_price,
+                weeks,
+                self.landlord_discounts,
+                self.uhomes_subsidies,
+                self.selected_gifts,
+                getattr(self, 'competitor_prices', ()),
+            )
+            object.__setattr__(self, '_summary', summary)
+        return summary
+
+    @property
+    def total_landlord_discount(self) -> Money:
+        """房东优惠总额"""
+        return self.summary.total_landlord_discount
+
+    @property
+    def total_uhomes_subsidy(self) -> Money:
+        """异乡补贴总额"""
+        return self.summary.total_uhomes_subsidy
+
+    @property
+    def total_gifts_value(self) -> Money:
+        """礼品总价值"""
+        return self.summary.total_gifts_value
+
+    @property
+    def final_annual_price(self) -> Money:
+        """最终年租金（到手价）"""
+        return self.summary.final_annual_price
+
+    @property
+    def final_weekly_price(self) -> Money:
+        """最终周租金"""
+        return self.summary.final_weekly_price
+
+    @property
+    def total_savings(self) -> Money:
+        """总节省金额（优惠 + 礼品）"""
+        return self.summary.total_savings
+
+    @property
+    def savings_rate(self) -> float:
+        """优惠比例"""
+        return self.summary.savings_rate
+
+    @property
+    def lowest_competitor_price(self) -> Optional[Money]:
+        """竞对最低价"""
+        return self.summary.lowest_competitor_price
+
+    @property
+    def advantage_vs_competitor(self) -> Optional[Money]:
+        """相比竞对的优势金额"""
+        return self.summary.advantage_vs_competitor
+
+    @property
+    def advantage_rate(self) -> Optional[float]:
+        """相比竞对的优势比例"""
+        return self.summary.advantage_rate
@@ -0,0 +1,252 @@
+"""
+批量价格计算 - 列式存储的报价批次
+成千上万份报价的到手价、节省金额、优惠比例在一次向量化计算中得出
+"""
+from typing import List
+
+import numpy as np
+
+from pricelist_money import DEFAULT_CURRENCY, CurrencyError, Money
+
+# 整数便士在 float64 中可精确表示的上限（再乘100计算比例时仍精确）
+MAX_EXACT_PENCE = 2 ** 53 // 100
+
+
+class QuoteBatch:
+    """
+    列式报价批次
+
+    金额以 int64 便士存储（与 Money 相同），加减完全精确；到手周租金按
+    四舍五入到便士，比例对精确的整数分子分母做一次 float64 除法，
+    结果与 QuoteData 的价格汇总逐位一致。一个批次只有一种币种。
+
+    valid 为有效掩码：金额超出精确范围的行，英镑金额和比例（下面的各属性）为NaN；
+    compute() 返回的便士列为 int64，无法表示NaN，需按 valid 自行过滤。
+    """
+
+    def __init__(self, original_weekly, original_annual, lease_start, lease_end,
+                 landlord, uhomes, gifts, competitor_min=None, valid=None,
+                 labels=None, currency=DEFAULT_CURRENCY):
+        """
+        Args:
+            original_weekly / original_annual: 原价（便士）
+            lease_start / lease_end: 租期（datetime64[D]）
+            landlord / uhomes / gifts: 房东优惠、异乡补贴、礼品价值合计（便士）
+            competitor_min: 竞对最低年租金（便士），无竞对为 -1
+            valid: 有效掩码
+            labels: 每行的 (房源名称, 户型, 地址)，用于转换回 QuoteData
+            currency: 金额币种
+        """
+        self.original_weekly = np.asarray(original_weekly, dtype=np.int64)
+        self.original_annual = np.asarray(original_annual, dtype=np.int64)
+        self.lease_start = np.asarray(lease_start, dtype='datetime64[D]')
+        self.lease_end = np.asarray(lease_end, dtype='datetime64[D]')
+        self.landlord = np.asarray(landlord, dtype=np.int64)
+        self.uhomes = np.asarray(uhomes, dtype=np.int64)
+        self.gifts = np.asarray(gifts, dtype=np.int64)
+
+        n = len(self.original_annual)
+        if competitor_min is None:
+            competitor_min = np.full(n, -1, dtype=np.int64)
+        self.competitor_min = np.asarray(competitor_min, dtype=np.int64)
+
+        if valid is None:
+            valid = np.ones(n, dtype=bool)
+        money = (self.original_annual, self.landlord, self.uhomes,
+                 self.gifts, self.competitor_min)
+        in_range = np.logical_and.reduce([np.abs(col) <= MAX_EXACT_PENCE for col in money])
+        self.valid = np.asarray(valid, dtype=bool) & in_range
+
+        self.labels = labels if labels is not None else [('', '', '')] * n
+        self.currency = currency
+
+        # 租期周数（与 PropertyInfo.weeks 相同：至少1周）
+        days = (self.lease_end - self.lease_start).astype(np.int64)
+        self.weeks = np.maximum(1, days // 7)
+
+        self._results = None
+
+    def __len__(self):
+        return len(self.original_annual)
+
+    # ========== 转换 ==========
+
+    @classmethod
+    def from_quotes(cls, quotes) -> 'QuoteBatch':
+        """从 QuoteData 列表构建批次（只做整数便士累加；所有报价须为同一币种）"""
+        n = len(quotes)
+        currency = quotes[0].original_weekly_price.currency if quotes else DEFAULT_CURRENCY
+        weekly = np.zeros(n, dtype=np.int64)
+        annual = np.zeros(n, dtype=np.int64)
+        starts = np.empty(n, dtype='datetime64[D]')
+        ends = np.empty(n, dtype='datetime64[D]')
+        landlord = np.zeros(n, dtype=np.int64)
+        uhomes = np.zeros(n, dtype=np.int64)
+        gifts = np.zeros(n, dtype=np.int64)
+        competitor = np.full(n, -1, dtype=np.int64)
+        labels = []
+
+        def pence(money):
+            if money.currency != currency:
+                raise CurrencyError(f"币种不一致: {currency} / {money.currency}")
+            return money.pence
+
+        for i, quote in enumerate(quotes):
+            prop = quote.property
+            starts[i] = prop.lease_start
+            ends[i] = prop.lease_end
+            labels.append((prop.property_name, prop.room_type, prop.address))
+
+            weekly[i] = pence(quote.original_weekly_price)
+            annual[i] = pence(quote.original_annual_price)
+            landlord[i] = sum(pence(d.amount) for d in quote.landlord_discounts)
+            uhomes[i] = sum(pence(s.amount) for s in quote.uhomes_subsidies)
+            gifts[i] = sum(pence(g.value) for g in quote.selected_gifts)
+
+            competitor_prices = getattr(quote, 'competitor_prices', None)
+            if competitor_prices:
+                competitor[i] = min(pence(cp.annual_price) for cp in competitor_prices)
+
+        return cls(weekly, annual, starts, ends, landlord, uhomes, gifts,
+                   competitor, labels=labels, currency=currency)
+
+    def to_quotes(self, models) -> List:
+        """
+        转换回 QuoteData 列表
+
+        models 为提供 PropertyInfo / Discount / Gift / CompetitorPrice / QuoteData
+        等类的模块（如 pricelist_models）。批次只保存合计值，所以每类优惠、
+        礼品各合并为一项，竞对只保留最低价；价格计算结果与原报价一致。
+        """
+        quotes = []
+        for i in range(len(self)):
+            name, room_type, address = self.labels[i]
+            prop = models.PropertyInfo(
+                property_name=name,
+                room_type=room_type,
+                address=address,
+                lease_start=self.lease_start[i].item(),
+                lease_end=self.lease_end[i].item(),
+            )
+
+            landlord = []
+            if self.landlord[i]:
+                landlord.append(models.Discount(
+                    name="房东优惠", amount=_money(self.landlord[i], self.currency),
+                    payer=models.DiscountPayer.LANDLORD,
+                ))
+            uhomes = []
+            if self.uhomes[i]:
+                uhomes.append(models.Discount(
+                    name="异乡补贴", amount=_money(self.uhomes[i], self.currency),
+                    payer=models.DiscountPayer.UHOMES,
+                ))
+            gifts = []
+            if self.gifts[i]:
+                gifts.append(models.Gift(
+                    id="gifts_total", name="礼品合计", value=_money(self.gifts[i], self.currency),
+                    category=models.GiftCategory.GIFT, unit=self.currency,
+                ))
+            competitors = []
+            if self.competitor_min[i] >= 0:
+                annual = _money(self.competitor_min[i], self.currency)
+                competitors.append(models.CompetitorPrice(
+                    platform="竞对最低价", weekly_price=annual / int(self.weeks[i]),
+                    annual_price=annual,
+                ))
+
+            quotes.append(models.QuoteData(
+                property=prop,
+                original_weekly_price=_money(self.original_weekly[i], self.currency),
+                original_annual_price=_money(self.original_annual[i], self.currency),
+                landlord_discounts=landlord,
+                uhomes_subsidies=uhomes,
+                selected_gifts=gifts,
+                competitor_prices=competitors,
+            ))
+        return quotes
+
+    # ========== 向量化计算 ==========
+
+    def compute(self) -> dict:
+        """
+        一次算出所有派生值（结果缓存）
+
+        返回字典中金额列（含到手周租金）为 int64 便士，比例为 float64（百分比）；
+        无效行的 float 列为NaN，无竞对行的 advantage_rate 为NaN
+        """
+        if self._results is not None:
+            return self._results
+
+        final_annual = self.original_annual - self.landlord - self.uhomes
+        total_savings = self.landlord + self.uhomes + self.gifts
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            savings_rate = np.where(
+                self.original_annual > 0,
+                (total_savings * 100) / self.original_annual,
+                0.0,
+            )
+
+            has_competitor = self.competitor_min >= 0
+            advantage = np.where(has_competitor, self.competitor_min - final_annual, 0)
+            advantage_rate = np.where(
+                has_competitor & (self.competitor_min != 0),
+                (advantage * 100) / np.where(self.competitor_min != 0, self.competitor_min, 1),
+                np.nan,
+            )
+
+        # 到手周租金四舍五入（0.5 远离零）到便士，与 Money 的除法相同
+        quotient, remainder = np.divmod(np.abs(final_annual), self.weeks)
+        final_weekly = np.sign(final_annual) * (quotient + (remainder * 2 >= self.weeks))
+
+        invalid = ~self.valid
+        savings_rate[invalid] = np.nan
+        advantage_rate[invalid] = np.nan
+
+        self._results = {
+            'final_annual_price': final_annual,
+            'final_weekly_price': final_weekly,
+            'total_savings': total_savings,
+            'savings_rate': savings_rate,
+            'has_competitor': has_competitor,
+            'advantage_vs_competitor': advantage,
+            'advantage_rate': advantage_rate,
+        }
+        return self._results
+
+    @property
+    def final_annual_price(self) -> np.ndarray:
+        """最终年租金（英镑），无效行为NaN"""
+        return np.where(self.valid, self.compute()['final_annual_price'] / 100, np.nan)
+
+    @property
+    def final_weekly_price(self) -> np.ndarray:
+        """最终周租金（英镑），无效行为NaN"""
+        return np.where(self.valid, self.compute()['final_weekly_price'] / 100, np.nan)
+
+    @property
+    def total_savings(self) -> np.ndarray:
+        """总节省金额（英镑），无效行为NaN"""
+        return np.where(self.valid, self.compute()['total_savings'] / 100, np.nan)
+
+    @property
+    def savings_rate(self) -> np.ndarray:
+        """优惠比例（%），无效行为NaN"""
+        return self.compute()['savings_rate']
+
+    @property
+    def advantage_vs_competitor(self) -> np.ndarray:
+        """相比竞对的优势金额（英镑），无竞对或无效行为NaN"""
+        results = self.compute()
+        return np.where(results['has_competitor'] & self.valid,
+                        results['advantage_vs_competitor'] / 100, np.nan)
+
+    @property
+    def advantage_rate(self) -> np.ndarray:
+        """相比竞对的优势比例（%），无竞对或无效行为NaN"""
+        return self.compute()['advantage_rate']
+
+
+def _money(pence, currency) -> Money:
+    return Money(int(pence), currency)
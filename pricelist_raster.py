@@ -0,0 +1,544 @@
+"""
+光栅渲染 - 不启动浏览器，用Pillow直接绘制简洁版报价单（simple 布局）
+版式与 pricelist-quote-simple.html 一致：头部、房源信息、价格明细、礼品、到手价、顾问和页脚，
+颜色和文案取自品牌配置；其他布局仍由浏览器截图
+
+字体按以下顺序查找（可用环境变量指定）:
+    RASTER_FONT        中文常规字体（Noto Sans CJK / 文泉驿 / 苹方 / 微软雅黑）
+    RASTER_FONT_BOLD   中文粗体，未找到时使用常规字体
+    RASTER_EMOJI_FONT  彩色emoji字体（Noto Color Emoji / Apple Color Emoji），未找到时不绘制emoji
+"""
+import functools
+import io
+import os
+import re
+
+from PIL import Image, ImageDraw, ImageFont
+
+from pricelist_brand import load_brand_module
+
+# 支持光栅渲染的布局
+RASTER_LAYOUTS = ('simple',)
+
+REGULAR_FONTS = (
+    '/usr/share/fonts/opentype/noto/NotoSansCJK-Regular.ttc',
+    '/usr/share/fonts/noto-cjk/NotoSansCJK-Regular.ttc',
+    '/usr/share/fonts/google-noto-cjk/NotoSansCJK-Regular.ttc',
+    '/usr/share/fonts/truetype/wqy/wqy-microhei.ttc',
+    '/usr/share/fonts/wqy-microhei/wqy-microhei.ttc',
+    '/System/Library/Fonts/PingFang.ttc',
+    'C:/Windows/Fonts/msyh.ttc',
+)
+
+BOLD_FONTS = (
+    '/usr/share/fonts/opentype/noto/NotoSansCJK-Bold.ttc',
+    '/usr/share/fonts/noto-cjk/NotoSansCJK-Bold.ttc',
+    '/usr/share/fonts/google-noto-cjk/NotoSansCJK-Bold.ttc',
+    'C:/Windows/Fonts/msyhbd.ttc',
+)
+
+EMOJI_FONTS = (
+    '/usr/share/fonts/truetype/noto/NotoColorEmoji.ttf',
+    '/usr/share/fonts/noto/NotoColorEmoji.ttf',
+    '/usr/share/fonts/google-noto-emoji/NotoColorEmoji.ttf',
+    '/System/Library/Fonts/Apple Color Emoji.ttc',
+)
+
+# 彩色emoji字体只提供固定尺寸的位图
+EMOJI_BITMAP_SIZES = (109, 160, 96, 64, 48)
+
+# 附着在前一个emoji上的字符（变体选择符、零宽连接符）
+EMOJI_JOINERS = ('\ufe0f', '\u200d')
+
+# 换行单位：连续的拉丁字母/数字为一个单词，其余逐字
+WRAP_TOKEN = re.compile(r"[A-Za-z0-9£$%.,'\-]+\s*|\s+|.")
+
+LINE_HEIGHT = 1.4
+
+WHITE = '#FFFFFF'
+TEXT = '#333333'
+MUTED = '#999999'
+
+
+# ========== 字体 ==========
+
+def _find_font(env, candidates):
+    path = os.getenv(env)
+    if path:
+        if os.path.exists(path):
+            return path
+        print(f"⚠️ {env} 指定的字体不存在: {path}")
+    for candidate in candidates:
+        if os.path.exists(candidate):
+            return candidate
+    return None
+
+
+@functools.lru_cache(maxsize=None)
+def font_paths() -> dict:
+    """当前使用的字体文件 {'regular', 'bold', 'emoji'}（未找到为None）"""
+    regular = _find_font('RASTER_FONT', REGULAR_FONTS)
+    if regular is None:
+        print("⚠️ 未找到中文字体，光栅渲染不可用（可设置 RASTER_FONT）")
+    return {
+        'regular': regular,
+        'bold': _find_font('RASTER_FONT_BOLD', BOLD_FONTS) or regular,
+        'emoji': _find_font('RASTER_EMOJI_FONT', EMOJI_FONTS),
+    }
+
+
+def available() -> bool:
+    """是否找到了中文字体（否则调用方应改用浏览器截图）"""
+    return font_paths()['regular'] is not None
+
+
+def face_index(path):
+    # Noto Sans CJK 字体集合中简体中文是第3个字形
+    return 2 if 'NotoSansCJK' in os.path.basename(path) else 0
+
+
+@functools.lru_cache(maxsize=64)
+def _font(path, size):
+    return ImageFont.truetype(path, size, index=face_index(path))
+
+
+@functools.lru_cache(maxsize=4096)
+def _text_length(path, size, text):
+    # 标签、金额等短文本在多次渲染间大量重复，缓存测量结果
+    return _font(path, size).getlength(text)
+
+
+@functools.lru_cache(maxsize=None)
+def _emoji_font():
+    path = font_paths()['emoji']
+    if path is None:
+        return None
+    for size in EMOJI_BITMAP_SIZES:
+        try:
+            return ImageFont.truetype(path, size)
+        except OSError:
+            continue
+    print(f"⚠️ 无法加载emoji字体: {path}")
+    return None
+
+
+@functools.lru_cache(maxsize=256)
+def _emoji_glyph(text, size):
+    """按字体原生尺寸绘制emoji，再缩放到 size 像素高"""
+    font = _emoji_font()
+    left, top, right, bottom = font.getbbox(text, embedded_color=True)
+    glyph = Image.new('RGBA', (max(1, right - left), max(1, bottom - top)), (0, 0, 0, 0))
+    ImageDraw.Draw(glyph).text((-left, -top), text, font=font, embedded_color=True)
+    width = max(1, round(glyph.width * size / glyph.height))
+    return glyph.resize((width, size), Image.LANCZOS)
+
+
+def is_emoji(char):
+    code = ord(char)
+    return (0x1F000 <= code <= 0x1FAFF or 0x2600 <= code <= 0x27BF
+            or 0x2300 <= code <= 0x23FF or 0x2B00 <= code <= 0x2BFF)
+
+
+def _runs(text):
+    """把文本拆成 [(是否emoji, 片段)]"""
+    runs = []
+    for char in text:
+        emoji = is_emoji(char) or (char in EMOJI_JOINERS and bool(runs) and runs[-1][0])
+        if runs and runs[-1][0] == emoji:
+            runs[-1][1] += char
+        else:
+            runs.append([emoji, char])
+    if _emoji_font() is None:
+        # 没有emoji字体时去掉emoji，避免画出方框
+        runs = [[False, ''.join(part for emoji, part in runs if not emoji).strip()]]
+    return runs
+
+
+# ========== 画布 ==========
+
+@functools.lru_cache(maxsize=32)
+def _diagonal_mask(width, height):
+    """从左上(0)到右下(255)的渐变蒙版"""
+    vertical = Image.linear_gradient('L').resize((width, height))
+    horizontal = Image.linear_gradient('L').rotate(90).resize((width, height))
+    return Image.blend(horizontal, vertical, height / (width + height))
+
+
+class _Card:
+    """按CSS像素排版、按 scale 倍绘制的画布（高度随内容增长）"""
+
+    def __init__(self, width, scale):
+        self.width = width
+        self.scale = scale
+        self.y = 0
+        self.image = Image.new('RGB', (self.px(width), self.px(1600)), WHITE)
+        self.draw = ImageDraw.Draw(self.image)
+
+    def px(self, value):
+        return int(round(value * self.scale))
+
+    def ensure(self, bottom):
+        needed = self.px(bottom)
+        if needed > self.image.height:
+            image = Image.new('RGB', (self.image.width, max(needed, self.image.height * 2)), WHITE)
+            image.paste(self.image, (0, 0))
+            self.image = image
+            self.draw = ImageDraw.Draw(image)
+
+    def box(self, x0, y0, x1, y1, fill=None, radius=0, outline=None, width=1):
+        self.ensure(y1)
+        self.draw.rounded_rectangle(
+            [self.px(x0), self.px(y0), self.px(x1) - 1, self.px(y1) - 1],
+            radius=self.px(radius), fill=fill, outline=outline,
+            width=self.px(width) if outline else 0,
+        )
+
+    def line(self, x0, x1, y, color, width=1, dash=None):
+        self.ensure(y + width)
+        top, bottom = self.px(y), self.px(y + width) - 1
+        if not dash:
+            self.draw.rectangle([self.px(x0), top, self.px(x1) - 1, bottom], fill=color)
+            return
+        x = x0
+        while x < x1:
+            self.draw.rectangle([self.px(x), top, self.px(min(x + dash, x1)) - 1, bottom], fill=color)
+            x += dash * 2
+
+    def gradient(self, x0, y0, x1, y1, start, end, mask=None):
+        """135度线性渐变（左上 start -> 右下 end）"""
+        self.ensure(y1)
+        width, height = self.px(x1) - self.px(x0), self.px(y1) - self.px(y0)
+        fill = Image.composite(Image.new('RGB', (width, height), end),
+                               Image.new('RGB', (width, height), start),
+                               _diagonal_mask(width, height))
+        self.image.paste(fill, (self.px(x0), self.px(y0)), mask)
+
+    def circle_mask(self, diameter):
+        size = self.px(diameter)
+        mask = Image.new('L', (size, size), 0)
+        ImageDraw.Draw(mask).ellipse([0, 0, size - 1, size - 1], fill=255)
+        return mask
+
+    # ---------- 文字 ----------
+
+    def measure(self, text, size, bold=False):
+        """文字宽度（CSS像素）"""
+        total = 0
+        for emoji, part in _runs(text):
+            if emoji:
+                total += _emoji_glyph(part, self.px(size)).width / self.scale
+            else:
+                total += _text_length(self._font_path(bold), self.px(size), part) / self.scale
+        return total
+
+    def text(self, x, y, text, size, color=TEXT, bold=False, align='left'):
+        """在 y 行顶绘制一行文字，返回行高"""
+        line = size * LINE_HEIGHT
+        self.ensure(y + line)
+        if align != 'left':
+            width = self.measure(text, size, bold)
+            x -= width if align == 'right' else width / 2
+
+        baseline = self.px(y + (line + size * 0.8) / 2)
+        cursor = self.px(x)
+        for emoji, part in _runs(text):
+            if emoji:
+                glyph = _emoji_glyph(part, self.px(size))
+                self.image.paste(glyph, (cursor, baseline - round(glyph.height * 0.88)), glyph)
+                cursor += glyph.width
+            else:
+                path = self._font_path(bold)
+                self.draw.text((cursor, baseline), part, font=_font(path, self.px(size)),
+                               fill=color, anchor='ls')
+                cursor += round(_text_length(path, self.px(size), part))
+        return line
+
+    def spans(self, x, y, spans, align='left'):
+        """同一行绘制多段不同样式的文字 spans: [(文字, 字号, 颜色, 粗体)]"""
+        widths = [self.measure(text, size, bold) for text, size, _, bold in spans]
+        tallest = max(size for _, size, _, _ in spans)
+        if align == 'center':
+            x -= sum(widths) / 2
+        for (text, size, color, bold), width in zip(spans, widths):
+            # 按最大字号对齐基线
+            self.text(x, y + (tallest - size) * LINE_HEIGHT / 2, text, size, color, bold)
+            x += width
+        return tallest * LINE_HEIGHT
+
+    def fit(self, text, size, max_width, bold=False):
+        """超出宽度时截断并加省略号"""
+        if self.measure(text, size, bold) <= max_width:
+            return text
+        while text and self.measure(text + '…', size, bold) > max_width:
+            text = text[:-1]
+        return text + '…'
+
+    def wrap(self, text, size, max_width, bold=False):
+        """按宽度换行（中文逐字、英文和数字按单词）"""
+        lines, current = [], ''
+        for token in WRAP_TOKEN.findall(text):
+            if current and self.measure(current + token, size, bold) > max_width:
+                lines.append(current.rstrip())
+                current = token.lstrip()
+            else:
+                current += token
+        return lines + [current] if current or not lines else lines
+
+    @staticmethod
+    def _font_path(bold):
+        paths = font_paths()
+        return paths['bold'] if bold else paths['regular']
+
+    def png(self, height=None):
+        height = self.px(height if height is not None else self.y)
+        image = self.image.crop((0, 0, self.image.width, min(height, self.image.height)))
+        buffer = io.BytesIO()
+        # 只做快速压缩，超过大小上限时由 fit_image 重新编码
+        image.save(buffer, format='PNG', compress_level=1)
+        return buffer.getvalue()
+
+
+# ========== 版块 ==========
+
+PAD = 24
+
+
+def _money(value):
+    return f"£{int(value)}"
+
+
+def _header(card, data, brand):
+    colors = brand.BRAND_SECONDARY_COLORS
+    name_lines = card.wrap(data['property']['property_name'], 18, card.width - PAD * 2)
+    height = 32 + 28 + 12 + 34 + 8 + 18 * LINE_HEIGHT * len(name_lines) + 32
+
+    card.gradient(0, 0, card.width, height, brand.BRAND_PRIMARY_COLOR, colors['dark_red'])
+    center = card.width / 2
+    y = 32
+    card.text(center, y, brand.BRAND_NAME_CN, 20, WHITE, bold=True, align='center')
+    y += 28 + 12
+    card.text(center, y, '🏠 专属报价单', 24, WHITE, bold=True, align='center')
+    y += 34 + 8
+    for line in name_lines:
+        y += card.text(center, y, line, 18, WHITE, align='center')
+    card.y = height
+
+
+def _section_start(card, title):
+    card.y += PAD
+    card.y += card.text(PAD, card.y, title, 18, bold=True) + 16
+
+
+def _section_end(card, brand):
+    card.y += PAD
+    card.line(0, card.width, card.y - 1, brand.BRAND_SECONDARY_COLORS['border_gray'])
+
+
+def _row(card, label, value, size=15, bold_label=False):
+    """左标签右数值的一行（数值过长时换行右对齐）"""
+    right = card.width - PAD
+    label_width = card.measure(label, size, bold_label) + 16
+    lines = card.wrap(value, size, right - PAD - label_width, bold=True)
+    card.y += 12
+    card.text(PAD, card.y, label, size, bold=bold_label)
+    for line in lines:
+        card.y += card.text(right, card.y, line, size, bold=True, align='right')
+    card.y += 12
+
+
+def _property(card, data, brand):
+    _section_start(card, '📋 房源信息')
+    prop = data['property']
+    _row(card, '户型', prop['room_type'])
+    _row(card, '租期', prop['lease_period_text'])
+    _row(card, '地址', prop['address'])
+    _section_end(card, brand)
+
+
+def _discount_group(card, title, badge, items, subtotal, brand):
+    colors = brand.BRAND_SECONDARY_COLORS
+    left, right = PAD, card.width - PAD
+    inner_left, inner_right = left + 16, right - 16
+    height = 16 + 22 + 12 + len(items) * (8 + 21 + 8) + 8 + 12 + 21 + 12 + 16
+
+    card.y += 16
+    top = card.y
+    card.box(left, top, right, top + height, fill=colors['light_gray'], radius=12)
+
+    y = top + 16
+    title_width = card.measure(title, 16, bold=True)
+    card.text(inner_left, y, title, 16, bold=True)
+    badge_left = inner_left + title_width + 8
+    badge_width = card.measure(badge['text'], 12) + 20
+    card.box(badge_left, y + 2, badge_left + badge_width, y + 20, fill=badge['bg_color'], radius=4)
+    card.text(badge_left + 10, y + 2, badge['text'], 12, badge['text_color'])
+    y += 22 + 12
+
+    amount_color = colors['success_green']
+    for item in items:
+        y += 8
+        amount = f"-{_money(item['amount'])}"
+        amount_width = card.measure(amount, 15, bold=True)
+        name = card.fit(item['name'], 15, inner_right - inner_left - 16 - amount_width - 12)
+        card.text(inner_left + 16, y, name, 15)
+        card.text(inner_right, y, amount, 15, amount_color, bold=True, align='right')
+        y += 21 + 8
+
+    y += 8
+    card.line(inner_left, inner_right, y, '#DDDDDD', dash=4)
+    y += 12
+    card.text(inner_left, y, '小计', 15, bold=True)
+    card.text(inner_right, y, f"-{_money(subtotal)}", 15, amount_color, bold=True, align='right')
+    card.y = top + height + 16
+
+
+def _prices(card, data, brand):
+    _section_start(card, '💰 价格明细')
+    right = card.width - PAD
+    card.y += 12
+    card.text(PAD, card.y, '房东原价', 18, bold=True)
+    card.y += card.text(right, card.y, f"{_money(data['original_annual_price'])}/年", 18,
+                        bold=True, align='right')
+    card.y += 12
+    card.line(PAD, right, card.y, brand.BRAND_SECONDARY_COLORS['border_gray'], width=2)
+    card.y += 2
+
+    badges = brand.PAYER_BADGES
+    if data['landlord_discounts']:
+        _discount_group(card, '💳 房东优惠', badges['landlord'], data['landlord_discounts'],
+                        data['total_landlord_discount'], brand)
+    if data['uhomes_subsidies']:
+        _discount_group(card, '🎁 异乡补贴', badges['uhomes'], data['uhomes_subsidies'],
+                        data['total_uhomes_subsidy'], brand)
+    _section_end(card, brand)
+
+
+def _gifts(card, data, brand):
+    gifts = data['selected_gifts']
+    if not gifts:
+        return
+
+    colors = brand.BRAND_SECONDARY_COLORS
+    _section_start(card, '🎁 异乡赠送礼包')
+    card.y -= 4   # 礼品网格自带12px上边距
+    gap = 12
+    column = (card.width - PAD * 2 - gap) / 2
+    height = 12 + 20 + 22 + 12
+
+    for index, gift in enumerate(gifts):
+        row, col = divmod(index, 2)
+        x = PAD + col * (column + gap)
+        y = card.y + row * (height + gap)
+        card.box(x, y, x + column, y + height, fill=WHITE, radius=8,
+                 outline=colors['border_gray'], width=2)
+        card.text(x + 12, y + (height - 32 * LINE_HEIGHT) / 2, gift['icon'], 32)
+        text_left = x + 12 + 32 + 12
+        name = card.fit(gift['name'], 14, x + column - 12 - text_left, bold=True)
+        card.text(text_left, y + 12, name, 14, bold=True)
+        card.text(text_left, y + 12 + 20, f"价值{_money(gift['value'])}", 16,
+                  brand.BRAND_PRIMARY_COLOR, bold=True)
+
+    rows = (len(gifts) + 1) // 2
+    card.y += rows * height + (rows - 1) * gap + 16
+
+    banner = 12 + 28 + 12
+    card.box(PAD, card.y, card.width - PAD, card.y + banner, fill='#FFF9E5', radius=4)
+    card.box(PAD, card.y, PAD + 4, card.y + banner, fill='#FFB800')
+    card.spans(PAD + 4 + 16, card.y + 12, [
+        ('🎉 礼包总价值: ', 15, '#856404', False),
+        (_money(data['total_gifts_value']), 20, brand.BRAND_PRIMARY_COLOR, True),
+    ])
+    card.y += banner
+    _section_end(card, brand)
+
+
+def _final_price(card, data, brand):
+    colors = brand.BRAND_SECONDARY_COLORS
+    height = 24 + 22 + 8 + 50 + 25 + 16 + 16 + 31 + 4 + 18 + 24
+    top = card.y
+    card.gradient(0, top, card.width, top + height, colors['warning_yellow'], colors['light_red'])
+
+    center = card.width / 2
+    y = top + 24
+    card.text(center, y, '✨ 您的租金到手价', 16, colors['gray'], align='center')
+    y += 22 + 8
+    card.text(center, y, f"{_money(data['final_annual_price'])}/年", 36,
+              brand.BRAND_PRIMARY_COLOR, bold=True, align='center')
+    y += 50
+    card.text(center, y, f"({_money(data['final_weekly_price'])}/周)", 18, colors['gray'],
+              align='center')
+    y += 25 + 16
+    card.line(PAD, card.width - PAD, y, '#E8E1D0')
+    y += 16
+
+    stats = (
+        (_money(data['total_savings']), '💰 总节省金额'),
+        (f"{round(data['savings_rate'], 1)}%", '📊 优惠幅度'),
+    )
+    for index, (value, label) in enumerate(stats):
+        x = card.width * (1 + 2 * index) / 4
+        card.text(x, y, value, 22, colors['success_green'], bold=True, align='center')
+        card.text(x, y + 31 + 4, label, 13, colors['gray'], align='center')
+    card.y = top + height
+
+
+def _advisor(card, data, brand):
+    advisor = data.get('advisor')
+    if not advisor:
+        return
+
+    colors = brand.BRAND_SECONDARY_COLORS
+    _section_start(card, '👤 您的专属顾问')
+    height = 20 + 64 + 20
+    top = card.y
+    card.box(PAD, top, card.width - PAD, top + height, fill=colors['light_gray'], radius=12)
+
+    avatar_x, avatar_y = PAD + 20, top + 20
+    card.gradient(avatar_x, avatar_y, avatar_x + 64, avatar_y + 64,
+                  brand.BRAND_PRIMARY_COLOR, colors['dark_red'], mask=card.circle_mask(64))
+    card.text(avatar_x + 32, avatar_y + (64 - 24 * LINE_HEIGHT) / 2, advisor['avatar_initial'],
+              24, WHITE, bold=True, align='center')
+
+    x = avatar_x + 64 + 16
+    width = card.width - PAD - 20 - x
+    y = top + 20 + 2
+    y += card.text(x, y, card.fit(advisor['name'], 18, width, bold=True), 18, bold=True) + 2
+    y += card.text(x, y, card.fit(f"📱 {advisor['phone']}", 14, width), 14, colors['gray'])
+    card.text(x, y, card.fit(f"💬 {advisor['wechat_id']}", 14, width), 14, colors['gray'])
+    card.y = top + height
+    _section_end(card, brand)
+
+
+def _footer(card, data, brand):
+    colors = brand.BRAND_SECONDARY_COLORS
+    height = 20 + 18 + 8 + 18 + 20
+    top = card.y
+    card.box(0, top, card.width, top + height, fill=colors['light_gray'])
+    center = card.width / 2
+    card.spans(center, top + 20, [
+        ('⏰ 报价有效期: ', 13, MUTED, False),
+        (data['valid_until'], 13, brand.BRAND_PRIMARY_COLOR, True),
+    ], align='center')
+    card.text(center, top + 20 + 18 + 8, f"{brand.BRAND_NAME_CN} · {brand.BRAND_SLOGAN_CN}", 13,
+              colors['gray'], align='center')
+    card.y = top + height
+
+
+def render_card(data: dict, width: int = 375, scale: float = 2, height: int = None) -> bytes:
+    """
+    绘制简洁版报价单，返回PNG字节
+
+    Args:
+        data: 报价单模板数据（与 generate_html 传给模板的字典相同）
+        width: 版面宽度（CSS像素，对应截图视口宽度）
+        scale: 设备像素比
+        height: 只保留前 height 个CSS像素（对应非整页截图），默认整页
+    """
+    if not available():
+        raise RuntimeError("未找到中文字体，无法使用光栅渲染")
+
+    brand = load_brand_module()
+    card = _Card(width, scale)
+    for section in (_header, _property, _prices, _gifts, _final_price, _advisor, _footer):
+        section(card, data, brand)
+    return card.png(height)
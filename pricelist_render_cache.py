@@ -0,0 +1,274 @@
+"""
+渲染缓存 - 按报价内容寻址的HTML/PNG磁盘缓存
+相同的报价（房源、优惠、礼品、顾问、有效期）直接复用上次的渲染结果
+"""
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from decimal import Decimal
+from typing import Optional, Tuple
+
+from pricelist_money import Money
+
+# 每个缓存条目一个文件: 第一行JSON元信息，随后是HTML和PNG字节
+ENTRY_SUFFIX = '.entry'
+
+_version_cache = {}
+
+
+def file_version(path: str) -> str:
+    """文件内容哈希（按mtime和大小缓存，文件不变时不重复计算）"""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return 'missing'
+
+    stamp = (st.st_mtime_ns, st.st_size)
+    cached = _version_cache.get(path)
+    if cached and cached[0] == stamp:
+        return cached[1]
+
+    with open(path, 'rb') as f:
+        digest = hashlib.sha256(f.read()).hexdigest()[:16]
+    _version_cache[path] = (stamp, digest)
+    return digest
+
+
+def normalize_value(value):
+    """把报价数据转换为稳定的可哈希形式"""
+    if isinstance(value, Money):
+        return f"{value.pence}{value.currency}"
+    if isinstance(value, Decimal):
+        # 400、400.0、400.00 视为同一金额
+        return format(value.normalize(), 'f')
+    if isinstance(value, dict):
+        return {k: normalize_value(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [normalize_value(v) for v in value]
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    if hasattr(value, 'value') and hasattr(value, 'name'):  # Enum
+        return value.value
+    return value
+
+
+class RenderCache:
+    """
+    有界磁盘LRU缓存
+
+    - 命中时更新文件mtime，淘汰时按mtime从旧到新删除
+    - 超过 ttl 秒的条目视为过期
+    - 文件按键前两位分目录存放，多个worker进程共享同一目录
+    """
+
+    def __init__(self, directory, max_bytes=200 * 1024 * 1024,
+                 max_entries=2000, ttl=24 * 3600):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.ttl = ttl
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self._lock = threading.Lock()
+        self._total_bytes = None   # 估算值，首次使用时扫描目录
+        self._total_entries = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0 and self.max_entries > 0
+
+    # ========== 键 ==========
+
+    def make_key(self, quote: dict, layout: str, viewport: dict,
+                 **versions) -> str:
+        """
+        生成缓存键
+
+        Args:
+            quote: 归一化前的报价数据（需包含有效期等随日期变化的字段）
+            layout: 模板布局名称
+            viewport: 截图视口
+            versions: 模板、品牌配置等的版本号
+        """
+        payload = {
+            'quote': normalize_value(quote),
+            'layout': layout,
+            'viewport': viewport,
+            'versions': versions,
+        }
+        raw = json.dumps(payload, sort_keys=True, ensure_ascii=False,
+                         separators=(',', ':'))
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+    # ========== 读写 ==========
+
+    def get(self, key: str, with_info: bool = False) -> Optional[Tuple]:
+        """读取缓存，返回 (html, png)（with_info 时为 (html, png, info)）；未命中返回None"""
+        if not self.enabled:
+            return None
+
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                meta = json.loads(f.readline())
+                html = f.read(meta['html_len']).decode('utf-8')
+                png = f.read()
+        except (OSError, ValueError, KeyError):
+            self._record(hit=False)
+            return None
+
+        if time.time() - meta.get('created', 0) > self.ttl:
+            self._remove(path)
+            self._record(hit=False)
+            return None
+
+        # 更新访问时间（LRU）
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+
+        self._record(hit=True)
+        if with_info:
+            return html, png, meta.get('info')
+        return html, png
+
+    def put(self, key: str, html: str, png: bytes, info: dict = None):
+        """写入缓存（先写临时文件再原子替换）；info 为图片输出参数等附加信息"""
+        if not self.enabled:
+            return
+
+        html_bytes = html.encode('utf-8')
+        meta = json.dumps({'created': time.time(), 'html_len': len(html_bytes), 'info': info})
+
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(meta.encode('utf-8') + b'\n')
+                f.write(html_bytes)
+                f.write(png)
+            os.replace(tmp_path, path)
+        except OSError:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+            return
+
+        size = len(meta) + 1 + len(html_bytes) + len(png)
+        with self._lock:
+            if self._total_bytes is None:
+                self._scan()
+            else:
+                self._total_bytes += size
+                self._total_entries += 1
+            over_limit = (self._total_bytes > self.max_bytes
+                          or self._total_entries > self.max_entries)
+
+        if over_limit:
+            self.evict()
+
+    def evict(self):
+        """删除过期条目，然后按LRU删除直到回到容量上限以内"""
+        with self._lock:
+            entries = self._scan()
+            now = time.time()
+
+            for mtime, size, path in entries:
+                expired = now - mtime > self.ttl
+                over_limit = (self._total_bytes > self.max_bytes
+                              or self._total_entries > self.max_entries)
+                if not expired and not over_limit:
+                    break
+                if self._remove(path):
+                    self._total_bytes -= size
+                    self._total_entries -= 1
+                    self.evictions += 1
+
+    def stats(self) -> dict:
+        """命中统计"""
+        total = self.hits + self.misses
+        return {
+            'enabled': self.enabled,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / total, 4) if total else 0.0,
+            'evictions': self.evictions,
+            'entries': self._total_entries,
+            'bytes': self._total_bytes,
+        }
+
+    # ========== 内部方法 ==========
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], key + ENTRY_SUFFIX)
+
+    def _record(self, hit: bool):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def _scan(self):
+        """扫描缓存目录，返回按mtime排序的 [(mtime, size, path)] 并更新总量"""
+        entries = []
+        try:
+            shards = list(os.scandir(self.directory))
+        except OSError:
+            shards = []
+
+        for shard in shards:
+            if not shard.is_dir():
+                continue
+            for entry in os.scandir(shard.path):
+                if not entry.name.endswith(ENTRY_SUFFIX):
+                    continue
+                try:
+                    st = entry.stat()
+                except OSError:
+                    continue
+                entries.append((st.st_mtime, st.st_size, entry.path))
+
+        entries.sort()
+        self._total_bytes = sum(size for _, size, _ in entries)
+        self._total_entries = len(entries)
+        return entries
+
+    @staticmethod
+    def _remove(path) -> bool:
+        try:
+            os.unlink(path)
+            return True
+        except OSError:
+            return False
+
+
+# ========== 进程级单例 ==========
+
+_cache = None
+
+
+def get_render_cache() -> RenderCache:
+    """获取渲染缓存（目录和容量由环境变量配置）"""
+    global _cache
+
+    if _cache is None:
+        _cache = RenderCache(
+            directory=os.getenv(
+                'RENDER_CACHE_DIR',
+                os.path.join(tempfile.gettempdir(), 'pricelist-render-cache'),
+            ),
+            max_bytes=int(os.getenv('RENDER_CACHE_MAX_MB', 200)) * 1024 * 1024,
+            max_entries=int(os.getenv('RENDER_CACHE_MAX_ENTRIES', 2000)),
+            ttl=int(os.getenv('RENDER_CACHE_TTL', 24 * 3600)),
+        )
+    return _cache
@@ -0,0 +1,370 @@
+"""
+渲染服务 - 独立进程持有固定的浏览器池，web worker 通过本地HTTP（TCP或Unix socket）提交截图
+web worker 不再各自启动Chromium，渲染容量可以单独扩缩
+
+协议:
+    POST /render   请求体JSON {"html", "viewport": {"width", "height"}, "full_page", "device_scale_factor"}
+                   成功返回 200 image/png；请求无效 400；渲染失败 500；
+                   正在处理的请求达到 max_pending 时立即返回 503（带 Retry-After）
+    GET  /health   服务状态JSON
+    GET  /metrics  Prometheus指标
+"""
+import asyncio
+import http.client
+import json
+import os
+import queue
+import socket
+import socketserver
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pricelist_metrics as metrics
+
+MAX_REQUEST_BYTES = 20 * 1024 * 1024
+RETRY_AFTER = 1         # 503 响应建议的重试间隔（秒）
+MAX_RETRY_AFTER = 5     # 客户端最多按 Retry-After 等待的秒数
+
+
+class ServiceBusy(Exception):
+    """正在处理的请求已达上限"""
+
+
+class RenderServiceError(Exception):
+    """渲染服务返回错误或无法连接"""
+
+    def __init__(self, message, status=None):
+        super().__init__(message)
+        self.status = status
+
+
+# ========== 服务端 ==========
+
+class RenderService:
+    """在后台事件循环线程中运行异步浏览器池，供HTTP处理线程同步调用"""
+
+    def __init__(self, concurrency=4, max_renders=200, timeout=60, max_pending=None):
+        """
+        Args:
+            max_pending: 同时接受的渲染请求上限（含排队等待浏览器的），默认 并发数 × 4；
+                超过时 render 抛出 ServiceBusy，HTTP层返回503，不在固定大小的浏览器池后无限排队
+        """
+        from pricelist_async_pool import AsyncBrowserPool, BrowserPoolBridge
+
+        self.pool = AsyncBrowserPool(max_concurrency=concurrency, max_renders=max_renders)
+        self.loop = asyncio.new_event_loop()
+        self.started = time.time()
+        self.max_pending = max_pending or concurrency * 4
+        self.in_flight = 0
+        self.rejected = 0
+        self._lock = threading.Lock()
+
+        self._thread = threading.Thread(target=self.loop.run_forever,
+                                        name='render-service-loop', daemon=True)
+        self._thread.start()
+
+        async def setup():
+            await self.pool.start()
+            return BrowserPoolBridge(self.pool, self.loop, timeout=timeout)
+
+        self.bridge = asyncio.run_coroutine_threadsafe(setup(), self.loop).result()
+
+    def render(self, html, viewport, full_page=True, device_scale_factor=1):
+        with self._lock:
+            if self.in_flight >= self.max_pending:
+                self.rejected += 1
+                raise ServiceBusy(f"渲染服务繁忙（{self.in_flight} 个请求处理中）")
+            self.in_flight += 1
+        try:
+            with metrics.RENDERS_IN_FLIGHT.track():
+                return self.bridge.render_html(html, viewport=viewport, full_page=full_page,
+                                               device_scale_factor=device_scale_factor)
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+    def health(self) -> dict:
+        return {
+            'ok': True,
+            'uptime': round(time.time() - self.started, 1),
+            'in_flight': self.in_flight,
+            'max_pending': self.max_pending,
+            'rejected': self.rejected,
+            **self.pool.stats(),
+        }
+
+    def close(self):
+        asyncio.run_coroutine_threadsafe(self.pool.close(), self.loop).result(10)
+        self.loop.call_soon_threadsafe(self.loop.stop)
+
+
+class RenderRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'   # 支持keep-alive，客户端复用连接
+    server_version = 'PricelistRender/1.0'
+
+    def do_GET(self):
+        service = self.server.service
+        if self.path == '/health':
+            self._send_json(200, service.health())
+        elif self.path == '/metrics':
+            self._send(200, metrics.REGISTRY.expose().encode('utf-8'), metrics.CONTENT_TYPE)
+        else:
+            self._send_json(404, {'error': '未知路径'})
+
+    def do_POST(self):
+        if self.path != '/render':
+            self._send_json(404, {'error': '未知路径'})
+            return
+
+        length = int(self.headers.get('Content-Length') or 0)
+        if length <= 0 or length > MAX_REQUEST_BYTES:
+            self.close_connection = True
+            self._send_json(400 if length <= 0 else 413, {'error': '请求体长度无效'})
+            return
+
+        try:
+            payload = json.loads(self.rfile.read(length))
+            html = payload['html']
+            viewport = {'width': int(payload['viewport']['width']),
+                        'height': int(payload['viewport']['height'])}
+            full_page = bool(payload.get('full_page', True))
+            scale = float(payload.get('device_scale_factor', 1))
+        except (ValueError, KeyError, TypeError) as e:
+            self._send_json(400, {'error': f'请求数据无效: {e}'})
+            return
+
+        try:
+            image = self.server.service.render(html, viewport, full_page, scale)
+        except ServiceBusy as e:
+            self._send_json(503, {'error': str(e)}, {'Retry-After': str(RETRY_AFTER)})
+            return
+        except Exception as e:
+            self._send_json(500, {'error': f'渲染失败: {e}'})
+            return
+        self._send(200, image, 'image/png')
+
+    def _send_json(self, status, data, headers=None):
+        self._send(status, json.dumps(data, ensure_ascii=False).encode('utf-8'),
+                   'application/json', headers)
+
+    def _send(self, status, body, content_type, headers=None):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def address_string(self):
+        # Unix socket 没有客户端地址
+        return self.client_address[0] if self.client_address else 'unix'
+
+    def log_message(self, format, *args):
+        if os.getenv('RENDER_SERVICE_ACCESS_LOG'):
+            super().log_message(format, *args)
+
+
+class UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def server_bind(self):
+        if os.path.exists(self.server_address):
+            os.unlink(self.server_address)
+        super().server_bind()
+        os.chmod(self.server_address, 0o660)
+
+
+def create_server(address, service: RenderService):
+    """address: unix:/路径 或 http://主机:端口"""
+    if address.startswith('unix:'):
+        server = UnixHTTPServer(address[len('unix:'):], RenderRequestHandler)
+    else:
+        host, port = _host_port(address)
+        server = ThreadingHTTPServer((host, port), RenderRequestHandler)
+        server.daemon_threads = True
+    server.service = service
+    return server
+
+
+# ========== 客户端 ==========
+
+class _UnixHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, path, timeout):
+        super().__init__('localhost', timeout=timeout)
+        self.unix_path = path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.unix_path)
+
+
+class RenderClient:
+    """
+    渲染服务客户端（提供与 BrowserPool 相同的 render_html / render_many 接口）
+
+    - 保持最多 pool_size 个keep-alive连接复用
+    - 连接失败、连接被重置或服务返回503时按退避重试 retries 次
+    """
+
+    RETRY_STATUSES = (502, 503, 504)
+
+    def __init__(self, address, timeout=60, retries=2, pool_size=4, backoff=0.2):
+        self.address = address
+        self.timeout = timeout
+        self.retries = max(0, retries)
+        self.pool_size = max(1, pool_size)
+        self.backoff = backoff
+        self._idle = queue.LifoQueue(maxsize=self.pool_size)
+        self._executor = None
+        self._executor_lock = threading.Lock()
+
+    def render_html(self, html, viewport=None, full_page=True,
+                    device_scale_factor=1, **options):
+        """提交HTML截图，返回PNG字节"""
+        if options:
+            raise ValueError(f"渲染服务不支持的截图参数: {', '.join(options)}")
+        body = json.dumps({
+            'html': html,
+            'viewport': viewport or {'width': 375, 'height': 1500},
+            'full_page': full_page,
+            'device_scale_factor': device_scale_factor,
+        }, ensure_ascii=False).encode('utf-8')
+        return self._request('POST', '/render', body, 'application/json')
+
+    def render_many(self, items, timeout=None):
+        """并行提交多个渲染（最多 pool_size 个并发），按 items 顺序返回"""
+        executor = self._get_executor()
+        futures = [
+            executor.submit(self.render_html, item['html'], item.get('viewport'),
+                            item.get('full_page', True), item.get('device_scale_factor', 1),
+                            **item.get('options', {}))
+            for item in items
+        ]
+        return [future.result(timeout) for future in futures]
+
+    def health(self) -> dict:
+        return json.loads(self._request('GET', '/health'))
+
+    def close(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+
+    # ========== 内部方法 ==========
+
+    def _request(self, method, path, body=None, content_type=None):
+        headers = {'Content-Type': content_type} if content_type else {}
+        last_error = None
+        retry_after = 0
+
+        for attempt in range(self.retries + 1):
+            if attempt:
+                time.sleep(max(self.backoff * (2 ** (attempt - 1)), retry_after))
+                retry_after = 0
+
+            conn = self._connection()
+            try:
+                conn.request(method, path, body=body, headers=headers)
+                response = conn.getresponse()
+                data = response.read()
+            except (ConnectionError, http.client.HTTPException, FileNotFoundError) as e:
+                # 连接失败或keep-alive连接已被服务端关闭：换新连接重试
+                conn.close()
+                last_error = RenderServiceError(f"无法连接渲染服务 {self.address}: {e}")
+                continue
+            except socket.timeout:
+                conn.close()
+                raise RenderServiceError(f"渲染服务超时（{self.timeout}秒）")
+
+            if response.will_close:
+                conn.close()
+            else:
+                self._release(conn)
+
+            if response.status == 200:
+                return data
+            if response.status == 503:
+                retry_after = _retry_after(response.getheader('Retry-After'))
+            message = _error_message(data) or f"HTTP {response.status}"
+            last_error = RenderServiceError(f"渲染服务错误: {message}", response.status)
+            if response.status not in self.RETRY_STATUSES:
+                break
+
+        raise last_error
+
+    def _connection(self):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        if self.address.startswith('unix:'):
+            return _UnixHTTPConnection(self.address[len('unix:'):], self.timeout)
+        host, port = _host_port(self.address)
+        return http.client.HTTPConnection(host, port, timeout=self.timeout)
+
+    def _release(self, conn):
+        try:
+            self._idle.put_nowait(conn)
+        except queue.Full:
+            conn.close()
+
+    def _get_executor(self):
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(self.pool_size,
+                                                    thread_name_prefix='render-client')
+            return self._executor
+
+
+def _host_port(address):
+    hostport = address.split('://', 1)[-1].rstrip('/')
+    host, _, port = hostport.rpartition(':')
+    return host or '127.0.0.1', int(port)
+
+
+def _retry_after(value) -> float:
+    """503 响应的 Retry-After 秒数（只支持秒数形式，最多等 MAX_RETRY_AFTER 秒）"""
+    try:
+        return min(max(float(value), 0), MAX_RETRY_AFTER)
+    except (TypeError, ValueError):
+        return 0
+
+
+def _error_message(data):
+    try:
+        return json.loads(data).get('error')
+    except (ValueError, AttributeError):
+        return None
+
+
+# ========== 进程级单例 ==========
+
+_client = None
+_client_pid = None
+_client_lock = threading.Lock()
+
+
+def get_render_client():
+    """配置了 RENDER_SERVICE_URL 时返回当前进程的渲染服务客户端，否则返回None"""
+    global _client, _client_pid
+
+    address = os.getenv('RENDER_SERVICE_URL')
+    if not address:
+        return None
+
+    with _client_lock:
+        if _client is None or _client_pid != os.getpid():
+            _client = RenderClient(
+                address,
+                timeout=float(os.getenv('RENDER_TIMEOUT', 60)),
+                retries=int(os.getenv('RENDER_SERVICE_RETRIES', 2)),
+                pool_size=int(os.getenv('RENDER_SERVICE_CONNECTIONS', 4)),
+            )
+            _client_pid = os.getpid()
+        return _client
@@ -0,0 +1,109 @@
+"""
+报价单模板 - 进程内共享的Jinja2环境
+所有报价单布局只解析编译一次，按名称选择
+"""
+import os
+import tempfile
+
+from jinja2 import Environment, FileSystemLoader, FileSystemBytecodeCache
+
+import pricelist_assets
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# 布局名称 -> 模板文件
+QUOTE_LAYOUTS = {
+    'wechat': 'pricelist-quote-wechat.html',        # 微信长图版（375px）
+    '1024x768': 'pricelist-quote-1024x768.html',    # 桌面/投影版
+    'compact': 'pricelist-quote-compact.html',      # 紧凑版
+    'premium': 'pricelist-quote-premium.html',      # 高端版
+    'simple': 'pricelist-quote-simple.html',        # 简洁版
+    'standard': 'pricelist-quote_template.html',    # 完整版（含竞对对比）
+}
+
+DEFAULT_LAYOUT = 'wechat'
+
+# 字节码缓存目录（多进程共享，重启后免重新编译）
+CACHE_DIR = os.getenv(
+    'JINJA_CACHE_DIR',
+    os.path.join(tempfile.gettempdir(), 'pricelist-jinja-cache'),
+)
+
+
+def format_number(value, with_comma=True):
+    """格式化数字"""
+    if value is None:
+        return "0"
+    try:
+        num = float(value)
+        if with_comma:
+            return f"{num:,.0f}"
+        else:
+            return f"{num:.0f}"
+    except (TypeError, ValueError):
+        return str(value)
+
+
+_env = None
+_debug = os.getenv('FLASK_DEBUG', '0') == '1' or os.getenv('FLASK_ENV') == 'development'
+
+
+def configure(debug=False):
+    """设置调试模式（调试模式下模板文件修改后自动重新加载）"""
+    global _env, _debug
+    _debug = debug
+    _env = None
+
+
+def get_environment() -> Environment:
+    """获取共享的Jinja2环境"""
+    global _env
+
+    if _env is None:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        env = Environment(
+            loader=FileSystemLoader(BASE_DIR),
+            bytecode_cache=FileSystemBytecodeCache(CACHE_DIR),
+            auto_reload=_debug,
+        )
+        env.filters['format_num'] = format_number
+        # 模板中 {{ stylesheet('xxx.css') }} 内联预先压缩好的样式表
+        env.globals['stylesheet'] = pricelist_assets.inline_css
+        _env = env
+
+    return _env
+
+
+def get_template(layout: str = DEFAULT_LAYOUT):
+    """按布局名称获取已编译的模板"""
+    if layout not in QUOTE_LAYOUTS:
+        raise ValueError(f"未知的报价单布局: {layout}")
+    return get_environment().get_template(QUOTE_LAYOUTS[layout])
+
+
+def preload() -> list:
+    """编译全部布局模板并生成样式表（启动预热用），返回布局名称列表"""
+    for layout in QUOTE_LAYOUTS:
+        get_template(layout)
+        get_stylesheet(layout)
+    return list(QUOTE_LAYOUTS)
+
+
+def stylesheet_name(layout: str = DEFAULT_LAYOUT) -> str:
+    """布局对应的样式文件（与模板同名的 .css）"""
+    return os.path.splitext(QUOTE_LAYOUTS[layout])[0] + '.css'
+
+
+def get_stylesheet(layout: str = DEFAULT_LAYOUT) -> pricelist_assets.Stylesheet:
+    """布局的压缩样式表（含品牌变量）"""
+    return pricelist_assets.get_stylesheet(stylesheet_name(layout))
+
+
+def template_path(layout: str = DEFAULT_LAYOUT) -> str:
+    """布局对应的模板文件路径"""
+    return os.path.join(BASE_DIR, QUOTE_LAYOUTS[layout])
+
+
+def render_quote(layout: str = DEFAULT_LAYOUT, **data) -> str:
+    """渲染指定布局的报价单"""
+    return get_template(layout).render(**data)
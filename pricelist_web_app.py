@@ -2,18 +2,34 @@
 Pricelist Web应用 - 顾问表单界面
 Flask后端服务
 """
-from flask import Flask, render_template, request, jsonify, send_file
-from datetime import date, timedelta, datetime
-from decimal import Decimal
-from dataclasses import dataclass, field, asdict
-from typing import List, Optional
-from enum import Enum
-from jinja2 import Template
-import yaml
+from flask import Flask, Response, g, render_template, request, jsonify, send_file, stream_with_context
+from datetime import datetime
+from dataclasses import asdict
+from jinja2 import TemplateNotFound
+import gc
+import sqlite3
 import os
 import json
-from playwright.sync_api import sync_playwright
+import time
 from dotenv import load_dotenv
+from pricelist_browser_pool import get_browser_pool, get_shared_renderer
+import pricelist_templates
+from pricelist_render_cache import get_render_cache, file_version
+from pricelist_jobs import get_job_queue, QueueFull
+from pricelist_gift_library import GiftLibrary
+from pricelist_artifacts import get_artifact_store
+from pricelist_brand import BRAND_CONFIG_FILE
+import pricelist_image_output as image_output
+import pricelist_raster
+import pricelist_fonts
+from pricelist_models import (QuoteData, build_gift, serialize_gift, decode_bundle_request,
+                              decode_competitor_records, decode_quote_request)
+from pricelist_competitors import get_competitor_store
+from pricelist_money import DEFAULT_CURRENCY
+from pricelist_gift_bundles import GiftBundleSolver, bundle_effect
+from pricelist_preview import PreviewEngine
+from pricelist_batch import render_batch, load_payloads, iter_zip, zip_entries, manifest_record, ndjson_line
+import pricelist_metrics as metrics
 
 # 加载环境变量
 load_dotenv()
@@ -24,169 +40,54 @@ app = Flask(__name__)
 app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', 'dev-secret-key-change-in-production')
 app.config['MAX_CONTENT_LENGTH'] = int(os.getenv('MAX_CONTENT_LENGTH', 10)) * 1024 * 1024  # MB to bytes
 
-# ========== 数据模型 ==========
-
-class DiscountPayer(Enum):
-    """结算方"""
-    LANDLORD = "landlord"
-    UHOMES = "uhomes"
-
-class GiftCategory(Enum):
-    """礼品类别"""
-    CASH = "cash"
-    SERVICE = "service"
-    VOUCHER = "voucher"
-    GIFT = "gift"
-
-@dataclass
-class PropertyInfo:
-    """房源信息"""
-    property_name: str
-    room_type: str
-    address: str
-    lease_start: date
-    lease_end: date
-
-    @property
-    def weeks(self) -> int:
-        days = (self.lease_end - self.lease_start).days
-        return max(1, days // 7)
-
-    @property
-    def lease_period_text(self) -> str:
-        start = self.lease_start.strftime('%Y-%m-%d')
-        end = self.lease_end.strftime('%Y-%m-%d')
-        return f"{start} - {end} ({self.weeks}周)"
-
-@dataclass
-class Discount:
-    """优惠"""
-    name: str
-    amount: Decimal
-    payer: DiscountPayer
-
-@dataclass
-class Gift:
-    """礼品"""
-    id: str
-    name: str
-    value: Decimal
-    category: GiftCategory
-    icon: str
-    description: str = ""
-
-@dataclass
-class AdvisorInfo:
-    """顾问信息"""
-    name: str
-    phone: str
-    wechat_id: str
-
-    @property
-    def avatar_initial(self) -> str:
-        return self.name[0] if self.name else "?"
-
-@dataclass
-class QuoteData:
-    """报价单完整数据"""
-    property: PropertyInfo
-    original_weekly_price: Decimal
-    landlord_discounts: List[Discount] = field(default_factory=list)
-    uhomes_subsidies: List[Discount] = field(default_factory=list)
-    selected_gifts: List[Gift] = field(default_factory=list)
-    advisor: Optional[AdvisorInfo] = None
-    valid_days: int = 7
-
-    @property
-    def original_annual_price(self) -> Decimal:
-        return self.original_weekly_price * self.property.weeks
-
-    @property
-    def total_landlord_discount(self) -> Decimal:
-        return sum(d.amount for d in self.landlord_discounts)
-
-    @property
-    def total_uhomes_subsidy(self) -> Decimal:
-        return sum(d.amount for d in self.uhomes_subsidies)
-
-    @property
-    def total_gifts_value(self) -> Decimal:
-        return sum(g.value for g in self.selected_gifts)
-
-    @property
-    def final_annual_price(self) -> Decimal:
-        return (self.original_annual_price -
-                self.total_landlord_discount -
-                self.total_uhomes_subsidy)
-
-    @property
-    def final_weekly_price(self) -> Decimal:
-        return self.final_annual_price / self.property.weeks
-
-    @property
-    def total_savings(self) -> Decimal:
-        return (self.total_landlord_discount +
-                self.total_uhomes_subsidy +
-                self.total_gifts_value)
-
-    @property
-    def savings_rate(self) -> float:
-        if self.original_annual_price == 0:
-            return 0
-        return float(self.total_savings / self.original_annual_price * 100)
-
-    @property
-    def valid_until(self) -> str:
-        valid_date = date.today() + timedelta(days=self.valid_days)
-        return valid_date.strftime('%Y-%m-%d')
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 
-# ========== 工具函数 ==========
+# 微信长图截图视口
+PNG_VIEWPORT = {'width': 375, 'height': 1500}
 
-def load_gift_library():
-    """加载礼品库"""
-    try:
-        with open('pricelist-gift_library.yaml', 'r', encoding='utf-8') as f:
-            data = yaml.safe_load(f)
-            gifts = []
-            for item in data.get('gift_library', []):
-                gift = Gift(
-                    id=item['id'],
-                    name=item['name'],
-                    value=Decimal(str(item['value'])),
-                    category=GiftCategory(item['category']),
-                    icon=item['icon'],
-                    description=item.get('description', '')
-                )
-                gifts.append(gift)
-            return gifts
-    except Exception as e:
-        print(f"❌ 加载礼品库失败: {e}")
-        return []
+# 多格式输出：常用视口别名和支持的输出格式
+VIEWPORT_PRESETS = {
+    'wechat': PNG_VIEWPORT,
+    '1024x768': {'width': 1024, 'height': 768},
+}
+OUTPUT_FORMATS = ('html',) + tuple(image_output.IMAGE_FORMATS)
+# 图片渲染方式：browser 为浏览器截图；raster 为不启动浏览器直接绘制（仅 simple 布局）
+RENDERERS = ('browser', 'raster')
+MAX_TARGETS = 10
 
-def generate_html(quote: QuoteData) -> str:
-    """生成HTML报价单"""
-    template_file = "pricelist-quote-wechat.html"
+# 批量生成：并行页面数、单次最多报价数
+BATCH_CONCURRENCY = int(os.getenv('BATCH_CONCURRENCY', 4))
+BATCH_MAX_ITEMS = int(os.getenv('BATCH_MAX_ITEMS', 200))
 
-    try:
-        with open(template_file, 'r', encoding='utf-8') as f:
-            template_content = f.read()
-    except FileNotFoundError:
-        return None
+# 任务状态长轮询的最长等待（秒）：同步worker等待期间不能处理其他请求，只允许短暂等待；
+# ASGI模式下等待只占用线程池中的一个线程
+JOB_MAX_WAIT = 30 if os.getenv('SERVER_MODE') == 'asgi' else 1
 
-    from jinja2 import Environment
-    env = Environment()
-    template = env.from_string(template_content)
+# ========== 工具函数 ==========
+
+gift_library = GiftLibrary(
+    os.path.join(BASE_DIR, 'pricelist-gift_library.yaml'),
+    build_gift,
+    serialize_gift,
+)
+
+def load_gift_library():
+    """加载礼品库（文件未变化时直接返回已解析的列表）"""
+    return gift_library.refresh().gifts
 
-    # 转换数据为模板可用格式
+def template_data(quote: QuoteData) -> dict:
+    """转换数据为模板可用格式（派生金额统一从价格汇总读取）"""
+    summary = quote.summary
     data = {
         "property": {
             "property_name": quote.property.property_name,
             "room_type": quote.property.room_type,
             "address": quote.property.address,
             "lease_period_text": quote.property.lease_period_text,
+            "weeks": quote.property.weeks,
         },
         "original_weekly_price": float(quote.original_weekly_price),
-        "original_annual_price": float(quote.original_annual_price),
+        "original_annual_price": float(summary.original_annual_price),
         "landlord_discounts": [
             {"name": d.name, "amount": float(d.amount)}
             for d in quote.landlord_discounts
@@ -196,17 +97,25 @@ def generate_html(quote: QuoteData) -> str:
             for d in quote.uhomes_subsidies
         ],
         "selected_gifts": [
-            {"name": g.name, "value": float(g.value), "icon": g.icon}
+            {"name": g.name, "value": float(g.value), "icon": g.icon,
+             "category_name": g.category_name, "is_free": g.is_free}
             for g in quote.selected_gifts
         ],
-        "total_landlord_discount": float(quote.total_landlord_discount),
-        "total_uhomes_subsidy": float(quote.total_uhomes_subsidy),
-        "total_gifts_value": float(quote.total_gifts_value),
-        "final_annual_price": float(quote.final_annual_price),
-        "final_weekly_price": float(quote.final_weekly_price),
-        "total_savings": float(quote.total_savings),
-        "savings_rate": quote.savings_rate,
-        "valid_until": quote.valid_until,
+        "competitor_prices": [
+            {"platform": cp.platform, "weekly_price": float(cp.weekly_price),
+             "annual_price": float(cp.annual_price)}
+            for cp in quote.competitor_prices
+        ],
+        "total_landlord_discount": float(summary.total_landlord_discount),
+        "total_uhomes_subsidy": float(summary.total_uhomes_subsidy),
+        "total_gifts_value": float(summary.total_gifts_value),
+        "final_annual_price": float(summary.final_annual_price),
+        "final_weekly_price": float(summary.final_weekly_price),
+        "total_savings": float(summary.total_savings),
+        "savings_rate": summary.savings_rate,
+        "advantage_vs_competitor": float(summary.advantage_vs_competitor) if summary.advantage_vs_competitor else None,
+        "advantage_rate": summary.advantage_rate,
+        "valid_until": quote.valid_until_text,
     }
 
     if quote.advisor:
@@ -216,21 +125,338 @@ def generate_html(quote: QuoteData) -> str:
             "wechat_id": quote.advisor.wechat_id,
             "avatar_initial": quote.advisor.avatar_initial,
         }
+    return data
+
+def generate_html(quote: QuoteData, layout: str = 'wechat') -> str:
+    """生成HTML报价单"""
+    try:
+        with metrics.stage('template_load'):
+            template = pricelist_templates.get_template(layout)
+    except TemplateNotFound:
+        return None
 
-    html = template.render(**data)
+    data = template_data(quote)
+    with metrics.stage('template'):
+        html = template.render(**data)
     return html
 
-def generate_png(html_file, output_file):
-    """生成PNG图片"""
-    html_path = f"file://{os.path.abspath(html_file)}"
+def generate_png(html: str, spec: dict = None):
+    """
+    生成微信分享图（直接渲染HTML字符串）
+
+    按 WECHAT_SHARE 的成图宽度截图并压缩到大小上限以内，返回 (图片字节, 实际输出参数)
+    """
+    spec = spec or image_output.image_spec(viewport_width=PNG_VIEWPORT['width'])
+    png = get_browser_pool().render_html(
+        html,
+        viewport=PNG_VIEWPORT,
+        full_page=True,
+        device_scale_factor=spec['device_scale_factor'],
+    )
+    with metrics.stage('encode'):
+        return image_output.fit_image(png, spec)
+
+def generate_raster(quote: QuoteData, spec: dict, viewport: dict = PNG_VIEWPORT,
+                    full_page: bool = True):
+    """不经过浏览器直接绘制简洁版分享图，返回 (图片字节, 实际输出参数)"""
+    with metrics.stage('raster'):
+        png = pricelist_raster.render_card(
+            template_data(quote),
+            width=viewport['width'],
+            scale=spec['device_scale_factor'],
+            height=None if full_page else viewport['height'],
+        )
+    with metrics.stage('encode'):
+        return image_output.fit_image(png, spec)
+
+def parse_renderer(renderer, layout: str) -> str:
+    """校验渲染方式（raster 只支持 simple 布局）"""
+    renderer = renderer or 'browser'
+    if renderer not in RENDERERS:
+        raise ValueError(f"不支持的渲染方式: {renderer}")
+    if renderer == 'raster' and layout not in pricelist_raster.RASTER_LAYOUTS:
+        raise ValueError(f"布局 {layout} 不支持 raster 渲染（可用: {', '.join(pricelist_raster.RASTER_LAYOUTS)}）")
+    return renderer
+
+def use_raster(renderer: str) -> bool:
+    """请求 raster 且找到中文字体时不启动浏览器，否则退回浏览器截图"""
+    return renderer == 'raster' and pricelist_raster.available()
+
+def quote_fingerprint(quote: QuoteData) -> dict:
+    """报价单的规范化内容（用于渲染缓存键）"""
+    return {
+        'property': asdict(quote.property),
+        'original_weekly_price': quote.original_weekly_price,
+        'original_annual_price': quote.original_annual_price,
+        'landlord_discounts': [(d.name, d.amount) for d in quote.landlord_discounts],
+        'uhomes_subsidies': [(d.name, d.amount) for d in quote.uhomes_subsidies],
+        'selected_gifts': [(g.id, g.name, g.value, g.icon, g.category, g.is_free)
+                           for g in quote.selected_gifts],
+        # 标准布局渲染竞对价格表
+        'competitor_prices': [(cp.platform, cp.weekly_price, cp.annual_price)
+                              for cp in quote.competitor_prices],
+        'advisor': asdict(quote.advisor) if quote.advisor else None,
+        # 有效期由当天日期推算，跨天后必须重新渲染
+        'valid_until': quote.valid_until,
+    }
+
+def render_cache_key(quote: QuoteData, layout: str = 'wechat',
+                     viewport: dict = PNG_VIEWPORT, **variant) -> str:
+    """报价单渲染结果的缓存键（variant 为影响截图结果的其他参数）"""
+    return get_render_cache().make_key(
+        quote_fingerprint(quote),
+        layout,
+        viewport,
+        template=file_version(pricelist_templates.template_path(layout)),
+        style=pricelist_templates.get_stylesheet(layout).hash,
+        brand=file_version(BRAND_CONFIG_FILE),
+        **variant,
+    )
+
+def render_quote(quote: QuoteData, layout: str = 'wechat', image_format: str = None,
+                 renderer: str = 'browser'):
+    """
+    渲染报价单HTML和分享图，优先使用渲染缓存
+
+    renderer 为 raster 时分享图直接绘制（layout 须为 simple），HTML仍由模板生成
+
+    Returns:
+        (html, 图片字节, 是否命中缓存, 图片输出参数)
+    """
+    spec = image_output.image_spec(image_format, PNG_VIEWPORT['width'])
+    raster = use_raster(parse_renderer(renderer, layout))
+    cache = get_render_cache()
+    variant = {'renderer': 'raster'} if raster else {}
+    key = render_cache_key(quote, layout, image=spec, **variant)
+
+    cached = cache.get(key, with_info=True)
+    metrics.RENDER_CACHE.inc(result='hit' if cached else 'miss')
+    if cached:
+        html, image, info = cached
+        return html, image, True, info
+
+    html = generate_html(quote, layout)
+    if not html:
+        return None, None, False, None
+
+    if raster:
+        image, info = generate_raster(quote, spec)
+    else:
+        with metrics.RENDERS_IN_FLIGHT.track():
+            image, info = generate_png(html, spec)
+    info['renderer'] = 'raster' if raster else 'browser'
+    cache.put(key, html, image, info)
+    return html, image, False, info
+
+def parse_viewport(value) -> dict:
+    """视口: {'width', 'height'}、"宽x高" 或别名（wechat、1024x768）"""
+    if value is None:
+        return PNG_VIEWPORT
+    if isinstance(value, str):
+        if value in VIEWPORT_PRESETS:
+            return VIEWPORT_PRESETS[value]
+        width, sep, height = value.lower().partition('x')
+        if not sep:
+            raise ValueError(f"无效的视口: {value}")
+        value = {'width': width, 'height': height}
+    if not isinstance(value, dict):
+        raise ValueError(f"无效的视口: {value}")
+    viewport = {'width': int(value['width']), 'height': int(value['height'])}
+    if not (100 <= viewport['width'] <= 4096 and 100 <= viewport['height'] <= 8192):
+        raise ValueError(f"视口尺寸超出范围: {viewport['width']}x{viewport['height']}")
+    return viewport
+
+def parse_targets(items) -> list:
+    """
+    解析输出目标列表
+
+    每个目标: {'template': 布局, 'viewport': 视口, 'format': 'html'|'png'|'jpeg'|'webp',
+              'full_page': 是否整页, 'renderer': 'browser'|'raster'}
+    """
+    if not isinstance(items, list) or not items:
+        raise ValueError("targets 必须是非空列表")
+    if len(items) > MAX_TARGETS:
+        raise ValueError(f"单次最多 {MAX_TARGETS} 个输出目标")
+
+    targets = []
+    for item in items:
+        if not isinstance(item, dict):
+            raise ValueError(f"无效的输出目标: {item}")
+        layout = item.get('template', 'wechat')
+        fmt = item.get('format', 'png')
+        if layout not in pricelist_templates.QUOTE_LAYOUTS:
+            raise ValueError(f"未知的报价单布局: {layout}")
+        if fmt not in OUTPUT_FORMATS:
+            raise ValueError(f"不支持的输出格式: {fmt}")
+        target = {
+            'template': layout,
+            'format': fmt,
+            'viewport': parse_viewport(item.get('viewport')),
+            'full_page': bool(item.get('full_page', True)),
+        }
+        if fmt != 'html':
+            # 图片按 WECHAT_SHARE 的成图宽度和大小上限输出
+            target['image'] = image_output.image_spec(fmt, target['viewport']['width'])
+            target['renderer'] = parse_renderer(item.get('renderer'), layout)
+        targets.append(target)
+    return targets
+
+def render_targets(quote: QuoteData, targets: list) -> list:
+    """
+    为同一份报价生成多个输出，返回 [(目标, 内容字节, 是否命中缓存, 图片输出参数)]
+
+    每种布局的HTML只生成一次；未命中缓存的截图一次性提交给浏览器池，
+    在同一个浏览器中按视口复用页面连续完成；raster 目标直接绘制，不占用浏览器
+    """
+    cache = get_render_cache()
+    html_by_layout = {}
+    outputs = [None] * len(targets)
+    pending = []   # [(序号, 缓存键)]
+    jobs = []
+
+    for index, target in enumerate(targets):
+        layout = target['template']
+        if layout not in html_by_layout:
+            html = generate_html(quote, layout)
+            if not html:
+                raise RuntimeError(f'生成HTML失败: {layout}')
+            html_by_layout[layout] = html
+        html = html_by_layout[layout]
+
+        if target['format'] == 'html':
+            outputs[index] = (target, html.encode('utf-8'), False, None)
+            continue
+
+        raster = use_raster(target['renderer'])
+        variant = {'image': target['image']}
+        if not target['full_page']:
+            variant['clip'] = 'viewport'
+        if raster:
+            variant['renderer'] = 'raster'
+        key = render_cache_key(quote, layout, target['viewport'], **variant)
+        cached = cache.get(key, with_info=True)
+        metrics.RENDER_CACHE.inc(result='hit' if cached else 'miss')
+        if cached:
+            outputs[index] = (target, cached[1], True, cached[2])
+            continue
+
+        if raster:
+            image, info = generate_raster(quote, target['image'], target['viewport'],
+                                          target['full_page'])
+            info['renderer'] = 'raster'
+            cache.put(key, html, image, info)
+            outputs[index] = (target, image, False, info)
+            continue
+
+        pending.append((index, key))
+        jobs.append({'html': html, 'viewport': target['viewport'],
+                     'full_page': target['full_page'],
+                     'device_scale_factor': target['image']['device_scale_factor']})
+
+    if jobs:
+        with metrics.RENDERS_IN_FLIGHT.track():
+            captures = get_browser_pool().render_many(jobs)
+        for (index, key), png in zip(pending, captures):
+            target = targets[index]
+            with metrics.stage('encode'):
+                image, info = image_output.fit_image(png, target['image'])
+            info['renderer'] = 'browser'
+            cache.put(key, html_by_layout[target['template']], image, info)
+            outputs[index] = (target, image, False, info)
+
+    return outputs
+
+def build_target_files(quote: QuoteData, targets: list) -> dict:
+    """生成多个输出目标并保存为产物，返回接口结果"""
+    basename = f"quote_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+    store = get_artifact_store()
+
+    files = []
+    for target, content, cached, info in render_targets(quote, targets):
+        viewport = target['viewport']
+        if target['format'] == 'html':
+            filename = f"{basename}_{target['template']}.html"
+            content_type = 'text/html'
+            stage = 'html_write'
+        else:
+            ext = image_output.extension(target['format'])
+            filename = f"{basename}_{target['template']}_{viewport['width']}x{viewport['height']}.{ext}"
+            content_type = image_output.content_type(target['format'])
+            stage = 'png_write'
+
+        with metrics.stage(stage):
+            artifact = store.put(content, filename, content_type)
+        result = {k: v for k, v in target.items() if k != 'image'}
+        result.update({
+            'file': artifact.filename,
+            'url': download_url(artifact),
+            'size': artifact.size,
+            'cached': cached,
+        })
+        if info:
+            result['image'] = info
+        files.append(result)
+
+    return {
+        'success': True,
+        'files': files,
+        'summary': quote_summary(quote),
+    }
+
+# ========== 启动预热 ==========
 
-    with sync_playwright() as p:
-        browser = p.chromium.launch()
-        page = browser.new_page(viewport={'width': 375, 'height': 1500})
-        page.goto(html_path)
-        page.wait_for_load_state('networkidle')
-        page.screenshot(path=output_file, full_page=True)
-        browser.close()
+# 预热状态（gunicorn preload_app 时在主进程中完成，worker fork 后直接继承）
+WARMUP = {'ready': False, 'pid': None, 'seconds': None, 'templates': [], 'gifts': 0,
+          'fonts': {}, 'error': None, 'browser': 'cold'}
+
+def warmup(freeze: bool = True) -> dict:
+    """
+    预先加载所有模板、礼品库和品牌配置
+
+    freeze 为True时把预热后的对象移出垃圾回收跟踪（gc.freeze），
+    fork出的worker不会因为GC扫描而复制这些共享内存页
+    """
+    started = time.perf_counter()
+    try:
+        # 先裁剪字体：样式表中的 @font-face 依赖字体子集
+        WARMUP['fonts'] = pricelist_fonts.preload()
+        WARMUP['templates'] = pricelist_templates.preload()
+        with app.app_context():
+            app.jinja_env.get_template('form.html')
+        WARMUP['gifts'] = len(gift_library.refresh().gifts)
+        gift_bundles.tiers()
+        image_output.image_spec()
+        pricelist_raster.font_paths()
+        import PIL.Image  # noqa: F401  分享图编码在首次请求时才会用到
+    except Exception as e:
+        WARMUP['error'] = str(e)
+        print(f"❌ 启动预热失败: {e}")
+    else:
+        WARMUP['ready'] = WARMUP['gifts'] > 0
+        if not WARMUP['ready']:
+            WARMUP['error'] = '礼品库为空'
+
+    WARMUP['pid'] = os.getpid()
+    WARMUP['seconds'] = round(time.perf_counter() - started, 3)
+
+    if freeze:
+        gc.collect()
+        gc.freeze()
+
+    print(f"{'✅' if WARMUP['ready'] else '⚠️'} 启动预热: {len(WARMUP['templates'])} 个模板，"
+          f"{WARMUP['gifts']} 个礼品，用时 {WARMUP['seconds']}秒")
+    return WARMUP
+
+def warmup_browser():
+    """在当前worker中预先启动浏览器（渲染服务模式下检查服务是否可用）"""
+    try:
+        pool = get_browser_pool()
+        if hasattr(pool, 'health'):
+            result = pool.health()
+            WARMUP['browser'] = 'warm' if result.get('ok') else 'error'
+    except Exception as e:
+        WARMUP['browser'] = 'error'
+        print(f"⚠️ 浏览器预热失败: {e}")
 
 # ========== 路由 ==========
 
@@ -241,117 +467,450 @@ def index():
 
 @app.route('/api/gift-library')
 def get_gift_library():
-    """获取礼品库"""
-    gifts = load_gift_library()
-    return jsonify([
-        {
-            'id': g.id,
-            'name': g.name,
-            'value': float(g.value),
-            'category': g.category.value,
-            'icon': g.icon,
-            'description': g.description
-        }
-        for g in gifts
-    ])
+    """获取礼品库（预先序列化的响应体，支持ETag/304）"""
+    library = gift_library.refresh()
+    response = app.response_class(library.json_body, mimetype='application/json')
+    response.set_etag(library.etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response.make_conditional(request)
+
+@app.route('/api/gift-bundles', methods=['GET', 'POST'])
+def get_gift_bundles():
+    """
+    礼品组合推荐
+
+    GET: 各预算档位的推荐组合（预先算好，礼品库修改后重新计算，支持ETag/304）
+    POST: {"budget": 500, "require": {"cash": 1, "service": 1}, "top": 5, "max_items": 4,
+           "include_free": true, "quote": {与 /api/generate 相同的报价字段}}
+          按条件求解；带 quote 时每个组合附上替换所选礼品后的 total_savings / savings_rate
+    """
+    if request.method == 'GET':
+        with metrics.stage('bundles'):
+            tiers = gift_bundles.tiers()
+        response = jsonify(tiers)
+        response.set_etag(tiers['version'] or '')
+        response.headers['Cache-Control'] = 'no-cache'
+        return response.make_conditional(request)
+
+    try:
+        with metrics.stage('parse'):
+            params = decode_bundle_request(request.get_json(), select_gifts)
+    except (KeyError, TypeError, ValueError, ArithmeticError) as e:
+        return jsonify({'error': f'请求数据无效: {e}'}), 400
+
+    with metrics.stage('bundles'):
+        result = gift_bundles.solve(params['budget'], params['require'], params['top'],
+                                    params['max_items'], params['include_free'])
+    body = result.to_dict()
+    quote = params['quote']
+    if quote is not None:
+        body['quote'] = quote_summary(quote)
+        for bundle, item in zip(result.bundles, body['bundles']):
+            item.update(bundle_effect(quote, bundle))
+    return jsonify(body)
+
+@app.route('/api/competitor-prices', methods=['GET', 'POST'])
+def competitor_prices():
+    """
+    竞对价格库
+
+    GET ?property_name=...&room_type=...&currency=GBP&days=30
+        各平台最新价格（latest）和时间窗口内的最低价、中位数（stats）
+    POST [{"property_name", "room_type", "platform", "weekly_price", "annual_price",
+           "url", "currency", "observed_at"}]（或 {"prices": [...]}）
+        记录竞对价格，observed_at 默认为当前时间
+    """
+    store = get_competitor_store()
+
+    if request.method == 'POST':
+        data = request.get_json()
+        if isinstance(data, dict):
+            data = data.get('prices')
+        try:
+            records = decode_competitor_records(data)
+        except (KeyError, TypeError, ValueError, ArithmeticError) as e:
+            return jsonify({'error': f'请求数据无效: {e}'}), 400
+        return jsonify({'recorded': store.record_many(records)}), 201
+
+    property_name = request.args.get('property_name')
+    room_type = request.args.get('room_type')
+    if not property_name or not room_type:
+        return jsonify({'error': '缺少 property_name 或 room_type'}), 400
+    currency = request.args.get('currency', DEFAULT_CURRENCY)
+    days = request.args.get('days', type=int)
+    if days is not None and days <= 0:
+        return jsonify({'error': 'days 应为正整数'}), 400
+
+    latest = store.latest(property_name, room_type, currency, days)
+    return jsonify({
+        'currency': currency,
+        'latest': [
+            {'platform': p.platform, 'weekly_price': float(p.weekly_price),
+             'annual_price': float(p.annual_price), 'url': p.url}
+            for p in latest
+        ],
+        'stats': store.stats(property_name, room_type, currency, days).to_dict(),
+    })
+
+def select_gifts(gift_ids) -> list:
+    """按ID选择礼品库礼品（忽略不存在的ID）"""
+    with metrics.stage('gifts'):
+        return gift_library.select(gift_ids)
+
+def lookup_competitors(property_name: str, room_type: str, currency: str) -> list:
+    """从竞对价格库带出各平台最新价格（价格库不可用时不影响生成报价）"""
+    with metrics.stage('competitors'):
+        try:
+            return get_competitor_store().latest(property_name, room_type, currency)
+        except (sqlite3.Error, OSError) as e:
+            # 首次访问时创建目录/打开数据库也可能失败（如 COMPETITOR_DB 所在目录不可写）
+            print(f"⚠️ 读取竞对价格库失败: {e}")
+            return []
+
+def parse_quote_request(data: dict) -> QuoteData:
+    """
+    把 /api/generate 的请求数据解析为报价单（字段校验见 pricelist_models.decode_quote_request）
+
+    请求中没有 competitor_prices 时从竞对价格库自动带出
+    """
+    return decode_quote_request(data, select_gifts, competitors=lookup_competitors)
+
+# 礼品组合推荐：预算档位按礼品库版本预先计算
+gift_bundles = GiftBundleSolver(gift_library)
+
+# 方案预览：基础报价按内容缓存，礼品库变化后失效
+preview_engine = PreviewEngine(select_gifts, lambda: gift_library.refresh().version)
+
+def quote_summary(quote: QuoteData) -> dict:
+    """报价单摘要（接口返回给表单展示）"""
+    summary = quote.summary
+    result = {
+        'property_name': quote.property.property_name,
+        'original_price': float(summary.original_annual_price),
+        'final_price': float(summary.final_annual_price),
+        'total_savings': float(summary.total_savings),
+        'savings_rate': round(summary.savings_rate, 1)
+    }
+    if summary.lowest_competitor_price is not None:
+        result['lowest_competitor_price'] = float(summary.lowest_competitor_price)
+        result['advantage_vs_competitor'] = float(summary.advantage_vs_competitor)
+        if summary.advantage_rate is not None:
+            result['advantage_rate'] = round(summary.advantage_rate, 1)
+    return result
+
+def save_quote_files(html: str, png: bytes, basename: str = None, image_format: str = 'png'):
+    """保存HTML和分享图到产物存储，返回 (html产物, 图片产物)"""
+    if basename is None:
+        basename = f"quote_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+
+    store = get_artifact_store()
+
+    with metrics.stage('html_write'):
+        html_artifact = store.put(html.encode('utf-8'), f"{basename}.html", 'text/html')
+
+    with metrics.stage('png_write'):
+        png_artifact = store.put(png, f"{basename}.{image_output.extension(image_format)}",
+                                 image_output.content_type(image_format))
+
+    return html_artifact, png_artifact
+
+def download_url(artifact) -> str:
+    """产物下载地址"""
+    return f"/download/{artifact.id}"
+
+def build_quote_files(quote: QuoteData, image_format: str = None, renderer: str = 'browser') -> dict:
+    """
+    渲染报价单并保存HTML和分享图产物，返回接口结果
+
+    png_file / png_url 为分享图（格式见 image.format），image 为实际使用的输出参数；
+    renderer 为 raster 时输出 simple 布局且不启动浏览器
+    """
+    layout = 'simple' if renderer == 'raster' else 'wechat'
+
+    # 生成HTML和分享图（相同报价直接复用缓存）
+    html, image, cached, info = render_quote(quote, layout, image_format, renderer)
+    if not html:
+        raise RuntimeError('生成HTML失败')
+
+    html_artifact, png_artifact = save_quote_files(html, image, image_format=info['format'])
+
+    return {
+        'success': True,
+        'html_file': html_artifact.filename,
+        'png_file': png_artifact.filename,
+        'html_url': download_url(html_artifact),
+        'png_url': download_url(png_artifact),
+        'cached': cached,
+        'image': info,
+        'summary': quote_summary(quote),
+    }
+
+def generate_batch(payloads, layout: str = 'wechat', concurrency: int = BATCH_CONCURRENCY):
+    """
+    批量生成报价单，按完成顺序逐项返回结果
+
+    每项结果: {'index', 'status': 'ok'|'error', 'summary', 'html', 'png', 'cached', 'error'}
+    缓存命中的报价直接返回，其余共用一个浏览器并行截图（渲染服务或ASGI模式下交给共享渲染器，
+    web worker 不启动Chromium）；单项失败不影响其他报价。
+    批量输出固定为PNG，成图宽度和大小上限同样按 WECHAT_SHARE
+    """
+    spec = image_output.image_spec('png', PNG_VIEWPORT['width'])
+    cache = get_render_cache()
+    pending = []   # [(index, html)]
+    prepared = {}  # index -> (quote, cache_key, html)
+
+    for index, payload in enumerate(payloads):
+        try:
+            quote = parse_quote_request(payload)
+            key = render_cache_key(quote, layout, image=spec)
+        except Exception as e:
+            yield {'index': index, 'status': 'error', 'error': f'请求数据无效: {e}'}
+            continue
+
+        cached = cache.get(key)
+        metrics.RENDER_CACHE.inc(result='hit' if cached else 'miss')
+        if cached:
+            html, png = cached
+            yield {'index': index, 'status': 'ok', 'summary': quote_summary(quote),
+                   'html': html, 'png': png, 'cached': True}
+            continue
+
+        html = generate_html(quote, layout)
+        if not html:
+            yield {'index': index, 'status': 'error', 'error': '生成HTML失败'}
+            continue
+
+        prepared[index] = (quote, key, html)
+        pending.append((index, html))
+
+    metrics.RENDERS_IN_FLIGHT.inc(len(pending))
+    try:
+        for index, outcome in render_batch(pending, viewport=PNG_VIEWPORT,
+                                           concurrency=concurrency,
+                                           device_scale_factor=spec['device_scale_factor'],
+                                           renderer=get_shared_renderer()):
+            quote, key, html = prepared.pop(index)
+            metrics.RENDERS_IN_FLIGHT.dec()
+            if isinstance(outcome, Exception):
+                yield {'index': index, 'status': 'error', 'error': f'生成PNG失败: {outcome}'}
+                continue
+
+            with metrics.stage('encode'):
+                png, info = image_output.fit_image(outcome, spec)
+            cache.put(key, html, png, info)
+            yield {'index': index, 'status': 'ok', 'summary': quote_summary(quote),
+                   'html': html, 'png': png, 'cached': False}
+    finally:
+        # 提前结束（客户端断开等）时未完成的截图不再计入
+        metrics.RENDERS_IN_FLIGHT.dec(len(prepared))
 
 @app.route('/api/generate', methods=['POST'])
 def generate_quote():
-    """生成报价单"""
+    """
+    生成报价单（同步，等待PNG生成完成）
+
+    请求中带 targets 时一次生成多个输出，例如:
+        "targets": [{"template": "wechat", "viewport": "wechat", "format": "png"},
+                    {"template": "1024x768", "viewport": "1024x768", "format": "png", "full_page": false},
+                    {"template": "premium", "format": "html"}]
+    """
     try:
-        data = request.json
-
-        # 解析房源信息
-        property_info = PropertyInfo(
-            property_name=data['property_name'],
-            room_type=data['room_type'],
-            address=data['address'],
-            lease_start=datetime.strptime(data['lease_start'], '%Y-%m-%d').date(),
-            lease_end=datetime.strptime(data['lease_end'], '%Y-%m-%d').date(),
-        )
+        with metrics.stage('parse'):
+            data = request.get_json()
+        with metrics.stage('build'):
+            quote = parse_quote_request(data)
+        targets = data.get('targets')
+        if targets is not None:
+            targets = parse_targets(targets)
+        image_format = data.get('image_format')
+        image_output.image_spec(image_format)  # 提前校验格式
+        renderer = parse_renderer(data.get('renderer'), 'simple')
+    except (KeyError, TypeError, ValueError, ArithmeticError) as e:
+        return jsonify({'error': f'请求数据无效: {e}'}), 400
 
-        # 解析优惠
-        landlord_discounts = [
-            Discount(
-                name=d['name'],
-                amount=Decimal(str(d['amount'])),
-                payer=DiscountPayer.LANDLORD
-            )
-            for d in data.get('landlord_discounts', [])
-        ]
-
-        uhomes_subsidies = [
-            Discount(
-                name=d['name'],
-                amount=Decimal(str(d['amount'])),
-                payer=DiscountPayer.UHOMES
-            )
-            for d in data.get('uhomes_subsidies', [])
-        ]
-
-        # 解析礼品
-        gift_library = {g.id: g for g in load_gift_library()}
-        selected_gifts = [
-            gift_library[gift_id]
-            for gift_id in data.get('selected_gifts', [])
-            if gift_id in gift_library
-        ]
-
-        # 解析顾问信息
-        advisor = None
-        if data.get('advisor_name'):
-            advisor = AdvisorInfo(
-                name=data['advisor_name'],
-                phone=data.get('advisor_phone', ''),
-                wechat_id=data.get('advisor_wechat', '')
-            )
-
-        # 创建报价单
-        quote = QuoteData(
-            property=property_info,
-            original_weekly_price=Decimal(str(data['weekly_price'])),
-            landlord_discounts=landlord_discounts,
-            uhomes_subsidies=uhomes_subsidies,
-            selected_gifts=selected_gifts,
-            advisor=advisor
-        )
-
-        # 生成HTML
-        html = generate_html(quote)
-        if not html:
-            return jsonify({'error': '生成HTML失败'}), 500
-
-        # 保存HTML
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        html_filename = f"quote_{timestamp}.html"
-        png_filename = f"quote_{timestamp}.png"
-
-        with open(html_filename, 'w', encoding='utf-8') as f:
-            f.write(html)
-
-        # 生成PNG
-        generate_png(html_filename, png_filename)
-
-        return jsonify({
-            'success': True,
-            'html_file': html_filename,
-            'png_file': png_filename,
-            'summary': {
-                'property_name': quote.property.property_name,
-                'original_price': float(quote.original_annual_price),
-                'final_price': float(quote.final_annual_price),
-                'total_savings': float(quote.total_savings),
-                'savings_rate': round(quote.savings_rate, 1)
-            }
-        })
+    try:
+        if targets is not None:
+            return jsonify(build_target_files(quote, targets))
+        return jsonify(build_quote_files(quote, image_format, renderer))
 
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/download/<filename>')
-def download_file(filename):
-    """下载文件"""
-    return send_file(filename, as_attachment=True)
+@app.route('/api/preview', methods=['POST'])
+def preview_quote():
+    """
+    方案预览（只计算价格，不生成HTML和图片）
+
+    请求: {"base": {与 /api/generate 相同的报价字段},
+           "variations": [{"label": "加接机", "add_gifts": ["airport_pickup"]},
+                          {"label": "补贴加£200", "uhomes_subsidies": [{"name": "平台补贴", "amount": 200}]}]}
+    返回基础报价和每个方案的 final_annual_price / final_weekly_price / total_savings / savings_rate
+    """
+    try:
+        with metrics.stage('parse'):
+            data = request.get_json()
+        if not isinstance(data, dict):
+            raise ValueError('请求应为JSON对象')
+        with metrics.stage('preview'):
+            result = preview_engine.preview(data.get('base'), data.get('variations', []))
+    except (KeyError, TypeError, ValueError, ArithmeticError) as e:
+        return jsonify({'error': f'请求数据无效: {e}'}), 400
+    return jsonify(result)
+
+@app.route('/api/generate/batch', methods=['POST'])
+def generate_quote_batch():
+    """
+    批量生成报价单
+
+    请求体为JSON报价列表（或 {"quotes": [...]}），也可以是CSV（text/csv 或上传文件 file）
+    ?format=ndjson（默认）逐行返回每份报价的结果，最后一行为汇总；
+    ?format=zip 返回包含全部HTML/PNG和 manifest.ndjson 的压缩包
+    """
+    output = request.args.get('format', 'ndjson')
+    layout = request.args.get('layout', 'wechat')
+    if output not in ('ndjson', 'zip'):
+        return jsonify({'error': f'不支持的输出格式: {output}'}), 400
+    if layout not in pricelist_templates.QUOTE_LAYOUTS:
+        return jsonify({'error': f'未知的报价单布局: {layout}'}), 400
+
+    try:
+        upload = request.files.get('file')
+        if upload is not None:
+            fmt = 'csv' if upload.filename.lower().endswith('.csv') else 'json'
+            payloads = load_payloads(upload.read().decode('utf-8-sig'), fmt)
+        elif request.mimetype == 'text/csv':
+            payloads = load_payloads(request.get_data(as_text=True), 'csv')
+        else:
+            payloads = load_payloads(request.get_data(as_text=True), 'json')
+    except (ValueError, UnicodeDecodeError) as e:
+        return jsonify({'error': f'批量数据无效: {e}'}), 400
+
+    if len(payloads) > BATCH_MAX_ITEMS:
+        return jsonify({'error': f'单次最多生成 {BATCH_MAX_ITEMS} 份报价，请使用 pricelist-batch.py 处理更大的批次'}), 413
+
+    batch_id = datetime.now().strftime('%Y%m%d_%H%M%S')
+    results = generate_batch(payloads, layout)
+
+    if output == 'zip':
+        return Response(
+            stream_with_context(iter_zip(zip_entries(results))),
+            mimetype='application/zip',
+            headers={'Content-Disposition': f'attachment; filename=quotes_{batch_id}.zip'},
+        )
+
+    def ndjson_stream():
+        succeeded = failed = 0
+        for item in results:
+            basename = f"quote_{batch_id}_{item['index']:04d}"
+            record = manifest_record(item, basename)
+            if item['status'] == 'ok':
+                succeeded += 1
+                html_artifact, png_artifact = save_quote_files(item['html'], item['png'], basename)
+                record['html_url'] = download_url(html_artifact)
+                record['png_url'] = download_url(png_artifact)
+            else:
+                failed += 1
+            yield ndjson_line(record)
+        yield ndjson_line({'done': True, 'total': len(payloads),
+                           'succeeded': succeeded, 'failed': failed})
+
+    return Response(stream_with_context(ndjson_stream()), mimetype='application/x-ndjson')
+
+@app.route('/api/jobs', methods=['POST'])
+def submit_quote_job():
+    """提交报价单渲染任务，立即返回任务ID"""
+    try:
+        quote = parse_quote_request(request.json)
+        image_format = request.json.get('image_format')
+        image_output.image_spec(image_format)  # 提前校验格式
+        renderer = parse_renderer(request.json.get('renderer'), 'simple')
+    except (KeyError, TypeError, ValueError, ArithmeticError) as e:
+        return jsonify({'error': f'请求数据无效: {e}'}), 400
+
+    try:
+        job_id = get_job_queue().submit(build_quote_files, quote, image_format, renderer)
+    except QueueFull as e:
+        response = jsonify({'error': str(e)})
+        response.headers['Retry-After'] = '5'
+        return response, 429
+
+    return jsonify({
+        'job_id': job_id,
+        'status': 'queued',
+        'status_url': f'/api/jobs/{job_id}',
+    }), 202
+
+@app.route('/api/jobs/<job_id>')
+def get_quote_job(job_id):
+    """查询渲染任务状态（?wait=秒数 长轮询，最长 JOB_MAX_WAIT 秒：同步worker为1秒，ASGI为30秒）"""
+    jobs = get_job_queue()
+    wait = min(request.args.get('wait', 0, type=float), JOB_MAX_WAIT)
+
+    if wait > 0:
+        job = jobs.wait(job_id, wait)
+    else:
+        job = jobs.get(job_id)
+
+    if job is None:
+        return jsonify({'error': '任务不存在或已过期'}), 404
+    return jsonify(job)
+
+@app.route('/api/render-cache')
+def render_cache_stats():
+    """渲染缓存命中统计（当前worker进程）"""
+    return jsonify(get_render_cache().stats())
+
+@app.route('/ready')
+def readiness():
+    """就绪检查：预热完成返回200，否则503"""
+    status = dict(WARMUP, worker_pid=os.getpid())
+    return jsonify(status), 200 if WARMUP['ready'] else 503
+
+@app.route('/metrics')
+def metrics_endpoint():
+    """Prometheus指标（设置 METRICS_DIR 时汇总所有worker进程）"""
+    return Response(metrics.REGISTRY.expose(metrics.metrics_dir()),
+                    mimetype=metrics.CONTENT_TYPE)
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+
+@app.after_request
+def record_request_metrics(response):
+    """记录接口耗时和状态码（流式响应只统计到响应头返回）"""
+    started = g.pop('request_started', None)
+    endpoint = request.endpoint or 'unknown'
+    if started is not None and endpoint != 'metrics_endpoint':
+        metrics.REQUEST_SECONDS.observe(time.perf_counter() - started, endpoint=endpoint)
+        metrics.REQUESTS.inc(endpoint=endpoint, status=response.status_code)
+
+        directory = metrics.metrics_dir()
+        if directory:
+            metrics.REGISTRY.flush(directory, min_interval=1.0)
+    return response
+
+@app.route('/download/<artifact_id>')
+def download_file(artifact_id):
+    """下载产物（支持ETag/304和Range）"""
+    artifact = get_artifact_store().get(artifact_id)
+    if artifact is None:
+        return jsonify({'error': '文件不存在或已过期'}), 404
+
+    response = send_file(
+        artifact.path if artifact.path is not None else artifact.open(),
+        mimetype=artifact.content_type,
+        as_attachment=True,
+        download_name=artifact.filename,
+        etag=artifact.etag,
+        conditional=True,
+        last_modified=artifact.created,
+        max_age=get_artifact_store().ttl,
+    )
+    # 报价单含客户信息，只允许浏览器缓存
+    response.cache_control.public = False
+    response.cache_control.private = True
+    return response
 
 if __name__ == '__main__':
     print("="*70)
@@ -368,4 +927,5 @@ if __name__ == '__main__':
     print("")
     print("按 Ctrl+C 停止服务")
     print("="*70)
+    pricelist_templates.configure(debug=True)
     app.run(debug=True, port=5001)
@@ -11,8 +11,10 @@ load_dotenv()
 # 添加项目路径到Python路径
 sys.path.insert(0, os.path.dirname(__file__))
 
-# 导入Flask应用
-from pricelist_web_app import app as application
+# 导入Flask应用并预热（preload_app 时在gunicorn主进程中执行，worker fork后共享）
+from pricelist_web_app import app as application, warmup
+
+warmup(freeze=os.getenv('WARMUP_GC_FREEZE', '1') == '1')
 
 if __name__ == "__main__":
     application.run()